@@ -0,0 +1,121 @@
+"""Time deep loading a collection served over HTTP.
+
+A synthetic collection is written as a distributed Zarr hierarchy and served
+by a local HTTP server, which waits --latency milliseconds before answering
+each request to stand in for a remote object store. The collection is loaded
+from its URL sequentially, with --workers threads, and with the async API;
+all must load the same tree. Connections are shared between requests, the
+number of connections opened is reported next to the number of requests.
+
+Run with: python benchmarks/bench_http.py [--latency MS] [--workers N]
+"""
+
+import argparse
+import asyncio
+import functools
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from synthetic import count_nodes, make_collection, write_store
+
+from ngff_rfc8_collection_examples.cache import path_cache
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.common import resolve_zarr_path
+from ngff_rfc8_collection_examples.stores import store_pool
+
+
+class Counts:
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class Handler(SimpleHTTPRequestHandler):
+    # Keep connections open between requests
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def __init__(self, *args, counts: Counts, latency: float, **kwargs):
+        self.counts = counts
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def setup(self):
+        super().setup()
+        with self.counts.lock:
+            self.counts.connections += 1
+
+    def send_head(self):
+        with self.counts.lock:
+            self.counts.requests += 1
+        time.sleep(self.latency)
+        return super().send_head()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory: Path, counts: Counts, latency: float) -> ThreadingHTTPServer:
+    handler = functools.partial(
+        Handler, counts=counts, latency=latency, directory=str(directory)
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--scales", type=int, default=3)
+    parser.add_argument("--transforms", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=5, help="ms per request")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    collection = make_collection(args.depth, args.fanout, args.scales, args.transforms)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_store(collection, Path(tmp) / "collection.zarr")
+        counts = Counts()
+        server = serve(Path(tmp), counts, args.latency / 1000)
+        url = f"http://127.0.0.1:{server.server_address[1]}/collection.zarr"
+
+        def load(workers: int) -> RootCollection:
+            return RootCollection.load(resolve_zarr_path(url), max_workers=workers)
+
+        loads = {
+            "load_deep sequential": lambda: load(1),
+            f"load_deep {args.workers} workers": lambda: load(args.workers),
+            "afrom_zarr deep": lambda: asyncio.run(
+                RootCollection.afrom_zarr(url, deep=True)
+            ),
+        }
+        expected = None
+        print(f"{count_nodes(collection)} nodes")
+        for name, func in loads.items():
+            # Every load starts from cold caches
+            path_cache.clear()
+            store_pool.clear()
+            counts.requests = counts.connections = 0
+            start = time.perf_counter()
+            loaded = func().model_dump(exclude_none=True)
+            seconds = time.perf_counter() - start
+            if expected is None:
+                expected = loaded
+            assert loaded == expected, f"{name} loaded a different tree"
+            print(
+                f"{name:24s} {seconds * 1000:8.1f} ms {counts.requests:6d} requests"
+                f" {counts.connections:4d} connections"
+            )
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
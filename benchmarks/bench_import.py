@@ -0,0 +1,70 @@
+"""Check the import time of the models package against a startup budget.
+
+Imports each module in a fresh interpreter with `python -X importtime` and
+takes the best cumulative time of --repeat runs. Fails when a module takes
+longer than --budget milliseconds, or when importing it pulls in one of the
+modules that are only meant to be imported on first use (zarr, urllib3,
+asyncio, numpy).
+
+Run with: python benchmarks/bench_import.py [--budget MS] [--repeat N]
+"""
+
+import argparse
+import subprocess
+import sys
+
+MODULES = [
+    "ngff_rfc8_collection_examples.common",
+    "ngff_rfc8_collection_examples.collection",
+]
+LAZY_MODULES = ["zarr", "urllib3", "asyncio", "numpy"]
+
+
+def import_time(module: str) -> tuple[float, set[str]]:
+    """Cumulative import time of module in ms, and the modules it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # The header line
+        imported.add(name.strip())
+        if name.strip() == module:
+            total = int(cumulative) / 1000
+    return total, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--budget", type=float, default=400, help="ms per module")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    for module in MODULES:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        best = min(total for total, _ in runs)
+        eager = sorted(set(LAZY_MODULES) & runs[0][1])
+        print(f"{module:45s} {best:8.1f} ms")
+        if best > args.budget:
+            failures.append(f"{module} took {best:.1f} ms > {args.budget:.0f} ms")
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
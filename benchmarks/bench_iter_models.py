@@ -0,0 +1,111 @@
+"""Compare iter_models against the previous recursive generator.
+
+Run with: python benchmarks/bench_iter_models.py [--multiscales N] [--scales N]
+"""
+
+import argparse
+import time
+from typing import Any, Iterator
+
+from pydantic import BaseModel
+
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.common import (
+    BaseAttrs,
+    CoordinateSystem,
+    Ref,
+    Scale,
+)
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.pydantic_tools import iter_models
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+
+def iter_models_recursive(
+    obj: Any, _seen: set[int] | None = None, depth: int = -1
+) -> Iterator[BaseModel]:
+    """The recursive implementation iter_models replaced, kept as a baseline."""
+    if _seen is None:
+        _seen = set()
+    if depth == 0:
+        return
+    depth = depth - 1 if depth > 0 else depth
+    if isinstance(obj, BaseModel):
+        oid = id(obj)
+        if oid in _seen:
+            return
+        _seen.add(oid)
+        yield obj
+        for _, value in obj:
+            yield from iter_models_recursive(value, _seen, depth)
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from iter_models_recursive(v, _seen, depth)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            yield from iter_models_recursive(v, _seen, depth)
+
+
+def build_collection(n_multiscales: int, n_scales: int) -> Collection:
+    world_cs = CoordinateSystem(name="world")
+    multiscales = []
+    for i in range(n_multiscales):
+        scales = []
+        for j in range(n_scales):
+            id = f"scale-{i}-{j}"
+            scales.append(
+                SingleScale(
+                    id=id,
+                    name=f"scale {j}",
+                    attributes=BaseAttrs(
+                        coordinate_transformations=[
+                            Scale(
+                                scale=[2.0**j] * 3,
+                                input=Ref(ref=id),
+                                output=Ref(ref=world_cs.id),
+                            )
+                        ]
+                    ),
+                )
+            )
+        multiscales.append(
+            Multiscale(
+                id=f"multiscale-{i}",
+                attributes=BaseAttrs(coordinate_systems=[world_cs]),
+                nodes=scales,
+            )
+        )
+    return Collection(name="benchmark", nodes=multiscales)
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--multiscales", type=int, default=1000)
+    parser.add_argument("--scales", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    collection = build_collection(args.multiscales, args.scales)
+    models = list(iter_models(collection))
+    assert [id(m) for m in models] == [id(m) for m in iter_models_recursive(collection)]
+    n_nodes = 1 + args.multiscales * (1 + args.scales)
+    print(f"{n_nodes} nodes, {len(models)} models")
+
+    recursive = best_of(lambda: list(iter_models_recursive(collection)), args.repeat)
+    iterative = best_of(lambda: list(iter_models(collection)), args.repeat)
+    print(f"recursive iter_models: {recursive * 1000:8.1f} ms")
+    print(f"iter_models:           {iterative * 1000:8.1f} ms")
+    print(f"speedup:               {recursive / iterative:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare node validation against the previous undiscriminated union.
+
+Child nodes of a collection used to be typed as the plain union
+`Collection | Multiscale | SingleScale`, which pydantic validates by trying
+every member in turn. They are now dispatched on their 'type' field. The
+legacy collection below keeps the plain union as a baseline; both must
+validate to the same tree.
+
+Run with: python benchmarks/bench_node_validation.py [--depth N] [--fanout N]
+"""
+
+import argparse
+import json
+import time
+
+from pydantic import Field
+from synthetic import make_collection
+
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+
+class LegacyCollection(Collection):
+    nodes: list["LegacyCollection | Multiscale | SingleScale"] = Field(
+        default_factory=list
+    )
+
+
+def count_nodes_of(node) -> int:
+    return 1 + sum(count_nodes_of(child) for child in node.nodes)
+
+
+def last_scales(data: dict) -> list[dict]:
+    """The scales of the last multiscale, found by following the last children."""
+    node = data
+    while node["type"] != "multiscale":
+        node = node["nodes"][-1]
+    return node["nodes"]
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--scales", type=int, default=3)
+    parser.add_argument("--transforms", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.depth < 1:
+        parser.error("--depth must be at least 1")
+
+    data = make_collection(
+        args.depth, args.fanout, args.scales, args.transforms
+    ).ome.model_dump(exclude_none=True)
+    # Scales at the top level are the last member of the union
+    data["nodes"].extend(last_scales(data))
+    json_data = json.dumps(data)
+    collection = Collection.model_validate(data)
+    legacy = LegacyCollection.model_validate(data)
+    n_nodes = count_nodes_of(collection)
+    print(f"{n_nodes} nodes")
+    assert legacy.model_dump(exclude_none=True) == collection.model_dump(
+        exclude_none=True
+    )
+
+    timings = {
+        "union validate_python": lambda: LegacyCollection.model_validate(data),
+        "tagged validate_python": lambda: Collection.model_validate(data),
+        "union validate_json": lambda: LegacyCollection.model_validate_json(json_data),
+        "tagged validate_json": lambda: Collection.model_validate_json(json_data),
+    }
+    results = {name: best_of(func, args.repeat) for name, func in timings.items()}
+    for name, seconds in results.items():
+        print(
+            f"{name:24s} {seconds * 1000:8.1f} ms"
+            f" {n_nodes / seconds / 1000:8.1f} k nodes/s"
+        )
+    for mode in ("validate_python", "validate_json"):
+        speedup = results[f"union {mode}"] / results[f"tagged {mode}"]
+        print(f"{mode} speedup: {speedup:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Compare serialization against the previous wrap-mode model serializers.
+
+The models used to remove empty lists and rename keys in Python, in a wrap
+model_serializer run for every node. They now declare these rules on their
+fields, so pydantic's core serializer does the work. The legacy models below
+keep the old serializers as a baseline; both must produce identical output.
+
+Run with: python benchmarks/bench_serialization.py [--depth N] [--fanout N]
+"""
+
+import argparse
+import json
+import time
+
+from pydantic import AliasChoices, BaseModel, Field, model_serializer
+from synthetic import make_collection
+
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.common import CoordinateSystem, Scale
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+
+class LegacyBaseAttrs(BaseModel):
+    coordinate_systems: list[CoordinateSystem] = Field(
+        default_factory=list,
+        validation_alias=AliasChoices("coordinateSystems", "coordinate_systems"),
+        serialization_alias="coordinateSystems",
+    )
+    coordinate_transformations: list[Scale] = Field(
+        default_factory=list,
+        validation_alias=AliasChoices(
+            "coordinateTransformations", "coordinate_transformations"
+        ),
+        serialization_alias="coordinateTransformations",
+    )
+
+    @model_serializer(mode="wrap")
+    def remove_empty_lists(self, handler):
+        data = handler(self)
+        if len(data.get("coordinate_systems", [])) == 0:
+            data.pop("coordinate_systems", None)
+        if len(data.get("coordinate_transformations", [])) == 0:
+            data.pop("coordinate_transformations", None)
+
+        # Rename aliases back to camelCase
+        if "coordinate_systems" in data:
+            data["coordinateSystems"] = data.pop("coordinate_systems")
+        if "coordinate_transformations" in data:
+            data["coordinateTransformations"] = data.pop("coordinate_transformations")
+        return data
+
+
+def remove_empty_node_lists(self, handler):
+    data = handler(self)
+    if len(data.get("nodes", [])) == 0:
+        data.pop("nodes", None)
+    if len(data.get("attributes", {})) == 0:
+        data.pop("attributes", None)
+    return data
+
+
+class LegacySingleScale(SingleScale):
+    attributes: LegacyBaseAttrs = Field(default_factory=LegacyBaseAttrs)
+    nodes: list[None] = Field(default_factory=list, max_length=0)
+
+    remove_empty_lists = model_serializer(mode="wrap")(remove_empty_node_lists)
+
+
+class LegacyMultiscale(Multiscale):
+    attributes: LegacyBaseAttrs = Field(default_factory=LegacyBaseAttrs)
+    nodes: list[LegacySingleScale] = Field(default_factory=list)
+
+    remove_empty_lists = model_serializer(mode="wrap")(remove_empty_node_lists)
+
+
+class LegacyCollection(Collection):
+    attributes: LegacyBaseAttrs = Field(default_factory=LegacyBaseAttrs)
+    nodes: list["LegacyCollection | LegacyMultiscale | LegacySingleScale"] = Field(
+        default_factory=list
+    )
+
+    remove_empty_lists = model_serializer(mode="wrap")(remove_empty_node_lists)
+
+
+def count_nodes_of(node) -> int:
+    return 1 + sum(count_nodes_of(child) for child in node.nodes)
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=20)
+    parser.add_argument("--scales", type=int, default=5)
+    parser.add_argument("--transforms", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_collection(
+        args.depth, args.fanout, args.scales, args.transforms
+    ).ome.model_dump()
+    collection = Collection.model_validate(data)
+    legacy = LegacyCollection.model_validate(data)
+    print(f"{count_nodes_of(collection)} nodes")
+
+    assert legacy.model_dump(exclude_none=True) == collection.model_dump(
+        exclude_none=True
+    )
+    legacy_json = legacy.model_dump_json(exclude_none=True)
+    assert legacy_json == collection.model_dump_json(exclude_none=True)
+    assert json.loads(legacy_json) == collection.model_dump(exclude_none=True)
+
+    timings = {
+        "wrap model_dump": lambda: legacy.model_dump(exclude_none=True),
+        "core model_dump": lambda: collection.model_dump(exclude_none=True),
+        "wrap model_dump_json": lambda: legacy.model_dump_json(exclude_none=True),
+        "core model_dump_json": lambda: collection.model_dump_json(exclude_none=True),
+        "core to_json": lambda: collection.__pydantic_serializer__.to_json(
+            collection, exclude_none=True
+        ),
+    }
+    results = {name: best_of(func, args.repeat) for name, func in timings.items()}
+    for name, seconds in results.items():
+        print(f"{name:22s} {seconds * 1000:8.1f} ms")
+    print(
+        "model_dump speedup:      "
+        f"{results['wrap model_dump'] / results['core model_dump']:6.2f}x"
+    )
+    print(
+        "model_dump_json speedup: "
+        f"{results['wrap model_dump_json'] / results['core to_json']:6.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
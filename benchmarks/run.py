@@ -0,0 +1,168 @@
+"""Benchmark suite for loading, resolving and serializing collections.
+
+Times each operation on a synthetic collection (best of --repeat runs) and
+measures its peak traced memory in a separate run. Results can be saved with
+--output, together with the collection parameters, and compared against a
+saved baseline with --compare, which fails when an operation got slower than
+--threshold times the baseline. Baselines taken with other parameters are
+refused.
+
+Run with: python benchmarks/run.py --depth 2 --fanout 10 --scales 5
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterator
+
+import zarr
+from synthetic import count_nodes, make_collection, write_store
+
+from ngff_rfc8_collection_examples.cache import path_cache
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.common import CoordinateSystem, Scale
+from ngff_rfc8_collection_examples.compact import CompactCollection
+from ngff_rfc8_collection_examples.pydantic_tools import collect_ids, collect_models
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+PARAMETERS = ("depth", "fanout", "scales", "transforms", "workers")
+
+
+def measure(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Callable[[], object] | None = None,
+) -> dict[str, float]:
+    """Time func and trace its peak memory, calling setup untimed before each run."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_mb": peak / 2**20}
+
+
+def resolve_all_refs(collection: RootCollection) -> None:
+    for model in collect_models(collection.ome):
+        if isinstance(model, Scale):
+            model.input.resolve_ref(collection, SingleScale)
+            model.output.resolve_ref(collection, CoordinateSystem)
+
+
+def save_one_change(collection: RootCollection, names: Iterator[int]) -> None:
+    # A new name every call, so that every save has a change to write
+    collection.ome.nodes[-1].name = f"renamed {next(names)}"
+    collection.save()
+
+
+def run(args: argparse.Namespace, workdir: Path) -> dict[str, dict[str, float]]:
+    collection = make_collection(args.depth, args.fanout, args.scales, args.transforms)
+    print(f"{count_nodes(collection)} nodes")
+    json_data = collection.model_dump(exclude_none=True)
+    group = write_store(collection, workdir / "source.zarr")
+    target = zarr.open_group(workdir / "target.zarr", mode="w")
+    loaded = RootCollection.load(group, max_workers=args.workers)
+    names = itertools.count()
+
+    benchmarks: dict[str, Callable[[], object]] = {
+        "from_json": lambda: RootCollection.from_json(json_data),
+        "from_zarr": lambda: RootCollection.from_zarr(group),
+        "load_deep": lambda: RootCollection.load(group, max_workers=args.workers),
+        "model_dump": lambda: collection.model_dump(exclude_none=True),
+        "to_json_bytes": lambda: collection.to_json_bytes(),
+        "to_zarr": lambda: collection.to_zarr(target),
+        "save_one_change": lambda: save_one_change(loaded, names),
+        "collect_ids": lambda: collect_ids(collection),
+        "resolve_ref": lambda: resolve_all_refs(collection),
+        "to_compact": lambda: CompactCollection.from_model(collection),
+    }
+    # Every deep load starts from a cold cache, or only the first run reads
+    setups: dict[str, Callable[[], object]] = {"load_deep": path_cache.clear}
+    results = {}
+    for name, func in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(func, args.repeat, setups.get(name))
+        print(
+            f"{name:16s} {results[name]['seconds'] * 1000:10.1f} ms"
+            f" {results[name]['peak_mb']:10.1f} MiB peak"
+        )
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            before, after = baseline[name][metric], result[metric]
+            if before > 0 and after / before > threshold:
+                regressions.append(
+                    f"{name} {metric}: {before:.4g} -> {after:.4g} "
+                    f"({after / before:.2f}x)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--depth", type=int, default=2, help="collection levels")
+    parser.add_argument("--fanout", type=int, default=10, help="children per node")
+    parser.add_argument("--scales", type=int, default=5, help="scales per multiscale")
+    parser.add_argument(
+        "--transforms", type=int, default=1, help="transforms per scale"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="load_deep workers")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="benchmarks to run")
+    parser.add_argument("--output", type=Path, help="save results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    params = {key: getattr(args, key) for key in PARAMETERS}
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        if baseline.get("params") != params:
+            parser.error(
+                f"{args.compare} was run with {baseline.get('params')}, "
+                f"not {params}; results are not comparable"
+            )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(args, Path(workdir))
+
+    if args.output is not None:
+        args.output.write_text(
+            json.dumps({"params": params, "results": results}, indent=2)
+        )
+    if args.compare is not None:
+        regressions = compare(results, baseline["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Synthetic collections of configurable size for benchmarks."""
+
+from pathlib import Path
+
+import zarr
+
+from ngff_rfc8_collection_examples.collection import (
+    Collection,
+    CollectionWithVersion,
+    RootCollection,
+)
+from ngff_rfc8_collection_examples.common import (
+    Axes,
+    BaseAttrs,
+    CoordinateSystem,
+    PathRefZarr,
+    Ref,
+    Scale,
+)
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+
+def make_coordinate_systems(n: int) -> list[CoordinateSystem]:
+    return [
+        CoordinateSystem(
+            id=f"cs-{k}",
+            name="world" if k == 0 else f"world-{k}",
+            axes=[Axes(name=axis, type="space", unit="micrometer") for axis in "zyx"],
+        )
+        for k in range(n)
+    ]
+
+
+def make_multiscale(
+    prefix: str, n_scales: int, coordinate_systems: list[CoordinateSystem]
+) -> Multiscale:
+    scales = []
+    for i in range(n_scales):
+        id = f"{prefix}/{i}"
+        scales.append(
+            SingleScale(
+                id=id,
+                name=f"scale {i}",
+                path=PathRefZarr(path=f"./{i}"),
+                attributes=BaseAttrs(
+                    coordinate_transformations=[
+                        Scale(
+                            scale=[2.0**i * (k + 1)] * 3,
+                            input=Ref(ref=id),
+                            output=Ref(ref=cs.id),
+                        )
+                        for k, cs in enumerate(coordinate_systems)
+                    ]
+                ),
+            )
+        )
+    return Multiscale(id=prefix, name=prefix, nodes=scales)
+
+
+def make_collection(
+    depth: int, fanout: int, n_scales: int, n_transforms: int
+) -> RootCollection:
+    """Build a collection tree in memory.
+
+    Collections are nested depth levels deep with fanout children each; the
+    leaves are multiscales with n_scales scales. Every scale has one Scale
+    transform to each of the n_transforms coordinate systems of the root.
+    """
+    coordinate_systems = make_coordinate_systems(n_transforms)
+
+    def make_children(prefix: str, level: int) -> list[Collection | Multiscale]:
+        if level == depth:
+            return [
+                make_multiscale(f"{prefix}/m{i}", n_scales, coordinate_systems)
+                for i in range(fanout)
+            ]
+        return [
+            Collection(
+                id=f"{prefix}/c{i}",
+                name=f"{prefix}/c{i}",
+                nodes=make_children(f"{prefix}/c{i}", level + 1),
+            )
+            for i in range(fanout)
+        ]
+
+    return RootCollection(
+        ome=CollectionWithVersion(
+            id="root",
+            name="synthetic",
+            attributes=BaseAttrs(coordinate_systems=coordinate_systems),
+            nodes=make_children("root", 1),
+        )
+    )
+
+
+def count_nodes(collection: RootCollection) -> int:
+    def count(node) -> int:
+        return 1 + sum(count(child) for child in node.nodes)
+
+    return count(collection.ome)
+
+
+def write_store(collection: RootCollection, path: Path) -> zarr.Group:
+    """Write a collection as a distributed local Zarr hierarchy.
+
+    Every collection and multiscale is a group of its own, referenced by path
+    from its parent; every scale is a small empty array.
+    """
+    root = zarr.open_group(path, mode="w")
+
+    def write_node(node, group: zarr.Group) -> dict:
+        if isinstance(node, SingleScale):
+            zarr.create_array(
+                store=group.store,
+                name=f"{group.path}/{node.path.path[2:]}".lstrip("/"),
+                shape=(8, 8, 8),
+                dtype="uint8",
+            )
+            return node.model_dump(exclude_none=True)
+        name = node.id.rsplit("/", 1)[-1]
+        child_group = group.create_group(name)
+        ome = node.model_dump(exclude_none=True)
+        ome["nodes"] = [write_node(child, child_group) for child in node.nodes]
+        child_group.attrs.update({"ome": {**ome, "version": "0.7dev0"}})
+        return {
+            "id": node.id,
+            "type": node.type,
+            "name": node.name,
+            "path": {"type": "zarr", "path": f"./{name}"},
+        }
+
+    ome = collection.ome.model_dump(exclude_none=True)
+    ome["nodes"] = [write_node(child, root) for child in collection.ome.nodes]
+    root.attrs.update({"ome": ome})
+    return root
@@ -2,7 +2,6 @@ import pathlib
 
 import numpy as np
 import zarr
-from pydantic import BaseModel
 
 from ngff_rfc8_collection_examples.common import (
     Axes,
@@ -16,7 +15,7 @@ from ngff_rfc8_collection_examples.multiscale import (
     MultiscaleWithVersion,
     RootMultiscale,
 )
-from ngff_rfc8_collection_examples.pydantic_tools import collect_models
+from ngff_rfc8_collection_examples.references import validate_references
 from ngff_rfc8_collection_examples.single_scales import SingleScale
 
 np.random.seed(0)
@@ -77,32 +76,10 @@ ome_ms.to_zarr(zarr.open_group(group_path, mode="a"))
 
 loaded_ms = RootMultiscale.from_zarr(zarr.open_group(group_path, mode="r"))
 
-
-def collect_ids_and_refs(
-    ome_sc: RootMultiscale,
-) -> tuple[dict[str, BaseModel], dict[str, Ref]]:
-    models = collect_models(ome_sc.ome)
-    refs: dict[str, Ref] = {}
-    ids: dict[str, BaseModel] = {}
-    for m in models:
-        if isinstance(m, Ref):
-            refs[m.ref] = m
-        if hasattr(m, "id"):
-            id = getattr(m, "id")
-            ids[id] = m
-
-    # Ensure that all refs point to existing ids
-    for ref in refs.values():
-        if ref.ref not in ids:
-            raise ValueError(f"Reference {ref.ref} does not point to any known ID.")
-
-    return ids, refs
-
-
-ids, refs = collect_ids_and_refs(loaded_ms)
+graph = validate_references(loaded_ms.ome)
 print("Collected IDs:")
-for id in ids:
+for id in graph.ids:
     print(f" - {id}")
 print("Collected Refs:")
-for ref in refs.items():
-    print(f" - {ref}")
+for reference in graph.references:
+    print(f" - {reference.ref}")
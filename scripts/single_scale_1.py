@@ -2,7 +2,6 @@ from pathlib import Path
 
 import numpy as np
 import zarr
-from pydantic import BaseModel
 
 from ngff_rfc8_collection_examples.common import (
     Axes,
@@ -11,7 +10,7 @@ from ngff_rfc8_collection_examples.common import (
     Ref,
     Scale,
 )
-from ngff_rfc8_collection_examples.pydantic_tools import collect_models
+from ngff_rfc8_collection_examples.references import validate_references
 from ngff_rfc8_collection_examples.single_scales import (
     RootSingleScale,
     SingleScaleWithVersion,
@@ -64,33 +63,12 @@ root_sc.to_zarr(zarr_array)
 
 # Load it back
 loaded_sc = RootSingleScale.from_zarr(zarr_array)
+assert loaded_sc == root_sc
 
-
-def collect_ids_and_refs(
-    ome_sc: RootSingleScale,
-) -> tuple[dict[str, BaseModel], dict[str, Ref]]:
-    models = collect_models(ome_sc.ome)
-    refs: dict[str, Ref] = {}
-    ids: dict[str, BaseModel] = {}
-    for m in models:
-        if isinstance(m, Ref):
-            refs[m.ref] = m
-        if hasattr(m, "id"):
-            id = getattr(m, "id")
-            ids[id] = m
-
-    # Ensure that all refs point to existing ids
-    for ref in refs.values():
-        if ref.ref not in ids:
-            raise ValueError(f"Reference {ref.ref} does not point to any known ID.")
-
-    return ids, refs
-
-
-ids, refs = collect_ids_and_refs(root_sc)
+graph = validate_references(root_sc.ome)
 print("Collected IDs:")
-for id in ids:
+for id in graph.ids:
     print(f" - {id}")
 print("Collected Refs:")
-for ref in refs.items():
-    print(f" - {ref}")
+for reference in graph.references:
+    print(f" - {reference.ref}")
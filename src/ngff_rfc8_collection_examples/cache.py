@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Hashable, TypeVar
+
+# asyncio is only imported by the async API, it is slow to import
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    size: int
+    maxsize: int
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with versioned entries.
+
+    Every entry is stored together with a version token of its source, e.g. a
+    file's mtime or an HTTP ETag. A lookup with a different version counts as a
+    miss and replaces the entry.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._entries: OrderedDict[Hashable, tuple[Hashable, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Loads in progress in aget_or_load, awaited by concurrent misses
+        self._pending: dict[tuple, "asyncio.Task"] = {}
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int) -> None:
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def _lookup(self, key: Hashable, version: Hashable) -> tuple[bool, object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[1]
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+            return False, None
+
+    def _store(self, key: Hashable, version: Hashable, value: object) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def get_or_load(self, key: Hashable, version: Hashable, load: Callable[[], T]) -> T:
+        """Return the cached value for key, calling load on a miss."""
+        found, value = self._lookup(key, version)
+        if found:
+            return value  # type: ignore[return-value]
+        # Load outside the lock, concurrent misses on the same key may both load
+        value = load()
+        self._store(key, version, value)
+        return value  # type: ignore[return-value]
+
+    async def aget_or_load(
+        self, key: Hashable, version: Hashable, load: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Return the cached value for key, awaiting load on a miss.
+
+        Concurrent misses on the same key and version within one event loop
+        share a single load.
+        """
+        import asyncio
+
+        found, value = self._lookup(key, version)
+        if found:
+            return value  # type: ignore[return-value]
+        pending_key = (asyncio.get_running_loop(), key, version)
+        task = self._pending.get(pending_key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._pending[pending_key] = task
+            try:
+                value = await task
+            finally:
+                del self._pending[pending_key]
+            self._store(key, version, value)
+            return value
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                invalidations=self.invalidations,
+                size=len(self._entries),
+                maxsize=self._maxsize,
+            )
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def file_version(path: Path) -> tuple[int, int] | None:
+    """Version token of a local file: its mtime and size, None if missing."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Shared by all path and reference resolution
+path_cache = LRUCache(maxsize=1024)
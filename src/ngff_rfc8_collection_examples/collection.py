@@ -1,41 +1,633 @@
+import hashlib
+import json
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Literal
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Iterable,
+    Iterator,
+    Literal,
+    Union,
+)
 
-import zarr
-from pydantic import BaseModel, Field
+from pydantic import ConfigDict, Discriminator, Field, Tag, TypeAdapter
 
 from ngff_rfc8_collection_examples.common import (
     BaseAttrs,
+    IndexedRootModel,
+    LazyNodeList,
+    Node,
     NodeModel,
+    OpaqueNode,
+    attributes_empty,
+    is_zarr_array,
+    is_zarr_group,
+    nodes_empty,
+    read_ome_document,
+    register_node_type,
+    zarr_node_version,
 )
-from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.multiscale import Multiscale, load_scale_attributes
+from ngff_rfc8_collection_examples.saving import SaveReport, save_documents
 from ngff_rfc8_collection_examples.single_scales import SingleScale
+from ngff_rfc8_collection_examples.streaming import JsonStream, iter_ome_items
+
+if TYPE_CHECKING:
+    import zarr
+    from zarr.abc.store import Store
+
+
+BUILTIN_NODE_TYPES = ("collection", "multiscale", "singlescale")
+
+
+def node_tag(value: Any) -> str:
+    """Discriminator of child nodes: their type if built in, 'other' if not."""
+    if isinstance(value, dict):
+        type = value.get("type")
+    else:
+        type = getattr(value, "type", None)
+    return type if type in BUILTIN_NODE_TYPES else "other"
 
 
-class Collection(
-    NodeModel[Literal["collection"], BaseAttrs, "Collection | Multiscale | SingleScale"]
-):
+# Built-in node types are dispatched on their 'type' field within pydantic-core;
+# other types go through the registry, see `common.register_node_type`
+ChildNode = Annotated[
+    Union[
+        Annotated["Collection", Tag("collection")],
+        Annotated[Multiscale, Tag("multiscale")],
+        Annotated[SingleScale, Tag("singlescale")],
+        Annotated[Node, Tag("other")],
+    ],
+    Discriminator(node_tag),
+]
+
+
+class Collection(NodeModel[Literal["collection"], BaseAttrs, ChildNode]):
     type: Literal["collection"] = "collection"
-    attributes: BaseAttrs = Field(default_factory=BaseAttrs)
-    nodes: list["Collection | Multiscale | SingleScale"] = Field(default_factory=list)
+    attributes: BaseAttrs = Field(
+        default_factory=BaseAttrs, exclude_if=attributes_empty
+    )
+    nodes: list[ChildNode] = Field(default_factory=list, exclude_if=nodes_empty)
 
 
 class CollectionWithVersion(Collection):
     version: Literal["0.7dev0"] = "0.7dev0"
 
 
-class RootCollection(BaseModel):
+register_node_type("collection", Collection)
+
+# Only used when streaming or lazily validating nodes, built on first use
+_node_adapter: TypeAdapter[ChildNode] = TypeAdapter(
+    ChildNode, config=ConfigDict(defer_build=True)
+)
+_scale_adapter: TypeAdapter[SingleScale] = TypeAdapter(SingleScale)
+
+CONSOLIDATED_KEY = "ome_consolidated"
+
+
+def _source_key(source: "Path | zarr.Group | zarr.Array") -> str:
+    """A key identifying a resolved file or Zarr node, used to detect cycles."""
+    if isinstance(source, Path):
+        return str(source.resolve())
+    return str(source.store_path)
+
+
+def zarr_json_version(store: "Store", path: str) -> str:
+    """Version token of the zarr.json of a node, as stored now.
+
+    The mtime and size of the file on local stores, where that is a stat
+    call, else the hash of its content.
+    """
+    version = zarr_node_version(store, path)
+    if version is not None:
+        return f"version:{json.dumps(version)}"
+    from zarr.core.buffer import default_buffer_prototype
+    from zarr.core.sync import sync
+
+    key = posixpath.join(path, "zarr.json") if path else "zarr.json"
+    buffer = sync(store.get(key, default_buffer_prototype()))
+    content = b"" if buffer is None else buffer.to_bytes()
+    return "sha256:" + hashlib.sha256(content).hexdigest()
+
+
+class ConsolidatedHashes:
+    """Versions of the descendants of a consolidated group, at consolidation.
+
+    Nodes opened from a group with consolidated metadata are served from the
+    snapshot in its zarr.json. When loading with check_consolidated=True, a
+    node whose own zarr.json changed since, see `zarr_json_version`, is read
+    again from it. This costs a request per node on remote stores.
+    """
+
+    def __init__(self, group: "zarr.Group"):
+        self.root_path = group.path
+        self.hashes: dict[str, str] = dict(group.attrs.get(CONSOLIDATED_KEY, {}))
+
+    def fresh(self, source: "zarr.Group | zarr.Array") -> "zarr.Group | zarr.Array":
+        key = posixpath.relpath(source.path or ".", self.root_path or ".")
+        recorded = self.hashes.get(key)
+        if recorded is None or recorded == zarr_json_version(source.store, source.path):
+            return source
+        import zarr
+
+        if isinstance(source, zarr.Group):
+            return zarr.open_group(
+                store=source.store, path=source.path, mode="r", use_consolidated=False
+            )
+        return zarr.open_array(store=source.store, path=source.path, mode="r")
+
+
+def _is_reference(node: NodeModel) -> bool:
+    """Whether a node only references metadata to fetch; opaque nodes never do."""
+    return node.path is not None and not isinstance(node, OpaqueNode)
+
+
+def _inline_types(types: Iterable[str] | None) -> frozenset[str] | None:
+    return None if types is None else frozenset(types)
+
+
+def _fetches(node: NodeModel, inline_types: frozenset[str] | None) -> bool:
+    """Whether a referenced node is fetched, by its type; all are if None."""
+    return _is_reference(node) and (inline_types is None or node.type in inline_types)
+
+
+def _build_node(
+    data: dict, context: Path | None = None
+) -> "Collection | Multiscale | SingleScale":
+    """Validate a streamed node whose nodes were already validated."""
+    return _node_adapter.validate_python(data, context=context)
+
+
+def _check_document(node: "Collection | Multiscale", data: dict) -> None:
+    assert node.path is not None
+    if data.get("type") != node.type:
+        raise ValueError(
+            f"Node '{node.id}' is a {node.type}, but '{node.path.path}' "
+            f"contains a {data.get('type')}."
+        )
+    if data.get("id") != node.id:
+        raise ValueError(
+            f"ID mismatch: expected '{node.id}', found '{data.get('id')}'."
+        )
+
+
+def _fetch_document(
+    node: "Collection | Multiscale",
+    hashes: ConsolidatedHashes | None = None,
+) -> tuple[str, dict, "Path | zarr.Group | zarr.Array"]:
+    """Read the 'ome' metadata a path-referenced node points to."""
+    assert node.path is not None
+    source = node.path.resolve_path()
+    if hashes is not None and not isinstance(source, Path):
+        source = hashes.fresh(source)
+    data = read_ome_document(source)
+    _check_document(node, data)
+    return _source_key(source), data, source
+
+
+def _resolved_scale(
+    node: SingleScale, source: "Path | zarr.Group | zarr.Array"
+) -> SingleScale:
+    assert is_zarr_array(source)
+    resolved = node.model_copy()
+    load_scale_attributes(resolved, source)
+    return resolved
+
+
+def _resolved_node(
+    node: "Collection | Multiscale",
+    data: dict,
+    source: "Path | zarr.Group | zarr.Array",
+) -> "Collection | Multiscale":
+    resolved = type(node).model_validate(data, context=source)
+    if is_zarr_group(source):
+        resolved._document = source
+    return resolved
+
+
+def _fetch_node(
+    node: "Collection | Multiscale | SingleScale",
+    hashes: ConsolidatedHashes | None = None,
+) -> tuple[str, "Collection | Multiscale | SingleScale"]:
+    """Fetch the metadata a path-referenced node points to."""
+    assert node.path is not None
+    if isinstance(node, SingleScale):
+        source = node.path.resolve_path()
+        if hashes is not None:
+            source = hashes.fresh(source)
+        return _source_key(source), _resolved_scale(node, source)
+    key, data, source = _fetch_document(node, hashes)
+    return key, _resolved_node(node, data, source)
+
+
+async def _afetch_node(
+    node: "Collection | Multiscale | SingleScale",
+    hashes: ConsolidatedHashes | None = None,
+) -> tuple[str, "Collection | Multiscale | SingleScale"]:
+    """Async version of `_fetch_node`."""
+    import asyncio
+
+    assert node.path is not None
+    source = await node.path.aresolve_path()
+    if isinstance(source, Path):
+        data = await asyncio.to_thread(read_ome_document, source)
+        key = await asyncio.to_thread(_source_key, source)
+    else:
+        if hashes is not None:
+            source = await asyncio.to_thread(hashes.fresh, source)
+        if isinstance(node, SingleScale):
+            return _source_key(source), _resolved_scale(node, source)
+        data = read_ome_document(source)
+        key = _source_key(source)
+    assert not isinstance(node, SingleScale)
+    _check_document(node, data)
+    return key, _resolved_node(node, data, source)
+
+
+def _inline_node(
+    node: "Collection | Multiscale | SingleScale",
+    resolved: "Collection | Multiscale | SingleScale",
+) -> None:
+    """Inline a fetched node into its path-referenced stub.
+
+    The node takes the attributes of the fetched document; those set on the
+    stub are kept apart, to be written back to the stub on save. A scale
+    takes the attributes of its array merged with those of the stub, see
+    `load_scale_attributes`. Paths to JSON documents are dropped once
+    inlined, while Zarr paths are kept since they point to the data of the
+    node. A node fetched from a Zarr group or array remembers it as its
+    document.
+    """
+    assert node.path is not None
+    if not isinstance(node, SingleScale):
+        node._stub_attributes = node.attributes.model_dump(exclude_none=True)
+        node.nodes = resolved.nodes
+    else:
+        node._stub_attributes = resolved._stub_attributes
+    node.attributes = resolved.attributes
+    node._document = resolved._document
+    if node.name is None:
+        node.name = resolved.name
+    if node.path.type == "json":
+        node.path = None
+
+
+def expand_nodes(
+    root: "Collection",
+    root_key: str | None = None,
+    max_workers: int = 1,
+    hashes: ConsolidatedHashes | None = None,
+    inline_types: frozenset[str] | None = None,
+) -> None:
+    """Resolve all path-referenced nodes below root in place.
+
+    The tree is walked breadth-first and the references of each level are
+    fetched concurrently, at most max_workers at a time. A reference back to a
+    document that is already being expanded on the same branch raises. If
+    inline_types is given, only references to nodes of these types are
+    fetched; the others are kept as references.
+    """
+    ancestors = frozenset() if root_key is None else frozenset([root_key])
+    level = [(child, ancestors) for child in root.nodes]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            pending = [
+                (node, keys) for node, keys in level if _fetches(node, inline_types)
+            ]
+            fetched = executor.map(lambda item: _fetch_node(item[0], hashes), pending)
+            expanded: dict[int, frozenset[str]] = {}
+            for (node, keys), (key, resolved) in zip(pending, fetched):
+                if key in keys:
+                    raise ValueError(
+                        f"Cycle detected: node '{node.id}' references '{key}', "
+                        "which is one of its ancestors."
+                    )
+                _inline_node(node, resolved)
+                expanded[id(node)] = keys | {key}
+            level = [
+                (child, expanded.get(id(node), keys))
+                for node, keys in level
+                for child in node.nodes
+                if child is not None
+            ]
+
+
+async def aexpand_nodes(
+    root: "Collection",
+    root_key: str | None = None,
+    hashes: ConsolidatedHashes | None = None,
+    inline_types: frozenset[str] | None = None,
+) -> None:
+    """Async version of `expand_nodes`.
+
+    All references of a level are fetched concurrently on the event loop.
+    """
+    import asyncio
+
+    ancestors = frozenset() if root_key is None else frozenset([root_key])
+    level = [(child, ancestors) for child in root.nodes]
+    while level:
+        pending = [(node, keys) for node, keys in level if _fetches(node, inline_types)]
+        fetched = await asyncio.gather(
+            *(_afetch_node(node, hashes) for node, _ in pending)
+        )
+        expanded: dict[int, frozenset[str]] = {}
+        for (node, keys), (key, resolved) in zip(pending, fetched):
+            if key in keys:
+                raise ValueError(
+                    f"Cycle detected: node '{node.id}' references '{key}', "
+                    "which is one of its ancestors."
+                )
+            _inline_node(node, resolved)
+            expanded[id(node)] = keys | {key}
+        level = [
+            (child, expanded.get(id(node), keys))
+            for node, keys in level
+            for child in node.nodes
+            if child is not None
+        ]
+
+
+def _validate_lazy_node(
+    data: dict,
+    context: "Path | zarr.Group | zarr.Array | None",
+    resolve: bool = False,
+    hashes: ConsolidatedHashes | None = None,
+    ancestors: frozenset[str] = frozenset(),
+    adapter: TypeAdapter = _node_adapter,
+    inline_types: frozenset[str] | None = None,
+) -> "Collection | Multiscale | SingleScale":
+    """Validate a node, deferring the validation of its children to first access.
+
+    With resolve=True a path-referenced node is also fetched and inlined, and
+    so are its children in turn when they are accessed; only nodes of
+    inline_types are, if given.
+    """
+    raw_nodes = data.get("nodes") or []
+    node = adapter.validate_python({**data, "nodes": []}, context=context)
+    if raw_nodes:
+        node.nodes = _lazy_nodes(
+            node, raw_nodes, context, resolve, hashes, ancestors, inline_types
+        )
+    if resolve and _fetches(node, inline_types):
+        if isinstance(node, SingleScale):
+            _, resolved = _fetch_node(node, hashes)
+        else:
+            key, data, source = _fetch_document(node, hashes)
+            if key in ancestors:
+                raise ValueError(
+                    f"Cycle detected: node '{node.id}' references '{key}', "
+                    "which is one of its ancestors."
+                )
+            resolved = _validate_lazy_node(
+                data,
+                source,
+                resolve,
+                hashes,
+                ancestors | {key},
+                inline_types=inline_types,
+            )
+            if is_zarr_group(source):
+                resolved._document = source
+        _inline_node(node, resolved)
+    return node
+
+
+def _lazy_nodes(
+    parent: "Collection | Multiscale",
+    raw_nodes: list,
+    context: "Path | zarr.Group | zarr.Array | None",
+    resolve: bool,
+    hashes: ConsolidatedHashes | None,
+    ancestors: frozenset[str],
+    inline_types: frozenset[str] | None = None,
+) -> LazyNodeList:
+    adapter = _scale_adapter if isinstance(parent, Multiscale) else _node_adapter
+    validate = partial(
+        _validate_lazy_node,
+        context=context,
+        resolve=resolve,
+        hashes=hashes,
+        ancestors=ancestors,
+        adapter=adapter,
+        inline_types=inline_types,
+    )
+    return LazyNodeList(raw_nodes, validate)
+
+
+def consolidate_collection(group: "zarr.Group") -> None:
+    """Write a snapshot of all descendant metadata into the group's zarr.json.
+
+    The snapshot is Zarr's consolidated metadata; next to it, the version of
+    the zarr.json of every descendant is recorded in the group attributes.
+    Loads trust the snapshot, unless asked to check it, see
+    `ConsolidatedHashes`; re-run after modifying descendants by other means
+    than `RootCollection.save`, which refreshes it.
+    """
+    import zarr
+
+    fresh = zarr.open_group(
+        store=group.store, path=group.path, mode="r", use_consolidated=False
+    )
+    hashes = {
+        name: zarr_json_version(member.store, member.path)
+        for name, member in fresh.members(max_depth=None)
+    }
+    group.attrs.update({CONSOLIDATED_KEY: hashes})
+    zarr.consolidate_metadata(group.store, path=group.path)
+
+
+class RootCollection(IndexedRootModel):
     ome: CollectionWithVersion
 
     @classmethod
-    def from_zarr(cls, group: zarr.Group) -> "RootCollection":
-        return cls.model_validate(group.attrs, context=group)
+    def from_zarr(cls, group: "zarr.Group", lazy: bool = False) -> "RootCollection":
+        if lazy:
+            model = cls._from_lazy_data(dict(group.attrs), group)
+        else:
+            model = cls.model_validate(group.attrs, context=group)
+        model.ome._document = group
+        return model
+
+    @classmethod
+    async def afrom_zarr(
+        cls,
+        group: "zarr.Group | str",
+        deep: bool = False,
+        inline_types: Iterable[str] | None = None,
+        check_consolidated: bool = False,
+    ) -> "RootCollection":
+        """Load a collection from a Zarr group or store URL without blocking.
+
+        With deep=True the path-referenced nodes are fetched and inlined as in
+        `load`, each level concurrently, see `aexpand_nodes`.
+        """
+        import zarr
+        import zarr.api.asynchronous
+
+        from ngff_rfc8_collection_examples.stores import store_pool
+
+        if not isinstance(group, zarr.Group):
+            store = store_pool.get(group, read_only=True)
+            group = zarr.Group(
+                await zarr.api.asynchronous.open_group(store=store, mode="r")
+            )
+        data = dict(group.attrs)
+        model = cls.model_validate(data, context=group)
+        if deep:
+            hashes = None
+            if check_consolidated and CONSOLIDATED_KEY in data:
+                hashes = ConsolidatedHashes(group)
+            await aexpand_nodes(
+                model.ome,
+                _source_key(group),
+                hashes=hashes,
+                inline_types=_inline_types(inline_types),
+            )
+            model.invalidate_index()
+        model.ome._document = group
+        return model
 
     @classmethod
     def from_json(
-        cls, json_data: dict, context: None | Path = None
+        cls, json_data: dict, context: None | Path = None, lazy: bool = False
     ) -> "RootCollection":
+        """Load a collection from JSON data.
+
+        With lazy=True only the root node is validated up front, its nodes are
+        validated when first accessed, see `LazyNodeList`.
+        """
+        if lazy:
+            return cls._from_lazy_data(json_data, context)
         return cls.model_validate(json_data, context=context)
 
-    def to_zarr(self, zarr_array: zarr.Group):
+    @classmethod
+    def _from_lazy_data(
+        cls,
+        data: dict,
+        context: "Path | zarr.Group | None",
+        resolve: bool = False,
+        hashes: ConsolidatedHashes | None = None,
+        root_key: str | None = None,
+        inline_types: frozenset[str] | None = None,
+    ) -> "RootCollection":
+        ome = dict(data["ome"])
+        raw_nodes = ome.pop("nodes", None) or []
+        model = cls.model_validate({**data, "ome": ome}, context=context)
+        ancestors = frozenset() if root_key is None else frozenset([root_key])
+        model.ome.nodes = _lazy_nodes(
+            model.ome, raw_nodes, context, resolve, hashes, ancestors, inline_types
+        )
+        return model
+
+    @classmethod
+    def from_json_stream(
+        cls, fp: IO[str] | IO[bytes], context: None | Path = None
+    ) -> "RootCollection":
+        """Load a collection from a JSON text or byte stream.
+
+        Nodes at every depth are validated as soon as they are read, see
+        `streaming.read_node`, so the raw document is never held in memory as
+        a whole.
+        """
+        fields: dict = {}
+        nodes: list[Collection | Multiscale | SingleScale] = []
+        build_node = partial(_build_node, context=context)
+        for key, value in iter_ome_items(JsonStream(fp), build_node=build_node):
+            if key == "node":
+                nodes.append(value)
+            else:
+                fields[key] = value
+        ome = CollectionWithVersion.model_validate(fields, context=context)
+        ome.nodes = nodes
+        return cls(ome=ome)
+
+    @classmethod
+    def iter_json_nodes(
+        cls, fp: IO[str] | IO[bytes], context: None | Path = None
+    ) -> Iterator["Collection | Multiscale | SingleScale"]:
+        """Yield the top-level nodes of a JSON collection one at a time.
+
+        Each node is validated with its descendants as they are read, as in
+        `from_json_stream`.
+        """
+        build_node = partial(_build_node, context=context)
+        for key, value in iter_ome_items(JsonStream(fp), build_node=build_node):
+            if key == "node":
+                yield value
+
+    @classmethod
+    def load(
+        cls,
+        source: "zarr.Group | Path",
+        deep: bool = True,
+        max_workers: int = 1,
+        lazy: bool = False,
+        inline_types: Iterable[str] | None = None,
+        check_consolidated: bool = False,
+    ) -> "RootCollection":
+        """Load a collection from a Zarr group or a JSON file.
+
+        With deep=True every path-referenced collection, multiscale and single
+        scale below the root is fetched and inlined, see `expand_nodes`. Pass
+        inline_types, e.g. ["collection"], to only fetch nodes of these types;
+        references to other nodes, such as multiscales stored in OME-Zarr
+        images without RFC 8 metadata, are kept as they are. If the group was
+        written with `to_zarr(consolidate=True)`, the descendants are served
+        from its consolidated snapshot instead of being read one by one. With
+        check_consolidated=True, descendants changed since the snapshot was
+        taken are read again, see `ConsolidatedHashes`.
+
+        With lazy=True nodes are validated, and with deep=True fetched, only
+        when they are first accessed, and max_workers is not used.
+        """
+        hashes = None
+        types = _inline_types(inline_types)
+        if is_zarr_group(source):
+            data = dict(source.attrs)
+            if check_consolidated and CONSOLIDATED_KEY in data:
+                hashes = ConsolidatedHashes(source)
+        else:
+            with open(source, "r") as f:
+                data = json.load(f)
+        if lazy:
+            model = cls._from_lazy_data(
+                data,
+                source,
+                resolve=deep,
+                hashes=hashes,
+                root_key=_source_key(source),
+                inline_types=types,
+            )
+        else:
+            model = cls.model_validate(data, context=source)
+            if deep:
+                expand_nodes(
+                    model.ome,
+                    _source_key(source),
+                    max_workers=max_workers,
+                    hashes=hashes,
+                    inline_types=types,
+                )
+                model.invalidate_index()
+        if is_zarr_group(source):
+            model.ome._document = source
+        return model
+
+    def to_zarr(self, zarr_array: "zarr.Group", consolidate: bool = False):
         zarr_array.attrs.update(self.model_dump(exclude_none=True))
+        if consolidate:
+            consolidate_collection(zarr_array)
+
+    def save(self, group: "zarr.Group | None" = None) -> SaveReport:
+        """Write the metadata documents that changed since loading or last save.
+
+        Collections and multiscales that were fetched from Zarr groups of their
+        own are saved back to them, see `save_documents`.
+        """
+        return save_documents(self, group)
@@ -1,22 +1,46 @@
+import hashlib
 import json
+import sys
 import uuid
 from pathlib import Path
-from typing import Generic, Literal, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    Iterator,
+    Literal,
+    NamedTuple,
+    SupportsIndex,
+    TypeVar,
+    Union,
+)
 
-import urllib3.util
-import zarr
 from pydantic import (
     AliasChoices,
     BaseModel,
+    ConfigDict,
+    Discriminator,
     Field,
+    PlainValidator,
     PrivateAttr,
-    model_serializer,
+    Tag,
+    ValidationInfo,
     model_validator,
 )
 
-from ngff_rfc8_collection_examples.pydantic_tools import collect_ids
+from ngff_rfc8_collection_examples.cache import file_version, path_cache
+from ngff_rfc8_collection_examples.pydantic_tools import collect_ids, iter_models
+
+# zarr is only imported once a Zarr path is resolved, it is slow to import
+if TYPE_CHECKING:
+    import zarr
+    from zarr.abc.store import Store
 
-url = urllib3.util.parse_url("https://example.com")
+    from ngff_rfc8_collection_examples.transforms import TransformEngine
 
 
 def random_id() -> str:
@@ -24,29 +48,197 @@ def random_id() -> str:
     return str(uuid.uuid4())
 
 
-def resolve_zarr_path(
-    path: str, context: zarr.Group | None = None
-) -> zarr.Group | zarr.Array:
-    """Resolve a path within a Zarr store."""
-    print("Resolving Zarr path:", path, "with context:", context)
-    if context is None:
-        group = zarr.open_group(store=path, mode="a")
-        return group
-    elif not isinstance(context, zarr.Group):
+def is_zarr_group(obj: object) -> bool:
+    """Whether obj is a zarr.Group, without importing zarr."""
+    zarr = sys.modules.get("zarr")
+    return zarr is not None and isinstance(obj, zarr.Group)
+
+
+def is_zarr_array(obj: object) -> bool:
+    """Whether obj is a zarr.Array, without importing zarr."""
+    zarr = sys.modules.get("zarr")
+    return zarr is not None and isinstance(obj, zarr.Array)
+
+
+def is_zarr_node(obj: object) -> bool:
+    """Whether obj is a zarr.Group or zarr.Array, without importing zarr."""
+    zarr = sys.modules.get("zarr")
+    return zarr is not None and isinstance(obj, (zarr.Group, zarr.Array))
+
+
+def zarr_node_version(store: object, path: str) -> Hashable:
+    """Version token of a Zarr node, from the stat or HTTP headers of its zarr.json.
+
+    None on stores that offer neither; nodes read from them are never stale.
+    """
+    from zarr.storage import LocalStore
+
+    from ngff_rfc8_collection_examples.stores import HTTPStore
+
+    if isinstance(store, LocalStore):
+        return file_version(Path(store.root) / path / "zarr.json")
+    if isinstance(store, HTTPStore):
+        return store.version(f"{path}/zarr.json" if path else "zarr.json")
+    return None
+
+
+class _ZarrTarget(NamedTuple):
+    """A Zarr node a path points to, relative to a context group."""
+
+    store: "Store"
+    path: str
+    # Path below the context group, None if the node is not a descendant
+    relative: str | None
+    key: Hashable
+    version: Hashable
+
+
+def _zarr_target(path: str, context: "zarr.Group") -> _ZarrTarget:
+    from ngff_rfc8_collection_examples.stores import locate, root_uri, store_pool
+
+    if not is_zarr_group(context):
         raise TypeError("Context must be a zarr.Group or None.")
-    
-    # Remove leading './' if present
-    path = path.lstrip("./")
-    if path.startswith("../"):
-        raise ValueError("Not supported yet")
-    group = context.get(path, None)
-    if group is None:
+    store, node_path = locate(path, context, store_pool)
+    relative = None
+    if store is store_pool.add(context.store):
+        base = context.path
+        if not base:
+            relative = node_path
+        elif node_path == base or node_path.startswith(base + "/"):
+            relative = node_path[len(base) + 1 :]
+    # Descendants are read through the context group, from its consolidated
+    # metadata if it has any; they are cached apart from fresh reads
+    consolidated = (
+        relative is not None and context.metadata.consolidated_metadata is not None
+    )
+    key = ("zarr", f"{root_uri(store)}/{node_path}", consolidated, store.read_only)
+    return _ZarrTarget(
+        store, node_path, relative, key, zarr_node_version(store, node_path)
+    )
+
+
+def resolve_zarr_path(
+    path: str, context: "zarr.Group | None" = None
+) -> "zarr.Group | zarr.Array":
+    """Resolve a path within a Zarr store.
+
+    Without a context, or if path is a URL, path is the local path or URL of
+    a store. Otherwise it is relative to the context group, see
+    `stores.locate`. Stores are kept open in `store_pool` and resolved nodes
+    are cached in `path_cache`, keyed on their URI.
+    """
+    import zarr
+
+    from ngff_rfc8_collection_examples.stores import (
+        is_url,
+        open_node,
+        root_uri,
+        store_pool,
+    )
+
+    if context is None or is_url(path):
+        store = store_pool.get(path)
+        return path_cache.get_or_load(
+            ("zarr", root_uri(store), "", store.read_only),
+            zarr_node_version(store, ""),
+            lambda: zarr.open_group(store=store, mode="r" if store.read_only else "a"),
+        )
+    target = _zarr_target(path, context)
+
+    def load() -> "zarr.Group | zarr.Array | None":
+        if target.relative == "":
+            return context
+        if target.relative is not None:
+            return context.get(target.relative, None)
+        return open_node(target.store, target.path)
+
+    node = path_cache.get_or_load(target.key, target.version, load)
+    if node is None:
         raise ValueError(f"Path '{path}' not found in the given Zarr group context.")
-    return group
+    return node
+
+
+async def aresolve_zarr_path(
+    path: str, context: "zarr.Group | None" = None
+) -> "zarr.Group | zarr.Array":
+    """Async version of `resolve_zarr_path`.
+
+    Metadata is read through zarr's async API, so many paths can be resolved
+    concurrently on one event loop. Shares `path_cache` with the sync version.
+    """
+    import asyncio
+
+    import zarr
+    import zarr.api.asynchronous
+
+    from ngff_rfc8_collection_examples.stores import (
+        aopen_node,
+        is_url,
+        root_uri,
+        store_pool,
+    )
+
+    if context is None or is_url(path):
+        store = store_pool.get(path)
+
+        async def open_root() -> zarr.Group:
+            mode = "r" if store.read_only else "a"
+            group = await zarr.api.asynchronous.open_group(store=store, mode=mode)
+            return zarr.Group(group)
+
+        version = await asyncio.to_thread(zarr_node_version, store, "")
+        return await path_cache.aget_or_load(
+            ("zarr", root_uri(store), "", store.read_only), version, open_root
+        )
+
+    target = await asyncio.to_thread(_zarr_target, path, context)
+
+    async def load() -> "zarr.Group | zarr.Array | None":
+        if target.relative == "":
+            return context
+        if target.relative is None or context.metadata.consolidated_metadata is None:
+            return await aopen_node(target.store, target.path)
+        # Descendants listed in the context's consolidated metadata are read
+        # from it, as `zarr.Group.get` does
+        group = zarr.AsyncGroup(
+            metadata=context.metadata, store_path=context.store_path
+        )
+        try:
+            node = await group.getitem(target.relative)
+        except KeyError:
+            return None
+        if isinstance(node, zarr.AsyncGroup):
+            return zarr.Group(node)
+        return zarr.Array(node)
+
+    node = await path_cache.aget_or_load(target.key, target.version, load)
+    if node is None:
+        raise ValueError(f"Path '{path}' not found in the given Zarr group context.")
+    return node
+
+
+def _store_url(path: str, context: Path) -> str:
+    """Location of a Zarr path referenced from a JSON file."""
+    from ngff_rfc8_collection_examples.stores import is_url
+
+    if is_url(path) or Path(path).is_absolute():
+        return path
+    return str(context.parent / path)
+
+
+def _existing_path(path: Path) -> Path:
+    full_path = path.resolve()
+    if not full_path.exists():
+        raise ValueError(f"Resolved path '{full_path}' does not exist.")
+    return full_path
 
 
 def resolve_local_path(path: str, context: Path | None = None) -> Path:
-    """Resolve a local filesystem path."""
+    """Resolve a local filesystem path.
+
+    Resolved paths are cached once they were found to exist; a file deleted
+    later fails when it is read rather than here.
+    """
     if context is None:
         # Path needs to be an absolute path
         path_obj = Path(path)
@@ -55,67 +247,673 @@ def resolve_local_path(path: str, context: Path | None = None) -> Path:
                 f"Path '{path}' is not absolute and cannot be resolved without context."
             )
         return path_obj
-    full_path = (context.parent / path).resolve()
-    if not full_path.exists():
-        raise ValueError(f"Resolved path '{full_path}' does not exist.")
-    return full_path
+    return path_cache.get_or_load(
+        ("local", str(context.parent), path),
+        None,
+        lambda: _existing_path(context.parent / path),
+    )
+
+
+async def aresolve_local_path(path: str, context: Path | None = None) -> Path:
+    """Async version of `resolve_local_path`, stat calls run in a thread."""
+    import asyncio
+
+    return await asyncio.to_thread(resolve_local_path, path, context)
+
+
+def _resolve_json(path: str, context: Path | None) -> Path:
+    if is_zarr_group(context):
+        raise TypeError("Filesystem path cannot be resolved with a Zarr context.")
+    return resolve_local_path(path, context=context)
+
+
+async def _aresolve_json(path: str, context: Path | None) -> Path:
+    if is_zarr_group(context):
+        raise TypeError("Filesystem path cannot be resolved with a Zarr context.")
+    return await aresolve_local_path(path, context=context)
+
+
+def _resolve_zarr(
+    path: str, context: "zarr.Group | Path | None"
+) -> "zarr.Group | zarr.Array":
+    # From a JSON file, paths are store locations relative to the file
+    if isinstance(context, Path):
+        return resolve_zarr_path(_store_url(path, context))
+    return resolve_zarr_path(path, context)
 
 
-class PathRefJson(BaseModel):
+async def _aresolve_zarr(
+    path: str, context: "zarr.Group | Path | None"
+) -> "zarr.Group | zarr.Array":
+    if isinstance(context, Path):
+        return await aresolve_zarr_path(_store_url(path, context))
+    return await aresolve_zarr_path(path, context)
+
+
+class Resolver(NamedTuple):
+    """Functions resolving a path against the context it was loaded in."""
+
+    resolve: Callable[[str, Any], Any]
+    aresolve: Callable[[str, Any], Awaitable[Any]]
+
+
+# Resolvers by path type and URL scheme; '' is the scheme of plain paths and
+# '*' matches any scheme without a resolver of its own
+_resolvers: dict[tuple[str, str], Resolver] = {
+    ("json", ""): Resolver(_resolve_json, _aresolve_json),
+    ("zarr", "*"): Resolver(_resolve_zarr, _aresolve_zarr),
+}
+
+
+def url_scheme(path: str) -> str:
+    """The lower-case URL scheme of path, '' if it is not a URL."""
+    scheme, separator, _ = path.partition("://")
+    return scheme.lower() if separator else ""
+
+
+def register_resolver(
+    type: str,
+    scheme: str,
+    resolve: Callable[[str, Any], Any],
+    aresolve: Callable[[str, Any], Awaitable[Any]] | None = None,
+) -> None:
+    """Resolve paths of a type and URL scheme with resolve(path, context).
+
+    aresolve is the async version of resolve; by default resolve is run in a
+    worker thread.
+    """
+    if aresolve is None:
+
+        async def aresolve(path: str, context: Any) -> Any:
+            import asyncio
+
+            return await asyncio.to_thread(resolve, path, context)
+
+    key = (type, scheme.lower())
+    registered = _resolvers.get(key)
+    if registered is not None and registered.resolve is not resolve:
+        raise ValueError(f"A resolver for {type} paths with scheme '{scheme}' exists.")
+    _resolvers[key] = Resolver(resolve, aresolve)
+
+
+def resolver(type: str, path: str) -> Resolver:
+    """The resolver registered for paths of a type, by the scheme of path."""
+    scheme = url_scheme(path)
+    found = _resolvers.get((type, scheme)) or _resolvers.get((type, "*"))
+    if found is None:
+        raise ValueError(f"No resolver for {type} paths with scheme '{scheme}'.")
+    return found
+
+
+def resolve_path(type: str, path: str, context: Any = None) -> Any:
+    """Resolve a path of a type, see `register_resolver`."""
+    return resolver(type, path).resolve(path, context)
+
+
+async def aresolve_path(type: str, path: str, context: Any = None) -> Any:
+    """Async version of `resolve_path`."""
+    return await resolver(type, path).aresolve(path, context)
+
+
+class StatefulModel(BaseModel):
+    """Model whose private attributes only hold caches and loading state.
+
+    They are left out when comparing models: two models are equal if their
+    fields are, however they were loaded or used since.
+
+    Models also track whether they changed since they were last saved, see
+    `mark_saved`. Assigning a field marks the model and the models holding
+    it as changed. The tracking state is kept in slots rather than private
+    attributes, which cost nothing until a model is saved and are not copied.
+    """
+
+    __slots__ = ("_parent", "_saved")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return (
+            type(self) is type(other)
+            and self.__dict__ == other.__dict__
+            and self.__pydantic_extra__ == other.__pydantic_extra__
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self._mark_changed()
+
+    @property
+    def is_saved(self) -> bool:
+        """Whether the model is unchanged since it was last saved."""
+        return getattr(self, "_saved", False)
+
+    def _mark_changed(self) -> None:
+        # Models holding a changed model have changed too; stop at the first
+        # one already known to have, whose holders have been marked then
+        model: StatefulModel | None = self
+        while model is not None and model.is_saved:
+            object.__setattr__(model, "_saved", False)
+            model = getattr(model, "_parent", None)
+
+
+class PathRefJson(StatefulModel):
     type: Literal["json"] = "json"
     path: str
     _context: Path | None = PrivateAttr(default=None)
 
-    @model_validator(mode="after")
-    def set_context(self, info):
-        self._context = info.context
-        return self
+    @model_validator(mode="wrap")
+    @classmethod
+    def set_context(cls, data, handler, info):
+        # Paths passed as models keep the context they were validated with
+        if isinstance(data, cls):
+            return data
+        path = handler(data)
+        path._context = info.context
+        return path
 
     def resolve_path(self) -> Path:
-        if isinstance(self._context, zarr.Group):
-            raise TypeError("Filesystem path cannot be resolved with a Zarr context.")
-        return resolve_local_path(self.path, context=self._context)
+        return resolve_path(self.type, self.path, self._context)
 
+    async def aresolve_path(self) -> Path:
+        return await aresolve_path(self.type, self.path, self._context)
 
-class PathRefZarr(BaseModel):
+
+class PathRefZarr(StatefulModel):
     type: Literal["zarr"] = "zarr"
     path: str
-    _context: zarr.Group | Path | None = PrivateAttr(default=None)
+    _context: "zarr.Group | Path | None" = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def set_context(cls, data, handler, info):
+        # Paths passed as models keep the context they were validated with
+        if isinstance(data, cls):
+            return data
+        path = handler(data)
+        path._context = info.context
+        return path
+
+    def resolve_path(self) -> "zarr.Group | zarr.Array":
+        return resolve_path(self.type, self.path, self._context)
+
+    async def aresolve_path(self) -> "zarr.Group | zarr.Array":
+        return await aresolve_path(self.type, self.path, self._context)
+
+
+class PathRefOther(StatefulModel):
+    """Path of any other type, resolved by the resolver registered for it.
+
+    See `register_resolver`; resolving a path of a type without a resolver
+    raises.
+    """
+
+    type: str
+    path: str
+    _context: Any = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def set_context(cls, data, handler, info):
+        # Paths passed as models keep the context they were validated with
+        if isinstance(data, cls):
+            return data
+        path = handler(data)
+        path._context = info.context
+        return path
+
+    def resolve_path(self) -> Any:
+        return resolve_path(self.type, self.path, self._context)
+
+    async def aresolve_path(self) -> Any:
+        return await aresolve_path(self.type, self.path, self._context)
+
+
+def path_tag(value: Any) -> str:
+    """Discriminator of paths: their type if built in, 'other' if not."""
+    if isinstance(value, dict):
+        type = value.get("type")
+    else:
+        type = getattr(value, "type", None)
+    return type if type in ("json", "zarr") else "other"
+
+
+PathRef = Annotated[
+    Union[
+        Annotated[PathRefJson, Tag("json")],
+        Annotated[PathRefZarr, Tag("zarr")],
+        Annotated[PathRefOther, Tag("other")],
+    ],
+    Discriminator(path_tag),
+]
+
+
+class LazyNodeList(list):
+    """List of nodes validated only when they are first accessed.
+
+    The list holds the raw node data. Reading an item validates it and stores
+    the node in place of the raw data, so every node is validated at most once.
+    Operations that need all items, such as comparison, sorting or
+    serialization, materialise the whole list; concatenating or repeating it
+    gives a plain list of validated nodes.
+    """
+
+    def __init__(self, raw_nodes: list, validate: Callable[[Any], BaseModel]):
+        super().__init__(raw_nodes)
+        self._validate = validate
+
+    def _materialize(self, index: int) -> Any:
+        item = super().__getitem__(index)
+        if isinstance(item, dict):
+            item = self._validate(item)
+            super().__setitem__(index, item)
+        return item
+
+    def materialize(self) -> None:
+        """Validate all remaining raw nodes."""
+        for i in range(len(self)):
+            self._materialize(i)
+
+    @property
+    def materialized(self) -> bool:
+        return not any(isinstance(item, dict) for item in super().__iter__())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(len(self))[index]]
+        return self._materialize(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self)):
+            yield self._materialize(i)
+
+    def __reversed__(self) -> Iterator[Any]:
+        for i in reversed(range(len(self))):
+            yield self._materialize(i)
+
+    def __contains__(self, item: object) -> bool:
+        return any(node == item for node in self)
+
+    def __eq__(self, other: object) -> bool:
+        self.materialize()
+        return super().__eq__(other)
+
+    def __ne__(self, other: object) -> bool:
+        self.materialize()
+        return super().__ne__(other)
+
+    def __lt__(self, other: list) -> bool:
+        self.materialize()
+        return super().__lt__(other)
+
+    def __le__(self, other: list) -> bool:
+        self.materialize()
+        return super().__le__(other)
+
+    def __gt__(self, other: list) -> bool:
+        self.materialize()
+        return super().__gt__(other)
+
+    def __ge__(self, other: list) -> bool:
+        self.materialize()
+        return super().__ge__(other)
+
+    # New lists hold validated nodes only
+    def __add__(self, other: list) -> list:
+        return list(self) + other
+
+    def __radd__(self, other: list) -> list:
+        return other + list(self)
+
+    def __mul__(self, n: SupportsIndex) -> list:
+        return list(self) * n
+
+    def __rmul__(self, n: SupportsIndex) -> list:
+        return list(self) * n
+
+    def __imul__(self, n: SupportsIndex) -> "LazyNodeList":
+        self.materialize()
+        return super().__imul__(n)
 
-    @model_validator(mode="after")
-    def set_context(self, info):
-        self._context = info.context
-        return self
+    def sort(self, *args, **kwargs) -> None:
+        self.materialize()
+        super().sort(*args, **kwargs)
 
-    def resolve_path(self) -> zarr.Group | zarr.Array:
-        if isinstance(self._context, Path):
-            raise TypeError("Zarr path cannot be resolved with a filesystem context.")
-        return resolve_zarr_path(self.path, self._context)
+    def __repr__(self) -> str:
+        self.materialize()
+        return super().__repr__()
 
+    def index(self, *args) -> int:
+        self.materialize()
+        return super().index(*args)
+
+    def count(self, item: object) -> int:
+        self.materialize()
+        return super().count(item)
+
+    def remove(self, item: object) -> None:
+        self.materialize()
+        super().remove(item)
+
+    def pop(self, index: int = -1) -> Any:
+        item = self._materialize(index)
+        super().pop(index)
+        return item
+
+    def copy(self) -> list:
+        return list(self)
 
-PathRef = PathRefJson | PathRefZarr
 
 NodeType = TypeVar("NodeType", bound=str)
 AttrType = TypeVar("AttrType", bound=BaseModel)
 NodesType = TypeVar("NodesType", bound=BaseModel | None)
 
 
-class NodeModel(BaseModel, Generic[NodeType, AttrType, NodesType]):
+def nodes_empty(nodes: list) -> bool:
+    """Serialization exclude rule for the 'nodes' field of a node.
+
+    Lazy node lists are validated here, before the serializer reads their items.
+    """
+    if isinstance(nodes, LazyNodeList):
+        nodes.materialize()
+    return len(nodes) == 0
+
+
+def attributes_empty(attributes: BaseModel) -> bool:
+    """Serialization exclude rule for the 'attributes' field of a node."""
+    is_empty = getattr(attributes, "is_empty", None)
+    return is_empty is not None and is_empty()
+
+
+class NodeModel(StatefulModel, Generic[NodeType, AttrType, NodesType]):
+    """Base class of all nodes.
+
+    Empty 'attributes' and 'nodes' are left out when serializing. Subclasses
+    redefining these fields keep that by passing the `attributes_empty` and
+    `nodes_empty` exclude rules to their Field.
+
+    A node loaded from a Zarr group of its own remembers that group, so that
+    its metadata can be saved back to it, see `saving.save_documents`, and the
+    attributes of the stub that referenced it, which are saved to the stub.
+    """
+
     id: str = Field(default_factory=random_id)
     type: NodeType
     name: str | None = None
     path: PathRef | None = None
-    attributes: AttrType
-    nodes: list[NodesType] = Field(default_factory=list)
+    attributes: AttrType = Field(exclude_if=attributes_empty)
+    nodes: list[NodesType] = Field(default_factory=list, exclude_if=nodes_empty)
+    _document: "zarr.Group | None" = PrivateAttr(default=None)
+    # Serialized attributes of the stub a fetched node was inlined into
+    _stub_attributes: dict | None = PrivateAttr(default=None)
+    # What the node was last saved as within its parent's document
+    _serialized: dict | None = PrivateAttr(default=None)
+
+
+def _reporting_edit(method: Callable) -> Callable:
+    def edit(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._owner._mark_changed()
+        return result
+
+    return edit
+
+
+class TrackedList(list):
+    """List of a saved model, which marks the model changed when edited.
+
+    See `mark_saved`. Copies are plain lists.
+    """
+
+    __slots__ = ("_owner",)
+
+    __setitem__ = _reporting_edit(list.__setitem__)
+    __delitem__ = _reporting_edit(list.__delitem__)
+    __iadd__ = _reporting_edit(list.__iadd__)
+    __imul__ = _reporting_edit(list.__imul__)
+    append = _reporting_edit(list.append)
+    extend = _reporting_edit(list.extend)
+    insert = _reporting_edit(list.insert)
+    pop = _reporting_edit(list.pop)
+    remove = _reporting_edit(list.remove)
+    clear = _reporting_edit(list.clear)
+    sort = _reporting_edit(list.sort)
+    reverse = _reporting_edit(list.reverse)
+
+    def __reduce_ex__(self, protocol: SupportsIndex):
+        return list, (list(self),)
+
+
+class TrackedDict(dict):
+    """Dict of a saved model, which marks the model changed when edited.
+
+    See `mark_saved`. Copies are plain dicts.
+    """
+
+    __slots__ = ("_owner",)
+
+    __setitem__ = _reporting_edit(dict.__setitem__)
+    __delitem__ = _reporting_edit(dict.__delitem__)
+    __ior__ = _reporting_edit(dict.__ior__)
+    pop = _reporting_edit(dict.pop)
+    popitem = _reporting_edit(dict.popitem)
+    setdefault = _reporting_edit(dict.setdefault)
+    update = _reporting_edit(dict.update)
+    clear = _reporting_edit(dict.clear)
+
+    def __reduce_ex__(self, protocol: SupportsIndex):
+        return dict, (dict(self),)
+
+
+def _tracked(value: Any, owner: StatefulModel) -> Any:
+    """value, with the lists and dicts in it reporting edits to owner."""
+    if isinstance(value, StatefulModel):
+        object.__setattr__(value, "_parent", owner)
+        # Nodes are marked saved with the document they are saved in
+        if not value.is_saved and not isinstance(value, NodeModel):
+            mark_saved(value)
+        return value
+    if isinstance(value, list):
+        items = [_tracked(item, owner) for item in value]
+        if type(value) is not TrackedList:
+            value = TrackedList()
+        list.__setitem__(value, slice(None), items)
+    elif isinstance(value, dict):
+        items = {key: _tracked(item, owner) for key, item in value.items()}
+        if type(value) is not TrackedDict:
+            value = TrackedDict()
+        dict.update(value, items)
+    else:
+        return value
+    value._owner = owner
+    return value
+
+
+def mark_saved(model: StatefulModel) -> None:
+    """Mark a model, and the models in its fields, as saved.
+
+    Child nodes are only linked to the node holding them, so that their
+    changes are passed up to it; they are marked saved on their own. The
+    lists and dicts in the fields are replaced by ones that report in-place
+    edits, unless they already are.
+    """
+    fields = model.__dict__
+    for name, value in fields.items():
+        fields[name] = _tracked(value, model)
+    if model.__pydantic_extra__ is not None:
+        extra = _tracked(model.__pydantic_extra__, model)
+        object.__setattr__(model, "__pydantic_extra__", extra)
+    object.__setattr__(model, "_saved", True)
+
+
+class IdIndex:
+    """Index of all models with an 'id' found within a tree of models.
+
+    Besides the id -> model mapping, the index keeps track of the parent
+    NodeModel of every node, so that nodes can be added, replaced or removed
+    without walking the tree again.
+    """
 
-    @model_serializer(mode="wrap")
-    def remove_empty_lists(self, handler):
-        data = handler(self)
-        if len(data.get("nodes", [])) == 0:
-            data.pop("nodes", None)
-        if len(data.get("attributes", {})) == 0:
-            data.pop("attributes", None)
-        return data
+    def __init__(self, root: BaseModel | None = None):
+        self._models: dict[str, BaseModel] = {}
+        self._parents: dict[str, NodeModel] = {}
+        if root is not None:
+            self.add(root)
+
+    def add(self, model: BaseModel, parent: "NodeModel | None" = None) -> None:
+        """Add a model and all its descendants to the index."""
+        for m in iter_models(model):
+            if hasattr(m, "id"):
+                self._models[getattr(m, "id")] = m
+            if isinstance(m, NodeModel):
+                for child in m.nodes:
+                    if child is not None:
+                        self._parents[child.id] = m
+        if parent is not None and isinstance(model, NodeModel):
+            self._parents[model.id] = parent
+
+    def remove(self, model: BaseModel) -> None:
+        """Remove a model and all its descendants from the index."""
+        for m in iter_models(model):
+            id = getattr(m, "id", None)
+            if id is not None and self._models.get(id) is m:
+                del self._models[id]
+                self._parents.pop(id, None)
+
+    def get(self, id: str) -> BaseModel | None:
+        return self._models.get(id)
+
+    def parent(self, id: str) -> "NodeModel | None":
+        return self._parents.get(id)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+def _index_of(nodes: list, node: BaseModel) -> int:
+    """Position of a node in a list, compared by identity rather than equality."""
+    for i, n in enumerate(nodes):
+        if n is node:
+            return i
+    raise ValueError("Node not found in its parent.")
+
+
+class IndexedRootModel(StatefulModel):
+    """Base class for root models that keep an id index of their tree.
+
+    The index, and the graph of coordinate transformations, are built on first
+    use. Nodes added, replaced or removed through `add_node`, `replace_node`
+    and `remove_node` keep both up to date; after mutating the tree by other
+    means call `invalidate_index`.
+    """
+
+    _id_index: IdIndex | None = PrivateAttr(default=None)
+    _transform_graph: Any = PrivateAttr(default=None)
+    # Bumped on every change to the tree, and the generation the index was
+    # last built at, see `get_model`
+    _generation: int = PrivateAttr(default=0)
+    _index_generation: int = PrivateAttr(default=-1)
+
+    @property
+    def id_index(self) -> IdIndex:
+        if self._id_index is None:
+            self._id_index = IdIndex(self)
+            self._index_generation = self._generation
+        return self._id_index
+
+    @property
+    def transform_graph(self) -> "TransformEngine":
+        """Graph of all Scale transformations in the tree."""
+        if self._transform_graph is None:
+            from ngff_rfc8_collection_examples.transforms import TransformEngine
+
+            self._transform_graph = TransformEngine(self)
+        return self._transform_graph
+
+    def invalidate_index(self) -> None:
+        self._id_index = None
+        self._transform_graph = None
+        self._generation += 1
+
+    def to_json_bytes(self, indent: int | None = None) -> bytes:
+        """Serialize to JSON bytes without going through Python dicts."""
+        return self.__pydantic_serializer__.to_json(
+            self, indent=indent, exclude_none=True
+        )
+
+    def get_model(self, id: str) -> BaseModel | None:
+        """Look up a model by id.
+
+        On a miss the index is rebuilt, in case the tree was also changed
+        without going through it, but at most once per change: further
+        misses are answered from the index until a node is added, replaced or
+        removed again. After changing the tree only by other means, call
+        `invalidate_index`.
+        """
+        model = self.id_index.get(id)
+        if model is None and self._index_generation != self._generation:
+            self._id_index = None
+            self._transform_graph = None
+            model = self.id_index.get(id)
+        return model
+
+    def _check_new_ids(self, node: "NodeModel", replaced: BaseModel | None) -> None:
+        """Raise if ids in a new subtree are already used outside of replaced."""
+        replaced_ids = set() if replaced is None else collect_ids(replaced).keys()
+        for id in collect_ids(node):
+            if id in self.id_index and id not in replaced_ids:
+                raise ValueError(f"A model with id '{id}' already exists.")
+
+    def _get_parent_node(self, parent_id: str | None) -> "NodeModel":
+        ome = getattr(self, "ome")
+        if parent_id is None or parent_id == ome.id:
+            return ome
+        parent = self.get_model(parent_id)
+        if not isinstance(parent, NodeModel):
+            raise ValueError(f"Parent node '{parent_id}' not found.")
+        return parent
+
+    def add_node(self, node: "NodeModel", parent_id: str | None = None) -> None:
+        """Append a node to the given parent (the root node by default)."""
+        self._check_new_ids(node, None)
+        parent = self._get_parent_node(parent_id)
+        parent.nodes.append(node)
+        self.id_index.add(node, parent=parent)
+        self._generation += 1
+        if self._transform_graph is not None:
+            self._transform_graph.add_tree(node)
+
+    def remove_node(self, node_id: str) -> "NodeModel":
+        """Remove a node and its subtree, returning the removed node."""
+        node = self.get_model(node_id)
+        parent = self.id_index.parent(node_id)
+        if not isinstance(node, NodeModel) or parent is None:
+            raise ValueError(f"Node '{node_id}' not found.")
+        del parent.nodes[_index_of(parent.nodes, node)]
+        self.id_index.remove(node)
+        self._generation += 1
+        if self._transform_graph is not None:
+            self._transform_graph.remove_tree(node)
+        return node
+
+    def replace_node(self, node_id: str, node: "NodeModel") -> "NodeModel":
+        """Replace a node and its subtree in place, returning the old node."""
+        old_node = self.get_model(node_id)
+        parent = self.id_index.parent(node_id)
+        if not isinstance(old_node, NodeModel) or parent is None:
+            raise ValueError(f"Node '{node_id}' not found.")
+        self._check_new_ids(node, old_node)
+        parent.nodes[_index_of(parent.nodes, old_node)] = node
+        self.id_index.remove(old_node)
+        self.id_index.add(node, parent=parent)
+        self._generation += 1
+        if self._transform_graph is not None:
+            self._transform_graph.remove_tree(old_node)
+            self._transform_graph.add_tree(node)
+        return old_node
 
 
 TargeModelType = TypeVar("TargeModelType", bound=BaseModel)
@@ -124,11 +922,17 @@ TargeModelType = TypeVar("TargeModelType", bound=BaseModel)
 def resolve_ref_from_context(
     ref: str, context_model: BaseModel, model_type: type[TargeModelType]
 ) -> TargeModelType:
-    """Resolve a reference string within the given context model."""
-    ids_dict = collect_ids(context_model)
-    if ref not in ids_dict:
+    """Resolve a reference string within the given context model.
+
+    Root models keep an id index, so lookups against them are O(1);
+    any other model is walked to collect its ids.
+    """
+    if isinstance(context_model, IndexedRootModel):
+        target_model = context_model.get_model(ref)
+    else:
+        target_model = collect_ids(context_model).get(ref)
+    if target_model is None:
         raise ValueError(f"Reference '{ref}' not found in the context model.")
-    target_model = ids_dict[ref]
     if not isinstance(target_model, model_type):
         raise TypeError(
             f"Referenced model with id '{ref}' is not of type {model_type.__name__}."
@@ -136,22 +940,84 @@ def resolve_ref_from_context(
     return target_model
 
 
-def resolve_ref_from_path(
-    ref: str, path: Path, model_type: type[TargeModelType]
-) -> TargeModelType:
-    """Resolve a reference string from a given file path."""
-    with open(path, "r") as f:
-        data = json.load(f)
-    model_instance = model_type.model_validate(data)
+def _check_resolved_id(model_instance: BaseModel, ref: str, source: object) -> None:
     id = getattr(model_instance, "id", None)
     if id is None:
-        raise ValueError(f"Model at path '{path}' does not have an 'id' attribute.")
+        raise ValueError(f"Model at '{source}' does not have an 'id' attribute.")
     if id != ref:
         raise ValueError(f"ID mismatch: expected '{ref}', found '{id}'.")
+
+
+def resolve_ref_from_path(
+    ref: str, path: Path, model_type: type[TargeModelType]
+) -> TargeModelType:
+    """Resolve a reference string from a given file path.
+
+    The file's metadata is cached in `path_cache` until the file changes, and
+    validated anew on every call, so callers never share a model instance.
+    """
+    data = path_cache.get_or_load(
+        ("json", str(path)), file_version(path), lambda: read_ome_document(path)
+    )
+    model_instance = model_type.model_validate(data, context=path)
+    _check_resolved_id(model_instance, ref, path)
+    return model_instance
+
+
+async def aresolve_ref_from_path(
+    ref: str, path: Path, model_type: type[TargeModelType]
+) -> TargeModelType:
+    """Async version of `resolve_ref_from_path`, the file is read in a thread."""
+    import asyncio
+
+    async def load() -> dict:
+        return await asyncio.to_thread(read_ome_document, path)
+
+    version = await asyncio.to_thread(file_version, path)
+    data = await path_cache.aget_or_load(("json", str(path)), version, load)
+    model_instance = model_type.model_validate(data, context=path)
+    _check_resolved_id(model_instance, ref, path)
     return model_instance
 
 
-class Ref(BaseModel):
+def resolve_ref_from_zarr(
+    ref: str, node: "zarr.Group | zarr.Array", model_type: type[TargeModelType]
+) -> TargeModelType:
+    """Resolve a reference string from the attributes of a Zarr group or array."""
+    model_instance = model_type.model_validate(node.attrs.get("ome", {}), context=node)
+    _check_resolved_id(model_instance, ref, node)
+    return model_instance
+
+
+def read_ome_metadata(
+    path: PathRef,
+) -> tuple[dict, "Path | zarr.Group | zarr.Array"]:
+    """Read the 'ome' metadata a path reference points to.
+
+    Returns the metadata together with the resolved file or Zarr node, which is
+    the context to validate the metadata with.
+    """
+    resolved = path.resolve_path()
+    return read_ome_document(resolved), resolved
+
+
+def read_ome_document(source: "Path | zarr.Group | zarr.Array") -> dict:
+    """Read the 'ome' metadata of a JSON file or a Zarr group or array."""
+    if isinstance(source, Path):
+        with open(source, "r") as f:
+            data = json.load(f)
+    else:
+        data = dict(source.attrs)
+    return data.get("ome", data)
+
+
+def ome_hash(data: dict) -> str:
+    """Content hash of a 'ome' metadata document, independent of key order."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return "sha256:" + hashlib.sha256(encoded).hexdigest()
+
+
+class Ref(StatefulModel):
     path: PathRef | None = None
     ref: str
 
@@ -164,63 +1030,209 @@ class Ref(BaseModel):
         resolved_path = self.path.resolve_path()
         if isinstance(resolved_path, Path):
             return resolve_ref_from_path(self.ref, resolved_path, model_type)
-        elif isinstance(resolved_path, (zarr.Group, zarr.Array)):
-            # Assuming the model is stored in a Zarr array as JSON
-            raise NotImplementedError("Zarr path resolution not implemented yet.")
+        elif is_zarr_node(resolved_path):
+            return resolve_ref_from_zarr(self.ref, resolved_path, model_type)
+        else:
+            raise TypeError(
+                "Resolved path is neither a file path nor a Zarr group/array."
+            )
+
+    async def aresolve_ref(
+        self, context_model: BaseModel, model_type: type[TargeModelType]
+    ) -> TargeModelType:
+        """Async version of `resolve_ref`."""
+        if self.path is None:
+            return resolve_ref_from_context(self.ref, context_model, model_type)
+        resolved_path = await self.path.aresolve_path()
+        if isinstance(resolved_path, Path):
+            return await aresolve_ref_from_path(self.ref, resolved_path, model_type)
+        elif is_zarr_node(resolved_path):
+            # The attributes are part of the metadata read when resolving
+            return resolve_ref_from_zarr(self.ref, resolved_path, model_type)
         else:
             raise TypeError(
                 "Resolved path is neither a file path nor a Zarr group/array."
             )
 
 
-class Axes(BaseModel):
+class Axes(StatefulModel):
     name: str
     type: Literal["space", "time", "channel"]
     unit: str | None = None
 
 
-class Scale(BaseModel):
+class Scale(StatefulModel):
     type: Literal["scale"] = "scale"
     scale: list[float] = Field(default_factory=list)
     input: Ref
     output: Ref
 
 
-class CoordinateTransformations(BaseModel):
+class CoordinateTransformations(StatefulModel):
     coordinate_transformations: list[Scale] | None = Field(default_factory=list)
 
 
-class CoordinateSystem(BaseModel):
+class CoordinateSystem(StatefulModel):
     id: str = Field(default_factory=random_id)
     name: str
     axes: list[Axes] = Field(default_factory=list)
 
 
-class BaseAttrs(BaseModel):
+# Models of extension attributes, by their namespaced key
+_attribute_types: dict[str, type[BaseModel]] = {}
+
+
+def register_attribute(key: str, model: type[BaseModel]) -> None:
+    """Parse the extension attribute key with model, see `BaseAttrs.extension`."""
+    registered = _attribute_types.get(key)
+    if registered is not None and registered is not model:
+        raise ValueError(
+            f"Attribute '{key}' is already registered to {registered.__name__}."
+        )
+    _attribute_types[key] = model
+
+
+class BoundingBox(StatefulModel):
+    """The 'webknossos:bounding_box' attribute of a multiscale.
+
+    Corner and size of the data, by axis name, in voxels of the first scale.
+    """
+
+    topleft: dict[str, float]
+    size: dict[str, float]
+
+
+register_attribute("webknossos:bounding_box", BoundingBox)
+
+
+class BaseAttrs(StatefulModel):
+    """Attributes of a node.
+
+    Keys other than the core fields, such as 'webknossos:rendering', are
+    extension attributes. They are kept as read, as extra fields, and written
+    back unchanged; use `extension` to read them.
+    """
+
+    # Serialized with camelCase keys and without empty lists, to match the spec
+    model_config = ConfigDict(serialize_by_alias=True, extra="allow")
+
     coordinate_systems: list[CoordinateSystem] = Field(
         default_factory=list,
+        exclude_if=lambda value: len(value) == 0,
         validation_alias=AliasChoices("coordinateSystems", "coordinate_systems"),
         serialization_alias="coordinateSystems",
     )
     coordinate_transformations: list[Scale] = Field(
         default_factory=list,
+        exclude_if=lambda value: len(value) == 0,
         validation_alias=AliasChoices(
             "coordinateTransformations", "coordinate_transformations"
         ),
         serialization_alias="coordinateTransformations",
     )
 
-    @model_serializer(mode="wrap")
-    def remove_empty_lists(self, handler):
-        data = handler(self)
-        if len(data.get("coordinate_systems", [])) == 0:
-            data.pop("coordinate_systems", None)
-        if len(data.get("coordinate_transformations", [])) == 0:
-            data.pop("coordinate_transformations", None)
-            
-        # Rename aliases back to camelCase
-        if "coordinate_systems" in data:
-            data["coordinateSystems"] = data.pop("coordinate_systems")
-        if "coordinate_transformations" in data:
-            data["coordinateTransformations"] = data.pop("coordinate_transformations")
-        return data
+    # Extension attributes parsed so far, with the raw value each was parsed from
+    _extensions: dict[str, tuple[Any, BaseModel]] = PrivateAttr(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        """Whether the attributes serialize to an empty object."""
+        return (
+            not self.coordinate_systems
+            and not self.coordinate_transformations
+            and not self.model_extra
+        )
+
+    def extension_keys(self) -> list[str]:
+        return list(self.model_extra or {})
+
+    def extension(self, key: str) -> Any:
+        """The value of an extension attribute.
+
+        If a model is registered for key, see `register_attribute`, the raw
+        value is validated with it on first access and the model is cached;
+        otherwise the raw value is returned. The model is parsed from the raw
+        value, which is what gets serialized: to change the attribute, pass
+        the changed model to `set_extension`.
+        """
+        extra = self.model_extra or {}
+        if key not in extra:
+            raise KeyError(key)
+        raw = extra[key]
+        model = _attribute_types.get(key)
+        if model is None:
+            return raw
+        cached = self._extensions.get(key)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        value = model.model_validate(raw)
+        self._extensions[key] = (raw, value)
+        return value
+
+    def set_extension(self, key: str, value: Any) -> None:
+        """Set an extension attribute to a raw value or a model."""
+        if key in type(self).model_fields or key in (
+            "coordinateSystems",
+            "coordinateTransformations",
+        ):
+            raise ValueError(f"'{key}' is not an extension attribute.")
+        self._extensions.pop(key, None)
+        raw = value
+        if isinstance(value, BaseModel):
+            raw = value.model_dump(mode="json", by_alias=True)
+            self._extensions[key] = (raw, value)
+        assert self.__pydantic_extra__ is not None
+        self.__pydantic_extra__[key] = raw
+
+
+class OpaqueNode(NodeModel[str, BaseAttrs, Any]):
+    """Node of a type without a registered model, kept as it was read.
+
+    Fields other than the common node fields are kept as extra fields, and
+    the path is kept as raw data since its type may be unknown too. Opaque
+    nodes are never resolved. Child nodes are validated as usual.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    type: str
+    path: Any = None
+    attributes: BaseAttrs = Field(
+        default_factory=BaseAttrs, exclude_if=attributes_empty
+    )
+    nodes: list["Node"] = Field(default_factory=list, exclude_if=nodes_empty)
+
+
+# Models of node types, by their 'type' field
+_node_types: dict[str, type[BaseModel]] = {}
+
+
+def register_node_type(type: str, model: type[BaseModel]) -> None:
+    """Validate nodes of the given type with model, instead of as opaque nodes.
+
+    model should be a NodeModel whose 'type' field accepts type. The built-in
+    collection, multiscale and single scale types cannot be replaced.
+    """
+    registered = _node_types.get(type)
+    if registered is not None and registered is not model:
+        raise ValueError(
+            f"Node type '{type}' is already registered to {registered.__name__}."
+        )
+    _node_types[type] = model
+
+
+def node_model(type: str) -> type[BaseModel]:
+    """The model nodes of a type are validated with."""
+    return _node_types.get(type, OpaqueNode)
+
+
+def validate_node(value: Any, info: ValidationInfo) -> BaseModel:
+    """Validate a node with the model registered for its type."""
+    if isinstance(value, BaseModel):
+        return value
+    if not isinstance(value, dict):
+        raise ValueError(f"A node must be an object, got {type(value).__name__}.")
+    return node_model(value.get("type")).model_validate(value, context=info.context)
+
+
+# A node of any type, serialized with the fields of its own model
+Node = Annotated[Any, PlainValidator(validate_node)]
@@ -0,0 +1,496 @@
+from array import array
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Iterator, Sequence
+
+import numpy as np
+
+from ngff_rfc8_collection_examples.collection import (
+    Collection,
+    CollectionWithVersion,
+    RootCollection,
+    _node_adapter,
+)
+from ngff_rfc8_collection_examples.common import (
+    BaseAttrs,
+    NodeModel,
+    PathRefJson,
+    PathRefOther,
+    PathRefZarr,
+    Ref,
+    Scale,
+)
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+from ngff_rfc8_collection_examples.streaming import JsonStream, iter_ome_items
+
+NODE_TYPES = ("collection", "multiscale", "singlescale")
+_NODE_CLASSES = (Collection, Multiscale, SingleScale)
+# Code of the 'type' column for nodes of other types, kept as pydantic models
+_OTHER = len(NODE_TYPES)
+# Codes of the 'path' column, in addition to -1 for nodes without a path
+_PATH_TYPES = ("json", "zarr")
+
+if TYPE_CHECKING:
+    import zarr
+
+    Context = Path | zarr.Group | zarr.Array | None
+
+
+class StringTable:
+    """Immutable table of unique strings, stored as one UTF-8 blob.
+
+    Strings are looked up by index, and indices by string through a sorted
+    array of their hashes.
+    """
+
+    __slots__ = ("_blob", "_offsets", "_hashes", "_order")
+
+    def __init__(self, strings: Sequence[str]):
+        encoded = [s.encode() for s in strings]
+        self._blob = b"".join(encoded)
+        self._offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=self._offsets[1:])
+        hashes = np.fromiter((hash(s) for s in strings), np.int64, len(strings))
+        self._order = np.argsort(hashes, kind="stable").astype(np.int32)
+        self._hashes = hashes[self._order]
+
+    def __getitem__(self, index: int) -> str:
+        start, stop = self._offsets[index], self._offsets[index + 1]
+        return self._blob[start:stop].decode()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def index(self, string: str) -> int:
+        """Index of a string, -1 if the table does not contain it."""
+        h = hash(string)
+        lo = np.searchsorted(self._hashes, h, side="left")
+        hi = np.searchsorted(self._hashes, h, side="right")
+        for k in self._order[lo:hi]:
+            if self[k] == string:
+                return int(k)
+        return -1
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self._blob)
+            + self._offsets.nbytes
+            + self._hashes.nbytes
+            + self._order.nbytes
+        )
+
+
+class _Builder:
+    """Accumulates the columns of a compact collection, node by node."""
+
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.contexts: dict[int, tuple[int, "Context"]] = {}
+        self.ids = array("i")
+        self.types = array("b")
+        self.names = array("i")
+        self.paths = array("i")
+        self.path_types = array("b")
+        self.node_contexts = array("i")
+        self.parents = array("i")
+        self.ends = array("i")
+        self.transform_starts = array("i")
+        self.transform_counts = array("i")
+        self.inputs = array("i")
+        self.outputs = array("i")
+        self.factor_offsets = array("q", [0])
+        self.factors = array("d")
+        self.attributes: dict[int, BaseAttrs] = {}
+        self.others: dict[int, NodeModel] = {}
+        # Paths of types other than _PATH_TYPES, kept as is
+        self.other_paths: dict[int, PathRefOther] = {}
+
+    def intern(self, string: str | None) -> int:
+        if string is None:
+            return -1
+        return self.strings.setdefault(string, len(self.strings))
+
+    def _context(self, context: "Context") -> int:
+        if context is None:
+            return -1
+        key = id(context)
+        if key not in self.contexts:
+            self.contexts[key] = (len(self.contexts), context)
+        return self.contexts[key][0]
+
+    def reserve(self, parent: int) -> int:
+        """Append an empty node, to be filled in with `set_fields`."""
+        for column in (
+            self.ids,
+            self.names,
+            self.paths,
+            self.node_contexts,
+            self.ends,
+            self.transform_counts,
+        ):
+            column.append(-1)
+        self.types.append(-1)
+        self.path_types.append(-1)
+        self.parents.append(parent)
+        self.transform_starts.append(len(self.inputs))
+        return len(self.ids) - 1
+
+    def set_fields(self, i: int, node: NodeModel) -> None:
+        self.ids[i] = self.intern(node.id)
+        self.names[i] = self.intern(node.name)
+        if node.type in NODE_TYPES:
+            self.types[i] = NODE_TYPES.index(node.type)
+        else:
+            # Their fields are unknown; children are still stored as columns
+            self.types[i] = _OTHER
+            self.others[i] = node.model_copy(update={"nodes": []})
+            return
+        if isinstance(node.path, PathRefOther):
+            self.other_paths[i] = node.path
+        elif node.path is not None:
+            self.paths[i] = self.intern(node.path.path)
+            self.path_types[i] = _PATH_TYPES.index(node.path.type)
+            self.node_contexts[i] = self._context(node.path._context)
+        attributes = node.attributes
+        if (
+            attributes.coordinate_systems
+            or attributes.model_extra
+            or not all(
+                _is_plain_scale(t) for t in attributes.coordinate_transformations
+            )
+        ):
+            # Kept as is; nodes carrying coordinate systems or extension
+            # attributes are few
+            self.attributes[i] = attributes
+            for transform in attributes.coordinate_transformations:
+                if isinstance(transform, Scale):
+                    self.intern(transform.input.ref)
+                    self.intern(transform.output.ref)
+            return
+        self.transform_starts[i] = len(self.inputs)
+        self.transform_counts[i] = len(attributes.coordinate_transformations)
+        for transform in attributes.coordinate_transformations:
+            self.inputs.append(self.intern(transform.input.ref))
+            self.outputs.append(self.intern(transform.output.ref))
+            self.factors.extend(transform.scale)
+            self.factor_offsets.append(len(self.factors))
+
+    def add_tree(self, node: NodeModel, parent: int) -> None:
+        """Append a node and its descendants in depth-first order."""
+        stack: list[tuple[NodeModel, int] | int] = [(node, parent)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, int):
+                # All descendants of node item were added
+                self.ends[item] = len(self.ids)
+                continue
+            node, parent = item
+            i = self.reserve(parent)
+            self.set_fields(i, node)
+            stack.append(i)
+            children = [child for child in node.nodes if child is not None]
+            stack.extend((child, i) for child in reversed(children))
+
+
+def _is_plain_scale(transform: object) -> bool:
+    return (
+        isinstance(transform, Scale)
+        and transform.input.path is None
+        and transform.output.path is None
+    )
+
+
+def _column(values: array, dtype: type) -> np.ndarray:
+    return np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype)
+
+
+class CompactNode:
+    """Read-only view of one node of a `CompactCollection`."""
+
+    __slots__ = ("collection", "index")
+
+    def __init__(self, collection: "CompactCollection", index: int):
+        self.collection = collection
+        self.index = index
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CompactNode)
+            and other.collection is self.collection
+            and other.index == self.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.collection), self.index))
+
+    def __repr__(self) -> str:
+        return f"CompactNode(index={self.index}, type={self.type!r}, id={self.id!r})"
+
+    @property
+    def id(self) -> str:
+        return self.collection._strings[self.collection._ids[self.index]]
+
+    @property
+    def type(self) -> str:
+        other = self.collection._others.get(self.index)
+        if other is not None:
+            return other.type
+        return NODE_TYPES[self.collection._types[self.index]]
+
+    @property
+    def name(self) -> str | None:
+        return self.collection._string(self.collection._names[self.index])
+
+    @property
+    def path(self) -> Any:
+        c = self.collection
+        if self.index in c._others:
+            return c._others[self.index].path
+        if self.index in c._other_paths:
+            return c._other_paths[self.index].model_copy()
+        path_type = c._path_types[self.index]
+        if path_type < 0:
+            return None
+        cls = PathRefJson if _PATH_TYPES[path_type] == "json" else PathRefZarr
+        path = cls(path=c._strings[c._paths[self.index]])
+        context = c._node_contexts[self.index]
+        path._context = c._contexts[context] if context >= 0 else None
+        return path
+
+    @property
+    def parent(self) -> "CompactNode | None":
+        parent = self.collection._parents[self.index]
+        return None if parent < 0 else CompactNode(self.collection, int(parent))
+
+    @property
+    def nodes(self) -> list["CompactNode"]:
+        return [
+            CompactNode(self.collection, i)
+            for i in self.collection._children(self.index)
+        ]
+
+    @property
+    def attributes(self) -> BaseAttrs:
+        """The node's attributes, as a new pydantic model."""
+        c = self.collection
+        if self.index in c._others:
+            return c._others[self.index].attributes.model_copy(deep=True)
+        attributes = c._attributes.get(self.index)
+        if attributes is not None:
+            return attributes.model_copy(deep=True)
+        return BaseAttrs(
+            coordinate_transformations=[
+                Scale(
+                    scale=factors.tolist(),
+                    input=Ref(ref=c._strings[input]),
+                    output=Ref(ref=c._strings[output]),
+                )
+                for input, output, factors in c._scales(self.index)
+            ]
+        )
+
+    def level_scales(self, coordinate_system: str | None = None) -> list[np.ndarray]:
+        """The scale factors of every level of a multiscale, see `Multiscale`."""
+        c = self.collection
+        target = None
+        if coordinate_system is not None:
+            target = c._strings.index(coordinate_system)
+            if target < 0:
+                raise ValueError(
+                    f"Coordinate system '{coordinate_system}' not found in the "
+                    "collection."
+                )
+        shared = list(c._scales(self.index))
+        levels = []
+        for child in c._children(self.index):
+            for input, output, factors in [*c._scales(child), *shared]:
+                if input == c._ids[child] and target in (None, output):
+                    levels.append(factors)
+                    break
+            else:
+                raise ValueError(
+                    f"Scale node '{c._strings[c._ids[child]]}' has no Scale "
+                    "transformation."
+                )
+        return levels
+
+    # Only relies on level_scales
+    select_level = Multiscale.select_level
+
+    def to_model(self) -> NodeModel:
+        """Convert the node and its descendants to pydantic models."""
+        c = self.collection
+        other = c._others.get(self.index)
+        if other is not None:
+            return other.model_copy(
+                update={"nodes": [child.to_model() for child in self.nodes]},
+                deep=True,
+            )
+        cls = _NODE_CLASSES[c._types[self.index]]
+        return cls(
+            id=self.id,
+            name=self.name,
+            path=self.path,
+            attributes=self.attributes,
+            nodes=[child.to_model() for child in self.nodes],
+        )
+
+
+class CompactCollection:
+    """Read-only collection stored as columns, for millions of nodes.
+
+    Offers the lookups of `IndexedRootModel`, by id or by the integer index
+    of a node, over `CompactNode` views. Nodes are numbered in depth-first
+    order, so the descendants of node i are the nodes i + 1 to end(i) - 1.
+    Attributes holding coordinate systems, or transformations other than
+    Scale between plain refs, are kept as pydantic models, and so are nodes
+    of types other than the built-in ones.
+    """
+
+    def __init__(self, builder: _Builder, version: str):
+        self.version = version
+        self._strings = StringTable(list(builder.strings))
+        self._contexts = [context for _, context in builder.contexts.values()]
+        self._ids = _column(builder.ids, np.int32)
+        self._types = _column(builder.types, np.int8)
+        self._names = _column(builder.names, np.int32)
+        self._paths = _column(builder.paths, np.int32)
+        self._path_types = _column(builder.path_types, np.int8)
+        self._node_contexts = _column(builder.node_contexts, np.int32)
+        self._parents = _column(builder.parents, np.int32)
+        self._ends = _column(builder.ends, np.int32)
+        self._transform_starts = _column(builder.transform_starts, np.int32)
+        self._transform_counts = _column(builder.transform_counts, np.int32)
+        self._inputs = _column(builder.inputs, np.int32)
+        self._outputs = _column(builder.outputs, np.int32)
+        self._factor_offsets = _column(builder.factor_offsets, np.int64)
+        self._factors = _column(builder.factors, np.float64)
+        self._attributes = builder.attributes
+        self._others = builder.others
+        self._other_paths = builder.other_paths
+        # Node indices sorted by id, for lookups by id
+        self._id_order = np.argsort(self._ids, kind="stable").astype(np.int32)
+        self._sorted_ids = self._ids[self._id_order]
+
+    @classmethod
+    def from_model(cls, root: RootCollection) -> "CompactCollection":
+        builder = _Builder()
+        builder.add_tree(root.ome, -1)
+        return cls(builder, root.ome.version)
+
+    @classmethod
+    def from_json_stream(
+        cls, fp: IO[str] | IO[bytes], context: Path | None = None
+    ) -> "CompactCollection":
+        """Build a compact collection from a JSON text or byte stream.
+
+        Top-level nodes are validated and converted one at a time, so neither
+        the raw document nor the whole pydantic tree is held in memory.
+        """
+        builder = _Builder()
+        root = builder.reserve(-1)
+        fields: dict = {}
+        for key, value in iter_ome_items(JsonStream(fp)):
+            if key == "node":
+                node = _node_adapter.validate_python(value, context=context)
+                builder.add_tree(node, root)
+            else:
+                fields[key] = value
+        ome = CollectionWithVersion.model_validate(fields, context=context)
+        builder.set_fields(root, ome)
+        builder.ends[root] = len(builder.ids)
+        return cls(builder, ome.version)
+
+    def to_model(self) -> RootCollection:
+        ome = self.ome.to_model()
+        return RootCollection(
+            ome=CollectionWithVersion(
+                **{name: getattr(ome, name) for name in Collection.model_fields},
+                version=self.version,
+            )
+        )
+
+    def _string(self, index: int) -> str | None:
+        return None if index < 0 else self._strings[index]
+
+    def _children(self, index: int) -> Iterator[int]:
+        child, end = index + 1, self._ends[index]
+        while child < end:
+            yield child
+            child = int(self._ends[child])
+
+    def _scales(self, index: int) -> Iterator[tuple[int, int, np.ndarray]]:
+        """(input, output, factors) of the Scale transformations of a node.
+
+        input and output are string table indices, -1 for strings that are
+        not in the table.
+        """
+        attributes = self._attributes.get(index)
+        if attributes is not None:
+            for t in attributes.coordinate_transformations:
+                if isinstance(t, Scale):
+                    yield (
+                        self._strings.index(t.input.ref),
+                        self._strings.index(t.output.ref),
+                        np.asarray(t.scale, dtype=np.float64),
+                    )
+            return
+        start = self._transform_starts[index]
+        for k in range(start, start + self._transform_counts[index]):
+            offsets = self._factor_offsets[k], self._factor_offsets[k + 1]
+            yield (
+                int(self._inputs[k]),
+                int(self._outputs[k]),
+                self._factors[slice(*offsets)],
+            )
+
+    @property
+    def ome(self) -> CompactNode:
+        return CompactNode(self, 0)
+
+    def node(self, index: int) -> CompactNode:
+        if not 0 <= index < len(self):
+            raise IndexError(f"Node index {index} out of range.")
+        return CompactNode(self, index)
+
+    def index_of(self, id: str) -> int:
+        """Integer index of the node with the given id, -1 if there is none."""
+        string = self._strings.index(id)
+        position = np.searchsorted(self._sorted_ids, string)
+        if string < 0 or position == len(self) or self._sorted_ids[position] != string:
+            return -1
+        return int(self._id_order[position])
+
+    def get_model(self, id: str) -> CompactNode | None:
+        index = self.index_of(id)
+        return None if index < 0 else CompactNode(self, index)
+
+    def parent(self, id: str) -> CompactNode | None:
+        node = self.get_model(id)
+        return None if node is None else node.parent
+
+    def iter_nodes(self, type: str | None = None) -> Iterator[CompactNode]:
+        """All nodes in depth-first order, optionally only those of one type."""
+        if type is None:
+            indices = range(len(self))
+        elif type not in NODE_TYPES:
+            indices = [i for i, node in self._others.items() if node.type == type]
+        else:
+            indices = np.flatnonzero(self._types == NODE_TYPES.index(type)).tolist()
+        for i in indices:
+            yield CompactNode(self, i)
+
+    def __contains__(self, id: str) -> bool:
+        return self.index_of(id) >= 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the columns and the string table, without pydantic parts."""
+        columns = [
+            value for value in vars(self).values() if isinstance(value, np.ndarray)
+        ]
+        return self._strings.nbytes + sum(column.nbytes for column in columns)
@@ -1,45 +1,229 @@
+import math
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Any, Literal, Sequence
 
-import zarr
-from pydantic import BaseModel, Field
+from pydantic import ConfigDict, Field
 
 from ngff_rfc8_collection_examples.common import (
     BaseAttrs,
+    IndexedRootModel,
     NodeModel,
+    PathRefZarr,
+    Scale,
+    attributes_empty,
+    is_zarr_array,
+    nodes_empty,
     random_id,
+    register_node_type,
 )
-from ngff_rfc8_collection_examples.single_scales import SingleScale
+from ngff_rfc8_collection_examples.saving import SaveReport, save_documents
+from ngff_rfc8_collection_examples.single_scales import (
+    RootSingleScale,
+    SingleScale,
+    SingleScaleWithVersion,
+)
+
+# numpy, zarr and the pyramid helpers are only needed to read and write arrays
+if TYPE_CHECKING:
+    import numpy as np
+    import zarr
+    from zarr.storage import StoreLike
+
+    from ngff_rfc8_collection_examples.pyramid import DownsampleMethod
 
 
 class Multiscale(NodeModel[Literal["multiscale"], BaseAttrs, SingleScale]):
     id: str = Field(default_factory=random_id)
     type: Literal["multiscale"] = "multiscale"
     name: str | None = None
-    attributes: BaseAttrs = Field(default_factory=BaseAttrs)
-    nodes: list[SingleScale] = Field(default_factory=list)
+    attributes: BaseAttrs = Field(
+        default_factory=BaseAttrs, exclude_if=attributes_empty
+    )
+    nodes: list[SingleScale] = Field(default_factory=list, exclude_if=nodes_empty)
+
+    def level_scales(self, coordinate_system: str | None = None) -> list[list[float]]:
+        """The scale factors of every level, in the order of nodes.
+
+        Scale transformations are looked up on the scale nodes first and then
+        on the multiscale itself. If coordinate_system is given, only
+        transformations into that coordinate system are used.
+        """
+        return [
+            level_scale(
+                scale, coordinate_system, self.attributes.coordinate_transformations
+            )
+            for scale in self.nodes
+        ]
+
+    def select_level(
+        self,
+        target_resolution: Sequence[float] | float,
+        coordinate_system: str | None = None,
+    ) -> int:
+        """Index of the coarsest level at least as fine as target_resolution.
+
+        Falls back to the finest level if none is fine enough.
+        """
+        scales = self.level_scales(coordinate_system)
+        if isinstance(target_resolution, (int, float)):
+            target_resolution = [target_resolution] * len(scales[0])
+        volume = [math.prod(scale) for scale in scales]
+        fine_enough = [
+            i
+            for i, scale in enumerate(scales)
+            if all(
+                s <= t or math.isclose(s, t) for s, t in zip(scale, target_resolution)
+            )
+        ]
+        if not fine_enough:
+            return min(range(len(scales)), key=volume.__getitem__)
+        return max(fine_enough, key=volume.__getitem__)
+
+    def read_region(
+        self,
+        bbox_in_world: tuple[Sequence[float], Sequence[float]],
+        target_resolution: Sequence[float] | float,
+        coordinate_system: str | None = None,
+    ) -> "np.ndarray":
+        """Read the pixels of a world-space bounding box at a given resolution.
+
+        bbox_in_world is the (start, stop) corner pair in world units. The
+        coarsest level at least as fine as target_resolution is read, and the
+        box is widened to whole voxels and clipped to the array. Zarr fetches
+        the chunks overlapping the box concurrently; the array it assembles
+        is returned as is.
+        """
+        level = self.select_level(target_resolution, coordinate_system)
+        scale = self.level_scales(coordinate_system)[level]
+        node = self.nodes[level]
+        if node.path is None:
+            raise ValueError(f"Scale node '{node.id}' has no path to read from.")
+        array = node.path.resolve_path()
+        assert is_zarr_array(array)
+        start, stop = bbox_in_world
+        region = tuple(
+            slice(
+                max(0, math.floor(lo / s)),
+                min(size, max(0, math.ceil(hi / s))),
+            )
+            for lo, hi, s, size in zip(start, stop, scale, array.shape)
+        )
+        return array[region]
+
+
+def merge_scale_attributes(
+    scale: SingleScale, array: "zarr.Array | None" = None
+) -> BaseAttrs:
+    """Merge the attributes stored on a scale's Zarr array into its own.
+
+    Attributes set on the node in the multiscale take precedence. The array is
+    resolved from the scale's path unless given.
+    """
+    if array is None:
+        assert scale.path is not None
+        array = scale.path.resolve_path()
+    assert is_zarr_array(array)
+    scale_in_zarr = SingleScale.model_validate(
+        array.attrs.get("ome", {}), context=array
+    )
+    new_attributes = scale_in_zarr.attributes.model_dump()
+    new_attributes.update(scale.attributes.model_dump())
+    return BaseAttrs.model_validate(new_attributes)
+
+
+def load_scale_attributes(
+    scale: SingleScale, array: "zarr.Array | None" = None
+) -> None:
+    """Merge the attributes of a scale's array into the scale node in place.
+
+    The node remembers the array and the attributes set on the node itself,
+    so that saving writes each attribute back to where it was read from.
+    """
+    if array is None:
+        assert scale.path is not None
+        array = scale.path.resolve_path()
+    stub_attributes = scale.attributes.model_dump(exclude_none=True)
+    scale.attributes = merge_scale_attributes(scale, array)
+    scale._stub_attributes = stub_attributes
+    scale._document = array
+
+
+def level_transform(
+    scale: SingleScale,
+    coordinate_system: str | None = None,
+    transforms: list | None = None,
+) -> Scale:
+    """The first Scale transform starting at a scale node.
+
+    The node's own transformations are searched before transforms.
+    """
+    candidates = scale.attributes.coordinate_transformations + (transforms or [])
+    for transform in candidates:
+        if (
+            isinstance(transform, Scale)
+            and transform.input.ref == scale.id
+            and coordinate_system in (None, transform.output.ref)
+        ):
+            return transform
+    raise ValueError(f"Scale node '{scale.id}' has no Scale transformation.")
+
+
+def level_scale(
+    scale: SingleScale,
+    coordinate_system: str | None = None,
+    transforms: list | None = None,
+) -> list[float]:
+    """The scale factors of the first Scale transform starting at a scale node."""
+    return level_transform(scale, coordinate_system, transforms).scale
+
+
+def level_array_name(scale: SingleScale) -> str:
+    """The path of a scale's array relative to its multiscale group."""
+    if not isinstance(scale.path, PathRefZarr):
+        raise ValueError(f"Scale node '{scale.id}' has no Zarr path.")
+    name = posixpath.normpath(scale.path.path)
+    if name.startswith(("/", "..")) or name == ".":
+        raise ValueError(
+            f"Path '{scale.path.path}' of scale node '{scale.id}' is not inside "
+            "the multiscale group."
+        )
+    return name
+
+
+register_node_type("multiscale", Multiscale)
 
 
 class MultiscaleWithVersion(Multiscale):
+    model_config = ConfigDict(defer_build=True)
+
     version: Literal["0.7dev0"] = "0.7dev0"
 
 
-class RootMultiscale(BaseModel):
+class RootMultiscale(IndexedRootModel):
+    model_config = ConfigDict(defer_build=True)
+
     ome: MultiscaleWithVersion
 
     @classmethod
-    def from_zarr(cls, group: zarr.Group) -> "RootMultiscale":
+    def from_zarr(cls, group: "zarr.Group", max_workers: int = 1) -> "RootMultiscale":
+        """Load a multiscale from a Zarr group.
+
+        The attributes stored on the arrays of path-referenced scales are merged
+        into the scale nodes, see `load_scale_attributes`. With max_workers > 1
+        the arrays are opened concurrently, at most max_workers at a time.
+        """
         model = RootMultiscale.model_validate(group.attrs, context=group)
         # Resolve the all path references in the multiscale
-        for scale in model.ome.nodes:
-            if scale.path is not None:
-                # Merge the node attributes from zarr array
-                array = scale.path.resolve_path()
-                assert isinstance(array, zarr.Array)
-                scale_in_zarr = SingleScale.model_validate(array.attrs, context=array)
-                new_attributes = scale_in_zarr.attributes.model_dump()
-                new_attributes.update(scale.attributes.model_dump())
-                scale.attributes = BaseAttrs.model_validate(new_attributes)
+        scales = [scale for scale in model.ome.nodes if scale.path is not None]
+        if max_workers > 1 and len(scales) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(load_scale_attributes, scales))
+        else:
+            for scale in scales:
+                load_scale_attributes(scale)
+        model.ome._document = group
         return model
 
     @classmethod
@@ -48,5 +232,105 @@ class RootMultiscale(BaseModel):
     ) -> "RootMultiscale":
         return cls.model_validate(json_data, context=context)
 
-    def to_zarr(self, zarr_array: zarr.Group):
+    def to_zarr(self, zarr_array: "zarr.Group"):
         zarr_array.attrs.update(self.model_dump(exclude_none=True))
+
+    def save(self, group: "zarr.Group | None" = None) -> SaveReport:
+        """Write the metadata if it changed since loading or last save.
+
+        See `save_documents`. Attributes of scales loaded from their arrays
+        are written back to the arrays, except those set on the scale nodes
+        in the group.
+        """
+        return save_documents(self, group)
+
+    def write_pyramid(
+        self,
+        store: "StoreLike",
+        shape: tuple[int, ...],
+        dtype: Any,
+        chunks: tuple[int, ...] | Literal["auto"] = "auto",
+        data: "np.ndarray | zarr.Array | None" = None,
+        downsample: "DownsampleMethod | None" = None,
+        distributed: bool = False,
+        max_workers: int = 4,
+        overwrite: bool = False,
+    ) -> "zarr.Group":
+        """Create the multiscale group and all its level arrays in one batch.
+
+        Every scale node needs a Zarr path inside the group. The shape of each
+        level follows from the level 0 shape and the ratio of the level's Scale
+        transformation to the previous level's. The group's zarr.json is
+        written once, with the metadata, and the level arrays are created
+        concurrently together with their attributes. With distributed=True the
+        scale metadata is stored on the arrays and the group only references
+        them.
+
+        If data is given it is copied to level 0, and if downsample is set,
+        every further level is then computed from the previous one. Both run
+        one chunk per task on max_workers threads, so data may be a Zarr array
+        larger than memory.
+        """
+        import zarr
+
+        from ngff_rfc8_collection_examples.pyramid import (
+            copy_array,
+            downsample_array,
+            level_factors,
+            level_shapes,
+        )
+
+        scales = self.ome.nodes
+        names = [level_array_name(scale) for scale in scales]
+        factors = level_factors([level_scale(scale) for scale in scales])
+        shapes = level_shapes(tuple(shape), factors)
+
+        array_attributes: list[dict | None] = [None] * len(scales)
+        ome = self.model_dump(exclude_none=True)
+        if distributed:
+            stubs = []
+            for i, scale in enumerate(scales):
+                stubs.append(SingleScale(id=scale.id, name=scale.name, path=scale.path))
+                array_scale = SingleScaleWithVersion(
+                    **scale.model_dump(exclude={"path"}, by_alias=True)
+                )
+                array_attributes[i] = RootSingleScale(ome=array_scale).model_dump(
+                    exclude_none=True
+                )
+            ome = RootMultiscale(
+                ome=self.ome.model_copy(update={"nodes": stubs})
+            ).model_dump(exclude_none=True)
+
+        group = zarr.create_group(store, attributes=ome, overwrite=overwrite)
+
+        def create_level(i: int) -> "zarr.Array":
+            return zarr.create_array(
+                store=group.store,
+                name=posixpath.join(group.path, names[i]),
+                shape=shapes[i],
+                dtype=dtype,
+                chunks=chunks,
+                attributes=array_attributes[i],
+                overwrite=overwrite,
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            arrays = list(executor.map(create_level, range(len(scales))))
+
+        if data is not None:
+            if tuple(data.shape) != tuple(shapes[0]):
+                raise ValueError(
+                    f"Data of shape {data.shape} does not match level 0 shape "
+                    f"{shapes[0]}."
+                )
+            copy_array(data, arrays[0], max_workers=max_workers)
+            if downsample is not None:
+                for i in range(1, len(arrays)):
+                    downsample_array(
+                        arrays[i - 1],
+                        arrays[i],
+                        factors[i],
+                        max_workers=max_workers,
+                        method=downsample,
+                    )
+        return group
@@ -1,12 +1,71 @@
-from typing import Any, Iterator
+import types
+from typing import (
+    Annotated,
+    Any,
+    ForwardRef,
+    Iterator,
+    Literal,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
 
 from pydantic import BaseModel
 
+_CONTAINERS = (dict, list, tuple, set, frozenset)
+_SCALARS = (str, bytes, int, float, bool, complex, type(None))
+
+# Per model class, the names of the fields that may hold models
+_model_fields_cache: dict[type[BaseModel], tuple[str, ...]] = {}
+
+
+def _may_contain_models(annotation: Any) -> bool:
+    """Whether a value of the annotated type may be or contain a BaseModel.
+
+    Anything that cannot be decided from the annotation is assumed to.
+    """
+    if annotation is Any or isinstance(annotation, (str, ForwardRef, TypeVar)):
+        return True
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return False
+    if origin is Annotated:
+        return _may_contain_models(get_args(annotation)[0])
+    if origin is Union or origin is types.UnionType:
+        return any(_may_contain_models(arg) for arg in get_args(annotation))
+    if origin is not None:
+        args = get_args(annotation)
+        return not args or any(_may_contain_models(arg) for arg in args)
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel) or issubclass(annotation, _CONTAINERS):
+            return True
+        # Other classes are never walked into
+        return False
+    return annotation is not None
+
+
+def model_fields_with_models(cls: type[BaseModel]) -> tuple[str, ...]:
+    """Names of the fields of a model class that may hold other models."""
+    fields = _model_fields_cache.get(cls)
+    if fields is None:
+        fields = tuple(
+            name
+            for name, info in cls.model_fields.items()
+            if _may_contain_models(info.annotation)
+        )
+        _model_fields_cache[cls] = fields
+    return fields
+
 
 def iter_models(
     obj: Any, _seen: set[int] | None = None, depth: int = -1
 ) -> Iterator[BaseModel]:
-    """Recursively iterate over all Pydantic BaseModel instances found within obj.
+    """Iterate over all Pydantic BaseModel instances found within obj.
+
+    Models are yielded depth-first, each before its fields. Only the fields
+    that may hold models according to their annotation are walked, see
+    `model_fields_with_models`.
 
     The seen set is used to avoid infinite recursion on cyclic references.
     The depth parameter limits the recursion depth; -1 means unlimited.
@@ -14,29 +73,53 @@ def iter_models(
     if _seen is None:
         _seen = set()
 
-    if depth == 0:
-        return
-
-    depth = depth - 1 if depth > 0 else depth
-    if isinstance(obj, BaseModel):
-        oid = id(obj)
-        if oid in _seen:
-            return
-        _seen.add(oid)
-
-        # yield this model first
-        yield obj
-
-        # then walk its fields
-        for _, value in obj:  # iteration over model fields works in v2
-            yield from iter_models(value, _seen, depth)
-
-    elif isinstance(obj, dict):
-        for v in obj.values():
-            yield from iter_models(v, _seen, depth)
-    elif isinstance(obj, (list, tuple, set, frozenset)):
-        for v in obj:
-            yield from iter_models(v, _seen, depth)
+    stack: list[tuple[Any, int]] = [(obj, depth)]
+    push = stack.append
+    while stack:
+        obj, depth = stack.pop()
+        if depth == 0:
+            continue
+        depth = depth - 1 if depth > 0 else depth
+
+        # Looking up the class is cheaper than isinstance on the model metaclass
+        cls = type(obj)
+        fields = _model_fields_cache.get(cls)
+        if fields is None and isinstance(obj, BaseModel):
+            fields = model_fields_with_models(cls)
+
+        if fields is not None:
+            oid = id(obj)
+            if oid in _seen:
+                continue
+            _seen.add(oid)
+
+            # yield this model first
+            yield obj
+
+            # then walk the fields that may hold models, in field order
+            values = obj.__dict__
+            extra = obj.__pydantic_extra__
+            if extra:
+                for value in reversed(list(extra.values())):
+                    if not isinstance(value, _SCALARS):
+                        push((value, depth))
+            for name in reversed(fields):
+                value = values.get(name)
+                if value is not None and not isinstance(value, _SCALARS):
+                    push((value, depth))
+
+        elif cls is list or cls is tuple:
+            for v in reversed(obj):
+                push((v, depth))
+        elif isinstance(obj, dict):
+            for v in reversed(list(obj.values())):
+                push((v, depth))
+        elif isinstance(obj, (list, tuple)):
+            for v in reversed(obj):
+                push((v, depth))
+        elif isinstance(obj, (set, frozenset)):
+            for v in reversed(list(obj)):
+                push((v, depth))
 
 
 def collect_models(root: BaseModel, depth: int = -1) -> list[BaseModel]:
@@ -0,0 +1,283 @@
+import itertools
+import math
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Iterable, Iterator, Literal
+
+import numpy as np
+import zarr
+from zarr.core.sync import sync
+
+from ngff_rfc8_collection_examples.common import (
+    BaseAttrs,
+    PathRefZarr,
+    Ref,
+    Scale,
+    random_id,
+)
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+# mode picks the most frequent value of each window, for label images
+DownsampleMethod = Literal["mean", "mode", "stride"]
+
+
+def level_factors(scales: list[list[float]]) -> list[tuple[int, ...]]:
+    """Integer downsampling factors of each level relative to the previous one.
+
+    The first level has factors of 1.
+    """
+    factors = [tuple(1 for _ in scales[0])]
+    for previous, current in zip(scales, scales[1:]):
+        ratios = [c / p for p, c in zip(previous, current)]
+        level = tuple(round(r) for r in ratios)
+        if any(f < 1 or not math.isclose(f, r) for f, r in zip(level, ratios)):
+            raise ValueError(
+                f"Scale {current} is not an integer multiple of scale {previous}."
+            )
+        factors.append(level)
+    return factors
+
+
+def level_shapes(
+    shape: tuple[int, ...], factors: list[tuple[int, ...]]
+) -> list[tuple[int, ...]]:
+    """Shape of every level, each level downsampled from the previous one."""
+    shapes = []
+    for level in factors:
+        shape = tuple(math.ceil(s / f) for s, f in zip(shape, level))
+        shapes.append(shape)
+    return shapes
+
+
+def iter_chunk_regions(
+    shape: tuple[int, ...], chunks: tuple[int, ...]
+) -> Iterator[tuple[slice, ...]]:
+    """Regions of an array, one per chunk."""
+    ranges = [range(0, s, c) for s, c in zip(shape, chunks)]
+    for start in itertools.product(*ranges):
+        yield tuple(slice(o, min(o + c, s)) for o, c, s in zip(start, chunks, shape))
+
+
+def downsample_block(
+    block: np.ndarray, factors: tuple[int, ...], method: DownsampleMethod = "mean"
+) -> np.ndarray:
+    """Downsample a block by integer factors along each axis.
+
+    Blocks that don't divide evenly are padded by repeating their edge.
+    """
+    if method == "stride":
+        return block[tuple(slice(None, None, f) for f in factors)]
+    pad = [(0, -s % f) for s, f in zip(block.shape, factors)]
+    if any(after for _, after in pad):
+        block = np.pad(block, pad, mode="edge")
+    shape = []
+    for s, f in zip(block.shape, factors):
+        shape.extend((s // f, f))
+    windows = block.reshape(shape)
+    if method == "mode":
+        return _window_mode(windows)
+    reduced = windows.mean(axis=tuple(range(1, len(shape), 2)))
+    if np.issubdtype(block.dtype, np.integer):
+        reduced = np.round(reduced)
+    return reduced.astype(block.dtype)
+
+
+def _window_mode(windows: np.ndarray) -> np.ndarray:
+    """Most frequent value of each window, the smallest one on ties.
+
+    windows has the shape (n0, f0, n1, f1, ...) of a reshaped block.
+    """
+    ndim = windows.ndim // 2
+    outer = windows.shape[0::2]
+    order = tuple(range(0, 2 * ndim, 2)) + tuple(range(1, 2 * ndim, 2))
+    flat = np.sort(windows.transpose(order).reshape(outer + (-1,)), axis=-1)
+    # Windows are small (f0 * f1 * ...), so counting pairwise is cheap
+    counts = (flat[..., :, None] == flat[..., None, :]).sum(axis=-1)
+    index = counts.argmax(axis=-1)[..., None]
+    return np.take_along_axis(flat, index, axis=-1)[..., 0]
+
+
+def downsample_region(
+    source: zarr.Array,
+    target: zarr.Array,
+    region: tuple[slice, ...],
+    factors: tuple[int, ...],
+    method: DownsampleMethod = "mean",
+) -> None:
+    """Compute one region of target from the matching region of source."""
+    source_region = tuple(
+        slice(r.start * f, min(r.stop * f, s))
+        for r, f, s in zip(region, factors, source.shape)
+    )
+    target[region] = downsample_block(source[source_region], factors, method)
+
+
+def copy_region(
+    source: "np.ndarray | zarr.Array",
+    target: zarr.Array,
+    region: tuple[slice, ...],
+) -> None:
+    """Copy one region of source to the same region of target."""
+    target[region] = source[region]
+
+
+def chunk_written(array: zarr.Array, region: tuple[slice, ...]) -> bool:
+    """Whether the chunk starting at region is stored.
+
+    Chunks equal to the fill value are never stored, so they count as missing.
+    """
+    coords = tuple(r.start // c for r, c in zip(region, array.chunks))
+    key = array.metadata.encode_chunk_key(coords)
+    return sync((array.store_path / key).exists())
+
+
+def _run_bounded(
+    executor: Executor,
+    func: Callable[..., Any],
+    tasks: Iterable[tuple],
+    max_pending: int,
+) -> None:
+    """Run func for every task with at most max_pending in flight.
+
+    Submitting lazily keeps memory bounded by the tasks in flight instead of
+    the size of the array.
+    """
+    pending: set[Future] = set()
+    for task in tasks:
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+        pending.add(executor.submit(func, *task))
+    for future in pending:
+        future.result()
+
+
+def downsample_array(
+    source: zarr.Array,
+    target: zarr.Array,
+    factors: tuple[int, ...],
+    max_workers: int = 4,
+    method: DownsampleMethod = "mean",
+    processes: bool = False,
+    resume: bool = False,
+) -> None:
+    """Fill target by downsampling source, one target chunk per task.
+
+    Tasks run on max_workers threads, or worker processes if processes is set.
+    With resume, chunks already present in target are skipped, so an
+    interrupted run can be continued.
+    """
+    regions = iter_chunk_regions(target.shape, target.chunks)
+    tasks = (
+        (source, target, region, factors, method)
+        for region in regions
+        if not (resume and chunk_written(target, region))
+    )
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool(max_workers=max_workers) as executor:
+        _run_bounded(executor, downsample_region, tasks, 2 * max_workers)
+
+
+def copy_array(
+    source: "np.ndarray | zarr.Array", target: zarr.Array, max_workers: int = 4
+) -> None:
+    """Copy source into target of the same shape, one target chunk per task.
+
+    Only the chunks in flight are held in memory, never the whole array.
+    """
+    tasks = (
+        (source, target, region)
+        for region in iter_chunk_regions(target.shape, target.chunks)
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        _run_bounded(executor, copy_region, tasks, 2 * max_workers)
+
+
+def build_pyramid(
+    group: zarr.Group,
+    n_levels: int,
+    coordinate_system: str,
+    level0: str = "0",
+    scale: list[float] | None = None,
+    factors: int | tuple[int, ...] = 2,
+    method: DownsampleMethod = "mean",
+    max_workers: int = 4,
+    processes: bool = True,
+    resume: bool = True,
+) -> list[SingleScale]:
+    """Compute the levels of a pyramid from its level 0 array.
+
+    Levels 1 to n_levels - 1 are stored next to level 0 in group, named by
+    their index and chunked like level 0. Each level is downsampled from the
+    previous one by factors, chunk by chunk on a pool of max_workers
+    processes. With resume, existing level arrays and their stored chunks are
+    kept, so an interrupted build picks up where it stopped.
+
+    Returns the scale nodes of all levels, with random ids, each with a Scale
+    transformation to coordinate_system; scale is the voxel size of level 0
+    and defaults to 1.
+    """
+    source = group[level0]
+    ndim = source.ndim
+    if isinstance(factors, int):
+        factors = (factors,) * ndim
+    level_scale = list(scale) if scale is not None else [1.0] * ndim
+
+    arrays = [source]
+    scales = [level_scale]
+    for level in range(1, n_levels):
+        previous = arrays[-1]
+        level_scale = [s * f for s, f in zip(level_scale, factors)]
+        shape = tuple(math.ceil(s / f) for s, f in zip(previous.shape, factors))
+        name = str(level)
+        if resume and name in group and group[name].shape == shape:
+            target = group[name]
+        else:
+            target = group.create_array(
+                name,
+                shape=shape,
+                dtype=source.dtype,
+                chunks=source.chunks,
+                fill_value=source.fill_value,
+                overwrite=True,
+            )
+        downsample_array(
+            previous,
+            target,
+            factors,
+            max_workers=max_workers,
+            method=method,
+            processes=processes,
+            resume=resume,
+        )
+        arrays.append(target)
+        scales.append(level_scale)
+
+    nodes = []
+    for level, level_scale in enumerate(scales):
+        name = level0 if level == 0 else str(level)
+        id = random_id()
+        nodes.append(
+            SingleScale(
+                id=id,
+                name=name,
+                path=PathRefZarr(path=f"./{name}"),
+                attributes=BaseAttrs(
+                    coordinate_transformations=[
+                        Scale(
+                            scale=level_scale,
+                            input=Ref(ref=id),
+                            output=Ref(ref=coordinate_system),
+                        )
+                    ]
+                ),
+            )
+        )
+    return nodes
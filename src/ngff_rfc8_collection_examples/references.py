@@ -0,0 +1,121 @@
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+
+from ngff_rfc8_collection_examples.common import CoordinateSystem, Ref, Scale
+from ngff_rfc8_collection_examples.pydantic_tools import iter_models
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+# Model types a reference held in a given field is expected to resolve to.
+# Refs held anywhere else may resolve to any model with an id.
+EXPECTED_TARGETS: dict[tuple[type[BaseModel], str], tuple[type[BaseModel], ...]] = {
+    (Scale, "input"): (SingleScale, CoordinateSystem),
+    (Scale, "output"): (CoordinateSystem, SingleScale),
+}
+
+
+@dataclass(frozen=True)
+class Reference:
+    """A Ref found in a model tree, with the model and field holding it."""
+
+    ref: Ref
+    owner: BaseModel | None
+    field: str | None
+    expected: tuple[type[BaseModel], ...]
+
+
+@dataclass
+class ReferenceGraph:
+    """All ids and references of a model tree.
+
+    Refs with a path point outside of the tree; they are collected in external
+    and not checked.
+    """
+
+    ids: dict[str, BaseModel] = field(default_factory=dict)
+    references: list[Reference] = field(default_factory=list)
+    external: list[Reference] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    incoming: dict[str, list[Reference]] = field(default_factory=dict)
+
+    def target(self, reference: Reference) -> BaseModel | None:
+        return self.ids.get(reference.ref.ref)
+
+    def referrers(self, id: str) -> list[Reference]:
+        """All in-tree references pointing to the given id."""
+        return self.incoming.get(id, [])
+
+    def edges(self) -> list[tuple[str, str]]:
+        """(input, output) id pairs of all scale transformations in the tree."""
+        edges = []
+        for reference in self.references:
+            if isinstance(reference.owner, Scale) and reference.field == "input":
+                edges.append((reference.ref.ref, reference.owner.output.ref))
+        return edges
+
+
+def _add_reference(graph: ReferenceGraph, reference: Reference) -> None:
+    if reference.ref.path is not None:
+        graph.external.append(reference)
+    else:
+        graph.references.append(reference)
+
+
+def _describe(reference: Reference) -> str:
+    if reference.owner is None:
+        return f"Reference '{reference.ref.ref}'"
+    owner = type(reference.owner).__name__
+    return f"Reference '{reference.ref.ref}' in {owner}.{reference.field}"
+
+
+def build_reference_graph(root: BaseModel) -> ReferenceGraph:
+    """Collect all ids and references of root and check them.
+
+    The tree is walked once; every problem found is recorded in the graph's
+    errors: duplicate ids, references to unknown ids, and references resolving
+    to a model of an unexpected type.
+    """
+    graph = ReferenceGraph()
+    owned: set[int] = set()
+    for m in iter_models(root):
+        model_id = getattr(m, "id", None)
+        if isinstance(model_id, str):
+            # The same coordinate system may be declared in several places
+            existing = graph.ids.get(model_id, m)
+            if existing is not m and existing != m:
+                graph.errors.append(f"Duplicate id '{model_id}'.")
+            graph.ids[model_id] = m
+        if isinstance(m, Scale):
+            for field_name in ("input", "output"):
+                ref = getattr(m, field_name)
+                owned.add(id(ref))
+                expected = EXPECTED_TARGETS[(Scale, field_name)]
+                _add_reference(graph, Reference(ref, m, field_name, expected))
+        elif isinstance(m, Ref) and id(m) not in owned:
+            _add_reference(graph, Reference(m, None, None, (BaseModel,)))
+
+    for reference in graph.references:
+        graph.incoming.setdefault(reference.ref.ref, []).append(reference)
+        target = graph.ids.get(reference.ref.ref)
+        if target is None:
+            graph.errors.append(
+                f"{_describe(reference)} does not point to any known id."
+            )
+        elif not isinstance(target, reference.expected):
+            expected = " or ".join(t.__name__ for t in reference.expected)
+            graph.errors.append(
+                f"{_describe(reference)} points to a {type(target).__name__}, "
+                f"expected {expected}."
+            )
+    return graph
+
+
+def validate_references(root: BaseModel) -> ReferenceGraph:
+    """Check all references of root, raising a ValueError listing every problem."""
+    graph = build_reference_graph(root)
+    if graph.errors:
+        raise ValueError(
+            f"{len(graph.errors)} invalid reference(s):\n"
+            + "\n".join(f" - {error}" for error in graph.errors)
+        )
+    return graph
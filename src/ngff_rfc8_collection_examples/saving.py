@@ -0,0 +1,203 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from ngff_rfc8_collection_examples.common import (
+    IndexedRootModel,
+    NodeModel,
+    mark_saved,
+)
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+if TYPE_CHECKING:
+    import zarr
+
+
+@dataclass
+class SaveReport:
+    """The zarr.json files written by a save and their total size."""
+
+    written: list[str] = field(default_factory=list)
+    bytes_written: int = 0
+
+
+def _is_document(node: NodeModel) -> bool:
+    return node._document is not None and not isinstance(node, SingleScale)
+
+
+def _stub(node: NodeModel) -> dict:
+    stub = node.model_dump(include={"id", "type", "name", "path"}, exclude_none=True)
+    if node._stub_attributes:
+        stub["attributes"] = node._stub_attributes
+    return stub
+
+
+def _node_data(fields: dict, children: list[dict]) -> dict:
+    # 'nodes' is the last field of a node; only 'version' may follow it
+    data = {
+        key: value for key, value in fields.items() if key not in ("nodes", "version")
+    }
+    if children:
+        data["nodes"] = children
+    if "version" in fields:
+        data["version"] = fields["version"]
+    return data
+
+
+class _DocumentSerializer:
+    """Serializes the documents of a tree.
+
+    Nodes stored as documents of their own are replaced by a stub and queued
+    in documents, to be serialized in turn. Scales loaded from their arrays
+    keep the attributes their stub held; the others are queued in arrays,
+    with the scale, to be written to the array.
+
+    With use_saved, nodes unchanged since they were last saved are not
+    serialized again: what they were saved as is reused, and the documents
+    and arrays below them are skipped. All nodes that were serialized are
+    listed in serialized.
+    """
+
+    def __init__(self, use_saved: bool = True):
+        self.use_saved = use_saved
+        self.documents: list[NodeModel] = []
+        self.arrays: list[tuple[SingleScale, dict]] = []
+        self.serialized: list[NodeModel] = []
+
+    def serialize(self, node: NodeModel, exclude: frozenset[str] = frozenset()) -> dict:
+        """Serialize a document's node and its inline descendants."""
+        children = [self._child(child) for child in node.nodes if child is not None]
+        fields = node.model_dump(exclude_none=True, exclude={"nodes", *exclude})
+        return _node_data(fields, children)
+
+    def _child(self, node: NodeModel) -> dict:
+        if self.use_saved and node.is_saved and node._serialized is not None:
+            return node._serialized
+        self.serialized.append(node)
+        if _is_document(node):
+            self.documents.append(node)
+            data = _stub(node)
+        elif isinstance(node, SingleScale) and node._document is not None:
+            data = self._scale_stub(node)
+        else:
+            data = self.serialize(node)
+        node._serialized = data
+        return data
+
+    def _scale_stub(self, node: SingleScale) -> dict:
+        stub_keys = node._stub_attributes or {}
+        attributes = node.attributes.model_dump(exclude_none=True)
+        stub = self.serialize(node, exclude=frozenset({"attributes"}))
+        stub_attributes = {
+            key: value for key, value in attributes.items() if key in stub_keys
+        }
+        if stub_attributes:
+            stub["attributes"] = stub_attributes
+        array_attributes = {
+            key: value for key, value in attributes.items() if key not in stub_keys
+        }
+        self.arrays.append((node, array_attributes))
+        return stub
+
+
+def _array_document(node: SingleScale, attributes: dict) -> dict | None:
+    """The 'ome' metadata of a scale's array with its attributes replaced.
+
+    Attributes shadowed by the stub keep the array's own values. None if the
+    array has no metadata and gets no attributes.
+    """
+    array = node._document
+    if "ome" not in array.attrs and not attributes:
+        return None
+    ome = dict(array.attrs.get("ome") or node.model_dump(include={"id", "type"}))
+    stored = ome.get("attributes") or {}
+    stub_keys = node._stub_attributes or {}
+    attributes = {
+        **attributes,
+        **{key: value for key, value in stored.items() if key in stub_keys},
+    }
+    if attributes:
+        ome["attributes"] = attributes
+    else:
+        ome.pop("attributes", None)
+    return ome
+
+
+def _write(
+    node: "zarr.Group | zarr.Array", attributes: dict, report: SaveReport
+) -> None:
+    """Write attributes to a Zarr node, unless it already holds them."""
+    from zarr.core.buffer import default_buffer_prototype
+
+    stored = node.attrs.asdict()
+    if all(stored.get(key) == value for key, value in attributes.items()):
+        return
+    node.attrs.update(attributes)
+    buffers = node.metadata.to_buffer_dict(default_buffer_prototype())
+    report.written.append(str(node.store_path))
+    report.bytes_written += len(buffers["zarr.json"].to_bytes())
+
+
+def save_documents(
+    root: IndexedRootModel, group: "zarr.Group | None" = None
+) -> SaveReport:
+    """Write the metadata of a tree, touching only the documents that changed.
+
+    The root node is written to group, by default the group it was loaded
+    from. Collections and multiscales that were loaded from a Zarr group of
+    their own are written back to it, without their path, and referenced by
+    a stub. Scales loaded from their arrays write the attributes read from
+    the array back to it.
+
+    Only nodes changed since loading or the last save are serialized again,
+    see `StatefulModel`: unchanged subtrees reuse what they were last saved
+    as, and the documents below them are neither serialized nor written. A
+    serialized document is compared with the metadata its Zarr node holds,
+    which needs no reads, and written only if it differs. Saving to another
+    group than the one loaded from serializes the whole tree. If group
+    holds consolidated metadata, it is refreshed after any write.
+    """
+    ome: NodeModel = getattr(root, "ome")
+    if group is None:
+        group = ome._document
+    if group is None:
+        raise ValueError("No Zarr group to save to.")
+    use_saved = group is ome._document
+    report = SaveReport()
+    if use_saved and root.is_saved:
+        return report
+    version = getattr(ome, "version", None)
+    serializer = _DocumentSerializer(use_saved)
+
+    other = root.model_dump(exclude_none=True, exclude={"ome"})
+    if not (use_saved and ome.is_saved and ome._serialized is not None):
+        serializer.serialized.append(ome)
+        ome._serialized = serializer.serialize(ome)
+    _write(group, {**other, "ome": ome._serialized}, report)
+
+    # Documents found while serializing may reference further documents
+    i = 0
+    while i < len(serializer.documents):
+        node = serializer.documents[i]
+        i += 1
+        document = serializer.serialize(node, exclude=frozenset({"path"}))
+        if version is not None:
+            document["version"] = version
+        _write(node._document, {"ome": document}, report)
+    for scale, attributes in serializer.arrays:
+        array_document = _array_document(scale, attributes)
+        if array_document is not None:
+            _write(scale._document, {"ome": array_document}, report)
+    from ngff_rfc8_collection_examples.collection import (
+        CONSOLIDATED_KEY,
+        consolidate_collection,
+    )
+
+    if report.written and CONSOLIDATED_KEY in group.attrs:
+        consolidate_collection(group)
+    # Saved to the documents the tree was loaded from: later saves can skip
+    # whatever is not changed from here on
+    if use_saved:
+        for node in serializer.serialized:
+            mark_saved(node)
+        mark_saved(root)
+    return report
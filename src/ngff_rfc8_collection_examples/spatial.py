@@ -0,0 +1,284 @@
+import itertools
+import math
+from typing import Callable, Iterator, Sequence
+
+import numpy as np
+import zarr
+from pydantic import BaseModel
+
+from ngff_rfc8_collection_examples.common import CoordinateSystem
+from ngff_rfc8_collection_examples.multiscale import (
+    Multiscale,
+    level_scale,
+    level_transform,
+)
+from ngff_rfc8_collection_examples.pydantic_tools import iter_models
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+Box = tuple[np.ndarray, np.ndarray]
+
+# Boxes covering more grid cells than this are kept in a list that every query
+# scans, so that a few huge boxes don't fill the grid.
+MAX_CELLS_PER_BOX = 4096
+
+
+def array_shape(scale: SingleScale) -> tuple[int, ...]:
+    """Shape of the array a scale node points to."""
+    if scale.path is None:
+        raise ValueError(f"Scale node '{scale.id}' has no path.")
+    array = scale.path.resolve_path()
+    assert isinstance(array, zarr.Array)
+    return array.shape
+
+
+def scale_extent(
+    scale: SingleScale,
+    coordinate_system: str | None = None,
+    transforms: list | None = None,
+    shape_of: Callable[[SingleScale], tuple[int, ...]] = array_shape,
+    bounds: Box | None = None,
+) -> Box:
+    """World-space (lower, upper) corners of a scale: its shape times its Scale.
+
+    bounds, world-space corners that are NaN on the axes they don't cover,
+    take the place of the corners computed from the shape, see
+    `multiscale_bounds`.
+    """
+    factors = np.asarray(level_scale(scale, coordinate_system, transforms))
+    upper = np.asarray(shape_of(scale), dtype=np.float64) * factors
+    lower = np.zeros_like(upper)
+    if bounds is not None:
+        lower = np.where(np.isnan(bounds[0]), lower, bounds[0])
+        upper = np.where(np.isnan(bounds[1]), upper, bounds[1])
+    return lower, upper
+
+
+def multiscale_bounds(
+    multiscale: Multiscale,
+    coordinate_system: str | None = None,
+    coordinate_systems: dict[str, CoordinateSystem] | None = None,
+) -> Box | None:
+    """World-space corners of a multiscale's 'webknossos:bounding_box'.
+
+    The box is given in voxels of the first scale, by axis name; the axes are
+    those of the coordinate system the first scale's Scale points to, looked
+    up in coordinate_systems and then in the multiscale's own attributes.
+    Axes missing from the box, such as channels, are NaN. None if the
+    multiscale has no bounding box.
+    """
+    attributes = multiscale.attributes
+    if "webknossos:bounding_box" not in attributes.extension_keys():
+        return None
+    box = attributes.extension("webknossos:bounding_box")
+    transform = level_transform(
+        multiscale.nodes[0], coordinate_system, attributes.coordinate_transformations
+    )
+    systems = {cs.id: cs for cs in attributes.coordinate_systems}
+    systems.update(coordinate_systems or {})
+    system = systems.get(transform.output.ref)
+    if system is None:
+        raise ValueError(
+            f"Coordinate system '{transform.output.ref}' of the bounding box of "
+            f"multiscale '{multiscale.id}' not found."
+        )
+    names = [axis.name for axis in system.axes]
+    factors = np.asarray(transform.scale, dtype=np.float64)
+    start = np.array([box.topleft.get(name, np.nan) for name in names])
+    size = np.array([box.size.get(name, np.nan) for name in names])
+    return start * factors, (start + size) * factors
+
+
+def multiscale_extent(
+    multiscale: Multiscale,
+    coordinate_system: str | None = None,
+    shape_of: Callable[[SingleScale], tuple[int, ...]] = array_shape,
+    coordinate_systems: dict[str, CoordinateSystem] | None = None,
+) -> Box:
+    """World-space extent of a multiscale, taken from its first scale.
+
+    On the axes of its bounding box, if it has one, the extent is that box.
+    """
+    if not multiscale.nodes:
+        raise ValueError(f"Multiscale '{multiscale.id}' has no scales.")
+    transforms = multiscale.attributes.coordinate_transformations
+    bounds = multiscale_bounds(multiscale, coordinate_system, coordinate_systems)
+    return scale_extent(
+        multiscale.nodes[0], coordinate_system, transforms, shape_of, bounds
+    )
+
+
+class SpatialIndex:
+    """Uniform grid over the axis-aligned world extents of nodes.
+
+    Every box is registered in the grid cells it overlaps; intersection
+    queries only look at the cells overlapping the query box. Boxes can be
+    inserted, updated and removed one at a time.
+    """
+
+    def __init__(self, cell_size: Sequence[float]):
+        self.cell_size = np.asarray(cell_size, dtype=np.float64)
+        self._boxes: dict[str, Box] = {}
+        self._cells: dict[tuple[int, ...], set[str]] = {}
+        self._oversized: set[str] = set()
+        self._stacked: tuple[list[str], np.ndarray, np.ndarray] | None = None
+
+    def _cell_range(self, lower: np.ndarray, upper: np.ndarray) -> list[range]:
+        first = np.floor(lower / self.cell_size).astype(int)
+        last = np.floor(upper / self.cell_size).astype(int)
+        return [range(f, t + 1) for f, t in zip(first, last)]
+
+    def _iter_cells(self, box: Box) -> Iterator[tuple[int, ...]]:
+        return itertools.product(*self._cell_range(*box))
+
+    def insert(self, id: str, lower: Sequence[float], upper: Sequence[float]) -> None:
+        if id in self._boxes:
+            self.remove(id)
+        box = (np.asarray(lower, dtype=np.float64), np.asarray(upper, dtype=np.float64))
+        if box[0].shape != self.cell_size.shape or box[1].shape != box[0].shape:
+            raise ValueError(
+                f"Box of '{id}' does not have {len(self.cell_size)} dimensions."
+            )
+        self._boxes[id] = box
+        self._stacked = None
+        if math.prod(len(r) for r in self._cell_range(*box)) > MAX_CELLS_PER_BOX:
+            self._oversized.add(id)
+            return
+        for cell in self._iter_cells(box):
+            self._cells.setdefault(cell, set()).add(id)
+
+    update = insert
+
+    def remove(self, id: str) -> None:
+        box = self._boxes.pop(id)
+        self._stacked = None
+        if id in self._oversized:
+            self._oversized.discard(id)
+            return
+        for cell in self._iter_cells(box):
+            ids = self._cells[cell]
+            ids.discard(id)
+            if not ids:
+                del self._cells[cell]
+
+    def add_tree(
+        self,
+        model: BaseModel,
+        coordinate_system: str | None = None,
+        shape_of: Callable[[SingleScale], tuple[int, ...]] | None = None,
+    ) -> None:
+        """Insert, or update, the extents of all multiscales and scales in model."""
+        for id, (lower, upper) in node_extents(
+            model, coordinate_system, shape_of or array_shape
+        ):
+            self.insert(id, lower, upper)
+
+    def remove_tree(self, model: BaseModel) -> None:
+        """Remove all multiscales and scales in model from the index."""
+        for m in iter_models(model):
+            if isinstance(m, (Multiscale, SingleScale)) and m.id in self._boxes:
+                self.remove(m.id)
+
+    def box(self, id: str) -> Box:
+        return self._boxes[id]
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._boxes
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def intersection(self, lower: Sequence[float], upper: Sequence[float]) -> list[str]:
+        """Ids of all boxes overlapping the query box, borders included."""
+        query = (
+            np.asarray(lower, dtype=np.float64),
+            np.asarray(upper, dtype=np.float64),
+        )
+        candidates = set(self._oversized)
+        ranges = self._cell_range(*query)
+        if math.prod(len(r) for r in ranges) > len(self._cells):
+            # Cheaper to go over the occupied cells than over the query's
+            for cell, ids in self._cells.items():
+                if all(c in r for c, r in zip(cell, ranges)):
+                    candidates |= ids
+        else:
+            for cell in itertools.product(*ranges):
+                candidates |= self._cells.get(cell, set())
+        return [
+            id
+            for id in candidates
+            if np.all(self._boxes[id][0] <= query[1])
+            and np.all(query[0] <= self._boxes[id][1])
+        ]
+
+    def nearest(self, point: Sequence[float], k: int = 1) -> list[str]:
+        """Ids of the k boxes closest to a point, closest first.
+
+        Boxes containing the point have a distance of 0.
+        """
+        if self._stacked is None:
+            ids = list(self._boxes)
+            lower = np.array([self._boxes[id][0] for id in ids]).reshape(len(ids), -1)
+            upper = np.array([self._boxes[id][1] for id in ids]).reshape(len(ids), -1)
+            self._stacked = (ids, lower, upper)
+        ids, lower, upper = self._stacked
+        if not ids:
+            return []
+        p = np.asarray(point, dtype=np.float64)
+        gap = np.maximum(np.maximum(lower - p, p - upper), 0.0)
+        distance = np.einsum("ij,ij->i", gap, gap)
+        k = min(k, len(ids))
+        closest = np.argpartition(distance, k - 1)[:k]
+        return [ids[i] for i in closest[np.argsort(distance[closest])]]
+
+
+def node_extents(
+    root: BaseModel,
+    coordinate_system: str | None = None,
+    shape_of: Callable[[SingleScale], tuple[int, ...]] = array_shape,
+) -> Iterator[tuple[str, Box]]:
+    """(id, extent) of every multiscale and scale in a tree.
+
+    All scales of a multiscale with a bounding box share that box.
+    """
+    models = list(iter_models(root))
+    systems = {m.id: m for m in models if isinstance(m, CoordinateSystem)}
+    for model in models:
+        if isinstance(model, Multiscale):
+            yield (
+                model.id,
+                multiscale_extent(model, coordinate_system, shape_of, systems),
+            )
+            transforms = model.attributes.coordinate_transformations
+            bounds = multiscale_bounds(model, coordinate_system, systems)
+            for scale in model.nodes:
+                yield (
+                    scale.id,
+                    scale_extent(
+                        scale, coordinate_system, transforms, shape_of, bounds
+                    ),
+                )
+
+
+def build_spatial_index(
+    root: BaseModel,
+    coordinate_system: str | None = None,
+    cell_size: Sequence[float] | None = None,
+    shape_of: Callable[[SingleScale], tuple[int, ...]] = array_shape,
+) -> SpatialIndex:
+    """Index the world extents of all multiscales and scales of a tree.
+
+    The extent of a scale is its array shape times its Scale into
+    coordinate_system, or its multiscale's bounding box on the axes the box
+    covers; a multiscale has the extent of its first scale. The
+    grid's cell size defaults to the median extent of the indexed boxes.
+    """
+    extents = list(node_extents(root, coordinate_system, shape_of))
+    if cell_size is None:
+        if not extents:
+            raise ValueError("No extents to index; pass a cell_size.")
+        sizes = np.array([upper - lower for _, (lower, upper) in extents])
+        cell_size = np.maximum(np.median(sizes, axis=0), 1e-9)
+    index = SpatialIndex(cell_size)
+    for id, (lower, upper) in extents:
+        index.insert(id, lower, upper)
+    return index
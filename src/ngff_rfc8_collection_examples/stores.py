@@ -0,0 +1,307 @@
+import asyncio
+import posixpath
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Iterable
+from urllib.parse import quote
+
+import urllib3
+import zarr
+import zarr.api.asynchronous
+from zarr.abc.store import (
+    ByteRequest,
+    OffsetByteRequest,
+    RangeByteRequest,
+    Store,
+    SuffixByteRequest,
+)
+from zarr.core.buffer import Buffer, BufferPrototype
+from zarr.core.group import AsyncGroup
+from zarr.errors import NodeNotFoundError
+from zarr.storage import FsspecStore, LocalStore
+
+# Connections to HTTP servers, shared by all HTTP stores
+http_pool = urllib3.PoolManager(
+    maxsize=16, retries=urllib3.Retry(total=3, backoff_factor=0.2)
+)
+
+# Object stores answer 403 rather than 404 for missing keys if they don't
+# allow listing the bucket
+_MISSING = (403, 404)
+
+
+def is_url(path: str) -> bool:
+    return "://" in path
+
+
+def _range_header(byte_range: ByteRequest) -> str:
+    if isinstance(byte_range, RangeByteRequest):
+        return f"bytes={byte_range.start}-{byte_range.end - 1}"
+    if isinstance(byte_range, OffsetByteRequest):
+        return f"bytes={byte_range.offset}-"
+    if isinstance(byte_range, SuffixByteRequest):
+        return f"bytes=-{byte_range.suffix}"
+    raise TypeError(f"Unexpected byte range: {byte_range!r}")
+
+
+def _slice(data: bytes, byte_range: ByteRequest) -> bytes:
+    if isinstance(byte_range, RangeByteRequest):
+        return data[byte_range.start : byte_range.end]
+    if isinstance(byte_range, OffsetByteRequest):
+        return data[byte_range.offset :]
+    return data[max(len(data) - byte_range.suffix, 0) :]
+
+
+class HTTPStore(Store):
+    """Read-only Zarr store served over HTTP(S), e.g. from a public S3 bucket.
+
+    Keys are fetched with GET requests relative to the root URL, through the
+    shared `http_pool`. Byte ranges are requested with a Range header; servers
+    that ignore it and send the whole object are handled too. Requests run in
+    worker threads, so concurrent reads overlap. Stores can't be listed.
+
+    The versions of keys, see `version`, are kept for version_ttl seconds.
+    """
+
+    supports_writes = False
+    supports_deletes = False
+    supports_partial_writes = False
+    supports_listing = False
+
+    def __init__(
+        self,
+        url: str,
+        pool: urllib3.PoolManager | None = None,
+        version_ttl: float = 60.0,
+    ):
+        super().__init__(read_only=True)
+        self.url = url.rstrip("/")
+        self.pool = http_pool if pool is None else pool
+        self.version_ttl = version_ttl
+        # Version of every key asked for, with the time it was requested at
+        self._versions: dict[str, tuple[float, str | None]] = {}
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, HTTPStore) and other.url == self.url
+
+    def __hash__(self) -> int:
+        return hash(self.url)
+
+    def __str__(self) -> str:
+        return self.url
+
+    def __repr__(self) -> str:
+        return f"HTTPStore({self.url!r})"
+
+    def _fetch(self, key: str, byte_range: ByteRequest | None) -> bytes | None:
+        headers = {} if byte_range is None else {"Range": _range_header(byte_range)}
+        url = f"{self.url}/{quote(key)}"
+        response = self.pool.request("GET", url, headers=headers)
+        if response.status in _MISSING:
+            return None
+        if response.status == 416:
+            return b""
+        if response.status not in (200, 206):
+            raise OSError(f"GET {url} failed with HTTP {response.status}.")
+        if byte_range is not None and response.status == 200:
+            return _slice(response.data, byte_range)
+        return response.data
+
+    async def get(
+        self,
+        key: str,
+        prototype: BufferPrototype,
+        byte_range: ByteRequest | None = None,
+    ) -> Buffer | None:
+        data = await asyncio.to_thread(self._fetch, key, byte_range)
+        if data is None:
+            return None
+        return prototype.buffer.from_bytes(data)
+
+    async def get_partial_values(
+        self,
+        prototype: BufferPrototype,
+        key_ranges: Iterable[tuple[str, ByteRequest | None]],
+    ) -> list[Buffer | None]:
+        return list(
+            await asyncio.gather(
+                *(
+                    self.get(key, prototype, byte_range)
+                    for key, byte_range in key_ranges
+                )
+            )
+        )
+
+    def version(self, key: str) -> str | None:
+        """Version token of a key, its ETag or Last-Modified header.
+
+        None if the key is missing or the server sends neither. A key's
+        version is requested again only once version_ttl seconds have passed,
+        so changes on the server are noticed within that time.
+        """
+        now = time.monotonic()
+        cached = self._versions.get(key)
+        if cached is not None and now - cached[0] < self.version_ttl:
+            return cached[1]
+        response = self.pool.request("HEAD", f"{self.url}/{quote(key)}")
+        version = None
+        if response.status == 200:
+            version = response.headers.get("ETag") or response.headers.get(
+                "Last-Modified"
+            )
+        self._versions[key] = (now, version)
+        return version
+
+    async def exists(self, key: str) -> bool:
+        url = f"{self.url}/{quote(key)}"
+        response = await asyncio.to_thread(self.pool.request, "HEAD", url)
+        return response.status == 200
+
+    async def set(self, key: str, value: Buffer) -> None:
+        self._check_writable()
+
+    async def delete(self, key: str) -> None:
+        self._check_writable()
+
+    def list(self) -> AsyncIterator[str]:
+        raise NotImplementedError("HTTP stores cannot be listed.")
+
+    def list_prefix(self, prefix: str) -> AsyncIterator[str]:
+        raise NotImplementedError("HTTP stores cannot be listed.")
+
+    def list_dir(self, prefix: str) -> AsyncIterator[str]:
+        raise NotImplementedError("HTTP stores cannot be listed.")
+
+
+def root_uri(store: Store) -> str:
+    """The URI a store is registered under in a `StorePool`."""
+    if isinstance(store, LocalStore):
+        return str(Path(store.root).resolve())
+    if isinstance(store, HTTPStore):
+        return store.url
+    if isinstance(store, FsspecStore):
+        protocol = store.fs.protocol
+        protocol = protocol[0] if isinstance(protocol, tuple) else protocol
+        return f"{protocol}://{store.path.rstrip('/')}"
+    raise TypeError(f"Stores of type {type(store).__name__} cannot be pooled.")
+
+
+class StorePool:
+    """Open Zarr stores, keyed by the URI of their root and their read-only flag.
+
+    Resolving many paths into the same store reuses one store handle, along
+    with its connections and caches. Read-only and writable stores of the
+    same root are kept apart, so that opening a store for reading never
+    keeps it from being written later.
+    """
+
+    def __init__(self):
+        self._stores: dict[tuple[str, bool], Store] = {}
+        self._lock = threading.Lock()
+
+    def add(self, store: Store) -> Store:
+        """Register an open store, returning the pooled store for its root."""
+        with self._lock:
+            return self._stores.setdefault((root_uri(store), store.read_only), store)
+
+    def get(self, uri: str, read_only: bool = False) -> Store:
+        """The store rooted at a local path or URL, opened on first use.
+
+        HTTP stores are always read-only.
+        """
+        key = uri.rstrip("/") if is_url(uri) else str(Path(uri).resolve())
+        if key.startswith(("http://", "https://")):
+            read_only = True
+        with self._lock:
+            store = self._stores.get((key, read_only))
+        if store is not None:
+            return store
+        if key.startswith(("http://", "https://")):
+            store = HTTPStore(key)
+        elif is_url(uri):
+            store = FsspecStore.from_url(uri, read_only=read_only)
+        else:
+            store = LocalStore(key, read_only=read_only)
+        return self.add(store)
+
+    def sibling(self, store: Store, root: str) -> Store:
+        """The store of the same kind as store, rooted at another root path."""
+        if isinstance(store, (LocalStore, HTTPStore)):
+            return self.get(root, read_only=store.read_only)
+        if isinstance(store, FsspecStore):
+            # Share the file system, and with it its connections
+            candidate = FsspecStore(store.fs, read_only=store.read_only, path=root)
+            return self.add(candidate)
+        raise ValueError(
+            f"Cannot resolve paths outside of a {type(store).__name__} store."
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stores.clear()
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+
+def store_root(store: Store) -> str:
+    if isinstance(store, LocalStore):
+        return str(Path(store.root).resolve())
+    if isinstance(store, FsspecStore):
+        return store.path
+    if isinstance(store, HTTPStore):
+        return store.url
+    raise ValueError(f"Cannot resolve paths outside of a {type(store).__name__} store.")
+
+
+def locate(path: str, context: zarr.Group, pool: "StorePool") -> tuple[Store, str]:
+    """The store and node path a reference points to, relative to a group.
+
+    Paths are relative to the context group; './' and '../' are supported, and
+    a leading '/' makes a path relative to the root of the context's store.
+    Paths leading out of the store resolve into a pooled store rooted at the
+    closest common parent directory.
+    """
+    if path.startswith("/"):
+        relative = posixpath.normpath(path.lstrip("/"))
+    else:
+        relative = posixpath.normpath(posixpath.join(context.path or ".", path))
+    if relative == ".":
+        relative = ""
+    if not relative.startswith(".."):
+        return pool.add(context.store), relative
+
+    parts = relative.split("/")
+    up = 0
+    while up < len(parts) and parts[up] == "..":
+        up += 1
+    root = store_root(context.store).rstrip("/")
+    for _ in range(up):
+        root = posixpath.dirname(root)
+    return pool.sibling(context.store, root), "/".join(parts[up:])
+
+
+def open_node(store: Store, path: str) -> zarr.Group | zarr.Array | None:
+    """Open an existing group or array, None if there is none."""
+    mode = "r" if store.read_only else "r+"
+    try:
+        return zarr.open(store=store, path=path, mode=mode)
+    except NodeNotFoundError:
+        return None
+
+
+async def aopen_node(store: Store, path: str) -> zarr.Group | zarr.Array | None:
+    """Async version of `open_node`."""
+    mode = "r" if store.read_only else "r+"
+    try:
+        node = await zarr.api.asynchronous.open(store=store, path=path, mode=mode)
+    except NodeNotFoundError:
+        return None
+    if isinstance(node, AsyncGroup):
+        return zarr.Group(node)
+    return zarr.Array(node)
+
+
+# Shared by all Zarr path resolution
+store_pool = StorePool()
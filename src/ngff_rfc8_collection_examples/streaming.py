@@ -0,0 +1,169 @@
+import io
+import json
+from functools import partial
+from typing import IO, Any, Callable, Iterator
+
+# Locations of the 'ome' object in plain JSON documents and in zarr.json files
+OME_PATHS = {("ome",), ("attributes", "ome")}
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonStream:
+    """Incremental reader decoding one JSON value at a time from a stream.
+
+    Only the text of the value being decoded is held in memory; consumed text
+    is dropped whenever more input is read.
+    """
+
+    def __init__(self, fp: IO[str] | IO[bytes], chunk_size: int = 1 << 16):
+        if isinstance(fp.read(0), bytes):
+            fp = io.TextIOWrapper(fp, encoding="utf-8")  # type: ignore[arg-type]
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Read more input, returning False at the end of the stream."""
+        if self._eof:
+            return False
+        # Read at least as much as is buffered, so retrying a large value is linear
+        chunk = self._fp.read(max(self._chunk_size, len(self._buffer) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk  # type: ignore[operator]
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consume the next non-whitespace character, which must be in chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                f"Expected one of {chars!r} in JSON stream, found {char!r}."
+            )
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number or literal at the end of the buffer may continue
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_array(stream: JsonStream, read: Callable[[], Any]) -> Iterator[Any]:
+    """Yield the items of a JSON array, each read with read."""
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    while True:
+        yield read()
+        if stream.expect(",]") == "]":
+            return
+
+
+def read_node(stream: JsonStream, build_node: Callable[[dict], Any]) -> Any:
+    """Read a node object, building its descendants as soon as they are read.
+
+    build_node is called with the raw fields of a node, its 'nodes' already
+    built, and returns the built node. Only the fields of the nodes on the
+    current branch are held raw at any time.
+    """
+    data: dict = {}
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return build_node(data)
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "nodes" and stream.peek() == "[":
+            data[key] = list(
+                _iter_array(stream, partial(read_node, stream, build_node))
+            )
+        else:
+            data[key] = stream.value()
+        if stream.expect(",}") == "}":
+            return build_node(data)
+
+
+def _iter_ome_object(
+    stream: JsonStream, build_node: Callable[[dict], Any] | None
+) -> Iterator[tuple[str, Any]]:
+    read = (
+        stream.value if build_node is None else partial(read_node, stream, build_node)
+    )
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "nodes" and stream.peek() == "[":
+            for node in _iter_array(stream, read):
+                yield "node", node
+        else:
+            yield key, stream.value()
+        if stream.expect(",}") == "}":
+            return
+
+
+def iter_ome_items(
+    stream: JsonStream,
+    path: tuple[str, ...] = (),
+    build_node: Callable[[dict], Any] | None = None,
+) -> Iterator[tuple[str, Any]]:
+    """Iterate over the items of the 'ome' object of a JSON document.
+
+    Yields (key, value) for every field of the 'ome' object, except for its
+    nodes, which are yielded one at a time as ("node", node) as soon as they
+    are read. Nodes are raw, unless build_node is given: then each node and
+    its descendants are built as they are read, see `read_node`.
+    """
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        sub_path = path + (key,)
+        if sub_path in OME_PATHS and stream.peek() == "{":
+            yield from _iter_ome_object(stream, build_node)
+        elif any(p[: len(sub_path)] == sub_path for p in OME_PATHS) and (
+            stream.peek() == "{"
+        ):
+            yield from iter_ome_items(stream, sub_path, build_node)
+        else:
+            stream.value()
+        if stream.expect(",}") == "}":
+            return
@@ -0,0 +1,146 @@
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+from pydantic import BaseModel
+
+from ngff_rfc8_collection_examples.common import Scale
+from ngff_rfc8_collection_examples.pydantic_tools import iter_models
+
+
+@dataclass(frozen=True)
+class CompiledTransform:
+    """A chain of Scale transformations folded into one factor per axis."""
+
+    source: str
+    target: str
+    scale: np.ndarray
+
+    def __call__(self, points: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Map an (N, ndim) array of points from source to target."""
+        return np.multiply(points, self.scale, out=out)
+
+    def inverse(self) -> "CompiledTransform":
+        return CompiledTransform(self.target, self.source, 1.0 / self.scale)
+
+
+def compose(steps: list[tuple[Scale, bool]]) -> np.ndarray:
+    """Fold a chain of (transform, forward) steps into per-axis factors.
+
+    Steps taken backwards, from output to input, use the inverse scale.
+    """
+    factors: np.ndarray | None = None
+    for transform, forward in steps:
+        scale = np.asarray(transform.scale, dtype=np.float64)
+        if not forward:
+            scale = 1.0 / scale
+        if factors is not None and factors.shape != scale.shape:
+            raise ValueError(
+                f"Cannot compose Scale transformations of {len(factors)} and "
+                f"{len(scale)} dimensions."
+            )
+        factors = scale if factors is None else factors * scale
+    assert factors is not None
+    return factors
+
+
+class TransformEngine:
+    """Graph of the ids connected by the Scale transformations of a tree.
+
+    Every Scale is an edge from its input to its output id and may also be
+    walked backwards. The shortest chain of Scales between two ids and the
+    transformation compiled from it are memoized per (source, target); both
+    memos are cleared whenever transformations are added or removed. After
+    changing a Scale in place, call `invalidate`.
+    """
+
+    def __init__(self, root: BaseModel | None = None):
+        self._edges: dict[str, list[tuple[str, Scale, bool]]] = {}
+        self._chains: dict[tuple[str, str], list[tuple[Scale, bool]]] = {}
+        self._compiled: dict[tuple[str, str], CompiledTransform] = {}
+        if root is not None:
+            self.add_tree(root)
+
+    def invalidate(self) -> None:
+        self._chains.clear()
+        self._compiled.clear()
+
+    def add_transform(self, transform: Scale) -> None:
+        source, target = transform.input.ref, transform.output.ref
+        self._edges.setdefault(source, []).append((target, transform, True))
+        self._edges.setdefault(target, []).append((source, transform, False))
+        self.invalidate()
+
+    def remove_transform(self, transform: Scale) -> None:
+        for id in (transform.input.ref, transform.output.ref):
+            edges = [e for e in self._edges.get(id, []) if e[1] is not transform]
+            if edges:
+                self._edges[id] = edges
+            else:
+                self._edges.pop(id, None)
+        self.invalidate()
+
+    def add_tree(self, model: BaseModel) -> None:
+        """Add all Scale transformations found in a model and its descendants."""
+        for m in iter_models(model):
+            if isinstance(m, Scale):
+                self.add_transform(m)
+
+    def remove_tree(self, model: BaseModel) -> None:
+        """Remove all Scale transformations of a model and its descendants."""
+        for m in iter_models(model):
+            if isinstance(m, Scale):
+                self.remove_transform(m)
+
+    def ids(self) -> set[str]:
+        """All ids connected by at least one transformation."""
+        return set(self._edges)
+
+    def neighbours(self, id: str) -> set[str]:
+        return {neighbour for neighbour, _, _ in self._edges.get(id, [])}
+
+    def chain(self, source: str, target: str) -> list[tuple[Scale, bool]]:
+        """The shortest chain of (transform, forward) steps from source to target."""
+        key = (source, target)
+        steps = self._chains.get(key)
+        if steps is None:
+            steps = self._shortest_chain(source, target)
+            self._chains[key] = steps
+        return steps
+
+    def _shortest_chain(self, source: str, target: str) -> list[tuple[Scale, bool]]:
+        previous: dict[str, tuple[str, Scale, bool] | None] = {source: None}
+        queue = deque([source])
+        while queue and target not in previous:
+            current = queue.popleft()
+            for neighbour, transform, forward in self._edges.get(current, []):
+                if neighbour not in previous:
+                    previous[neighbour] = (current, transform, forward)
+                    queue.append(neighbour)
+        if target not in previous:
+            raise ValueError(
+                f"No Scale transformations lead from '{source}' to '{target}'."
+            )
+        steps = []
+        node = target
+        while (step := previous[node]) is not None:
+            node, transform, forward = step
+            steps.append((transform, forward))
+        return steps[::-1]
+
+    def compile(self, source: str, target: str) -> CompiledTransform:
+        key = (source, target)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            if source == target:
+                # Broadcasts to the identity over any number of axes
+                scale = np.ones(1)
+            else:
+                scale = compose(self.chain(source, target))
+            compiled = CompiledTransform(source, target, scale)
+            self._compiled[key] = compiled
+        return compiled
+
+    def apply(self, points: np.ndarray, source: str, target: str) -> np.ndarray:
+        """Map an (N, ndim) array of points from source to target."""
+        return self.compile(source, target)(points)
@@ -0,0 +1,131 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import zarr
+
+VERSION = "0.7dev0"
+
+
+def collection_ome(id: str, **fields) -> dict:
+    return {"id": id, "type": "collection", "version": VERSION, **fields}
+
+
+@pytest.fixture
+def version() -> str:
+    return VERSION
+
+
+@pytest.fixture
+def write_collection():
+    """Write a Zarr collection whose root references a 'child' group by path.
+
+    Returns a function taking the path of the store, the fields of the
+    child's document and further nodes of the root.
+    """
+
+    def write(path, child: dict | None = None, nodes: list | None = None):
+        root = zarr.open_group(path, mode="w")
+        root.create_group("child").attrs["ome"] = collection_ome(
+            "child", **(child or {})
+        )
+        root.attrs["ome"] = collection_ome(
+            "root",
+            nodes=[
+                {
+                    "id": "child",
+                    "type": "collection",
+                    "path": {"type": "zarr", "path": "./child"},
+                },
+                *(nodes or []),
+            ],
+        )
+        return root
+
+    return write
+
+
+@pytest.fixture
+def write_json_collection():
+    """Write a JSON collection document, with the file's stem as its id."""
+
+    def write(path, **fields):
+        path.write_text(json.dumps({"ome": collection_ome(path.stem, **fields)}))
+        return path
+
+    return write
+
+
+def scale_ome(id: str, scale: list[float]) -> dict:
+    return {
+        "id": id,
+        "type": "singlescale",
+        "attributes": {
+            "coordinateSystems": [
+                {
+                    "id": "world",
+                    "name": "world",
+                    "axes": [
+                        {"name": f"d{i}", "type": "space"} for i in range(len(scale))
+                    ],
+                }
+            ],
+            "coordinateTransformations": [
+                {
+                    "type": "scale",
+                    "scale": scale,
+                    "input": {"ref": id},
+                    "output": {"ref": "world"},
+                }
+            ],
+        },
+        "version": VERSION,
+    }
+
+
+@pytest.fixture
+def write_multiscale():
+    """Write a multiscale whose scales are stored on their arrays.
+
+    Level i halves the shape of the level before it, its Scale transform is
+    2**i along every axis, and its voxels hold their flat index.
+    The group only references the arrays by path.
+    """
+
+    def write(path, shape: tuple[int, ...] = (4,), levels: int = 2):
+        group = zarr.open_group(path, mode="w")
+        for i in range(levels):
+            level_shape = tuple(size // 2**i for size in shape)
+            array = group.create_array(str(i), shape=level_shape, dtype="int64")
+            array[...] = np.arange(np.prod(level_shape)).reshape(level_shape)
+            array.attrs["ome"] = scale_ome(f"scale{i}", [2.0**i] * len(shape))
+        group.attrs["ome"] = {
+            "id": "multiscale",
+            "type": "multiscale",
+            "nodes": [
+                {
+                    "id": f"scale{i}",
+                    "type": "singlescale",
+                    "path": {"type": "zarr", "path": f"./{i}"},
+                }
+                for i in range(levels)
+            ],
+            "version": VERSION,
+        }
+        return group
+
+    return write
+
+
+@pytest.fixture
+def run_python():
+    """Run code in a fresh interpreter with the test's import path."""
+
+    def run(code: str):
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        subprocess.run([sys.executable, "-c", code], check=True, env=env)
+
+    return run
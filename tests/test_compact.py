@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import zarr
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.compact import CompactCollection
+
+
+@pytest.fixture
+def collection(tmp_path, version, write_multiscale) -> RootCollection:
+    root = zarr.open_group(tmp_path / "root.zarr", mode="w")
+    write_multiscale(tmp_path / "root.zarr" / "image")
+    root.attrs["ome"] = {
+        "id": "root",
+        "type": "collection",
+        "version": version,
+        "nodes": [
+            {
+                "id": "multiscale",
+                "type": "multiscale",
+                "path": {"type": "zarr", "path": "./image"},
+            }
+        ],
+    }
+    return RootCollection.load(root)
+
+
+def test_round_trip_keeps_paths_resolvable(collection):
+    model = CompactCollection.from_model(collection).to_model()
+    assert model == collection
+
+    scale = model.ome.nodes[0].nodes[0]
+    array = scale.path.resolve_path()
+    np.testing.assert_array_equal(array[...], np.arange(4))
+    # The source's paths are left as they were
+    assert collection.ome.nodes[0].nodes[0].path.resolve_path() == array
+
+
+def test_level_scales_of_an_unknown_coordinate_system(collection):
+    node = CompactCollection.from_model(collection).get_model("multiscale")
+    assert [list(s) for s in node.level_scales("world")] == [[1.0], [2.0]]
+    with pytest.raises(ValueError, match="'nowhere' not found"):
+        node.level_scales("nowhere")
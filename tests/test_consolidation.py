@@ -0,0 +1,50 @@
+import pytest
+import zarr
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+
+
+@pytest.fixture
+def path(tmp_path, write_collection):
+    root = write_collection(tmp_path / "root.zarr", child={"name": "before"})
+    RootCollection.load(root, deep=False).to_zarr(root, consolidate=True)
+    return tmp_path / "root.zarr"
+
+
+def edit_child(path):
+    # Edit the child after consolidation, bypassing the snapshot
+    child = zarr.open_group(path / "child", use_consolidated=False)
+    child.attrs["ome"] = {**child.attrs["ome"], "name": "after"}
+
+
+def test_children_are_served_from_the_snapshot(path):
+    edit_child(path)
+    group = zarr.open_group(path, mode="r")
+    assert group.metadata.consolidated_metadata is not None
+    assert RootCollection.load(group).ome.nodes[0].name == "before"
+    assert set(group.attrs["ome_consolidated"]) == {"child"}
+
+
+def test_checked_load_reads_children_edited_after_consolidation(path):
+    edit_child(path)
+    group = zarr.open_group(path, mode="r")
+    model = RootCollection.load(group, check_consolidated=True)
+    assert model.ome.nodes[0].name == "after"
+
+
+def test_unchanged_children_pass_the_check(path):
+    group = zarr.open_group(path, mode="r")
+    model = RootCollection.load(group, check_consolidated=True)
+    assert model.ome.nodes[0].name == "before"
+
+
+def test_save_refreshes_the_snapshot(path):
+    collection = RootCollection.load(zarr.open_group(path))
+    # Only stored in the child's document, not in its stub
+    collection.ome.nodes[0].attributes.set_extension("label", "saved")
+    collection.save()
+
+    group = zarr.open_group(path, mode="r")
+    assert group.metadata.consolidated_metadata is not None
+    child = RootCollection.load(group).ome.nodes[0]
+    assert child.attributes.extension("label") == "saved"
@@ -0,0 +1,47 @@
+import pytest
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.multiscale import RootMultiscale
+
+
+@pytest.fixture
+def root(tmp_path, write_collection):
+    return write_collection(
+        tmp_path / "root.zarr",
+        nodes=[{"id": "inline", "type": "collection", "name": "inline"}],
+    )
+
+
+def test_loaded_model_equals_validated_model(root):
+    loaded = RootCollection.from_zarr(root)
+    assert loaded == RootCollection.model_validate(root.attrs, context=root)
+
+
+def test_equality_ignores_index_and_save_state(root):
+    used = RootCollection.load(root)
+    assert used.get_model("inline") is not None
+    assert used.get_model("missing") is None
+    used.save()
+    assert used == RootCollection.load(root)
+
+
+def test_lazy_load_equals_eager_load(root):
+    assert RootCollection.load(root, lazy=True) == RootCollection.load(root)
+    assert RootCollection.from_zarr(root, lazy=True) == RootCollection.from_zarr(root)
+
+
+def test_models_with_different_fields_differ(root):
+    renamed = RootCollection.load(root)
+    renamed.ome.nodes[1].name = "renamed"
+    assert renamed != RootCollection.load(root)
+
+
+def test_paths_compare_without_their_context(tmp_path, root, write_multiscale):
+    dump = RootCollection.from_zarr(root).model_dump(exclude_none=True)
+    assert RootCollection.model_validate(dump) == RootCollection.from_zarr(root)
+
+    group = write_multiscale(tmp_path / "multiscale.zarr")
+    multiscale = RootMultiscale.from_zarr(group)
+    dump = multiscale.model_dump(exclude_none=True)
+    assert multiscale == RootMultiscale.model_validate(dump)
+    assert multiscale == RootMultiscale.model_validate(dump, context=group)
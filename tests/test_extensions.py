@@ -0,0 +1,72 @@
+import pytest
+from pydantic import BaseModel
+
+from ngff_rfc8_collection_examples.common import (
+    BaseAttrs,
+    BoundingBox,
+    register_attribute,
+)
+
+
+class Rendering(BaseModel):
+    color: str
+
+
+register_attribute("test:rendering", Rendering)
+
+BOX = {"topleft": {"x": 1}, "size": {"x": 2}}
+
+
+@pytest.fixture
+def attributes() -> BaseAttrs:
+    return BaseAttrs.model_validate(
+        {
+            "webknossos:bounding_box": BOX,
+            "test:rendering": {"color": "red"},
+            "test:unregistered": [1, 2],
+        }
+    )
+
+
+def test_extensions_are_kept_raw_until_read(attributes):
+    assert attributes.model_extra["test:rendering"] == {"color": "red"}
+    assert attributes.extension_keys() == [
+        "webknossos:bounding_box",
+        "test:rendering",
+        "test:unregistered",
+    ]
+    assert attributes.extension("test:unregistered") == [1, 2]
+    assert attributes.model_dump()["webknossos:bounding_box"] == BOX
+
+
+def test_registered_extensions_are_parsed_once(attributes):
+    box = attributes.extension("webknossos:bounding_box")
+    assert box == BoundingBox(topleft={"x": 1.0}, size={"x": 2.0})
+    assert attributes.extension("webknossos:bounding_box") is box
+    # The raw value is what gets serialized
+    assert attributes.model_dump()["webknossos:bounding_box"] == BOX
+
+    attributes.set_extension("webknossos:bounding_box", {"topleft": {}, "size": {}})
+    assert attributes.extension("webknossos:bounding_box").topleft == {}
+
+
+def test_setting_a_model_serializes_it(attributes):
+    rendering = Rendering(color="blue")
+    attributes.set_extension("test:rendering", rendering)
+    assert attributes.extension("test:rendering") is rendering
+    assert attributes.model_dump()["test:rendering"] == {"color": "blue"}
+
+
+def test_invalid_extensions_fail_on_read(attributes):
+    attributes.set_extension("test:rendering", {"colour": "red"})
+    with pytest.raises(ValueError, match="color"):
+        attributes.extension("test:rendering")
+    with pytest.raises(KeyError):
+        attributes.extension("test:missing")
+
+
+def test_core_fields_and_registered_keys_are_protected(attributes):
+    with pytest.raises(ValueError, match="not an extension attribute"):
+        attributes.set_extension("coordinateSystems", [])
+    with pytest.raises(ValueError, match="already registered to Rendering"):
+        register_attribute("test:rendering", BoundingBox)
@@ -0,0 +1,76 @@
+import pytest
+
+from ngff_rfc8_collection_examples.collection import Collection, RootCollection
+
+
+@pytest.fixture
+def collection(version) -> RootCollection:
+    return RootCollection.model_validate(
+        {
+            "ome": {
+                "id": "root",
+                "type": "collection",
+                "version": version,
+                "nodes": [
+                    {
+                        "id": "a",
+                        "type": "collection",
+                        "nodes": [{"id": "a1", "type": "collection"}],
+                    },
+                    {"id": "b", "type": "collection"},
+                ],
+            }
+        }
+    )
+
+
+def test_add_node_indexes_the_subtree(collection):
+    node = Collection(
+        id="c", type="collection", nodes=[Collection(id="c1", type="collection")]
+    )
+    collection.add_node(node, parent_id="b")
+    assert collection.get_model("c") is node
+    assert collection.get_model("c1") is node.nodes[0]
+    assert collection.id_index.parent("c") is collection.get_model("b")
+
+
+def test_add_node_rejects_used_ids(collection):
+    with pytest.raises(ValueError, match="'a1' already exists"):
+        collection.add_node(Collection(id="a1", type="collection"))
+
+
+def test_remove_node_drops_the_subtree(collection):
+    removed = collection.remove_node("a")
+    assert removed.id == "a"
+    assert [n.id for n in collection.ome.nodes] == ["b"]
+    assert collection.get_model("a") is None
+    assert collection.get_model("a1") is None
+
+
+def test_replace_node_swaps_the_subtree(collection):
+    node = Collection(id="a", type="collection", name="new")
+    old = collection.replace_node("a", node)
+    assert old.nodes[0].id == "a1"
+    assert collection.ome.nodes[0] is node
+    assert collection.get_model("a") is node
+    assert collection.get_model("a1") is None
+    with pytest.raises(ValueError, match="'b' already exists"):
+        collection.replace_node("a", Collection(id="b", type="collection"))
+
+
+def test_misses_rebuild_the_index_once_per_change(collection):
+    index = collection.id_index
+    assert collection.get_model("missing") is None
+    assert collection.id_index is index
+
+    # A node appended directly is found after the next change
+    collection.ome.nodes.append(Collection(id="direct", type="collection"))
+    assert collection.get_model("direct") is None
+    collection.add_node(Collection(id="c", type="collection"))
+    assert collection.get_model("direct") is not None
+    assert collection.id_index is not index
+
+    # ... and right away after invalidate_index
+    collection.ome.nodes.append(Collection(id="direct2", type="collection"))
+    collection.invalidate_index()
+    assert collection.get_model("direct2") is not None
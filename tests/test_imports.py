@@ -0,0 +1,28 @@
+import pytest
+
+LAZY_MODULES = ["zarr", "urllib3", "asyncio", "numpy"]
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "ngff_rfc8_collection_examples.common",
+        "ngff_rfc8_collection_examples.collection",
+    ],
+)
+def test_importing_models_defers_heavy_modules(run_python, module):
+    run_python(
+        f"import sys, {module}\n"
+        f"imported = set({LAZY_MODULES!r}) & set(sys.modules)\n"
+        "assert not imported, imported\n"
+    )
+
+
+def test_validating_json_documents_does_not_import_zarr(run_python, version):
+    run_python(
+        "import sys\n"
+        "from ngff_rfc8_collection_examples.collection import RootCollection\n"
+        "RootCollection.from_json({'ome': {'id': 'root', 'type': 'collection', "
+        f"'version': {version!r}, 'nodes': [{{'id': 'a', 'type': 'multiscale'}}]}}}})\n"
+        "assert 'zarr' not in sys.modules\n"
+    )
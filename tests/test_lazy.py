@@ -0,0 +1,75 @@
+import copy
+
+import pytest
+
+from ngff_rfc8_collection_examples.collection import Collection, RootCollection
+from ngff_rfc8_collection_examples.common import LazyNodeList
+
+
+@pytest.fixture
+def nodes() -> LazyNodeList:
+    raw = [{"id": id, "type": "collection"} for id in ("b", "a")]
+    return LazyNodeList(raw, Collection.model_validate)
+
+
+def validated(nodes: list) -> bool:
+    # Looks at the stored items, without validating them
+    return all(isinstance(node, Collection) for node in list.__iter__(nodes))
+
+
+def test_items_are_validated_on_first_access(nodes):
+    assert not nodes.materialized
+    first = nodes[0]
+    assert isinstance(first, Collection)
+    assert nodes[0] is first
+    assert isinstance(list.__getitem__(nodes, 1), dict)
+    nodes.materialize()
+    assert nodes.materialized
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        lambda nodes: nodes + [],
+        lambda nodes: [] + nodes,
+        lambda nodes: nodes * 2,
+        lambda nodes: 2 * nodes,
+        lambda nodes: nodes[:],
+        lambda nodes: sorted(nodes, key=lambda node: node.id),
+        lambda nodes: list(nodes),
+        lambda nodes: copy.copy(nodes),
+    ],
+)
+def test_new_lists_hold_validated_nodes(nodes, operation):
+    result = operation(nodes)
+    assert len(result) in (2, 4)
+    assert validated(result)
+
+
+def test_in_place_operations_validate_first(nodes):
+    nodes.sort(key=lambda node: node.id)
+    assert [node.id for node in nodes] == ["a", "b"]
+    nodes *= 2
+    assert validated(nodes)
+
+
+def test_comparisons_use_validated_nodes(nodes):
+    expected = [Collection(id="b"), Collection(id="a")]
+    assert nodes == expected
+    assert not nodes != expected
+    assert nodes <= expected
+
+
+def test_lazy_collection_behaves_like_an_eager_one(version):
+    data = {
+        "ome": {
+            "id": "root",
+            "type": "collection",
+            "nodes": [{"id": "a", "type": "collection"}],
+            "version": version,
+        }
+    }
+    lazy = RootCollection.from_json(data, lazy=True)
+    assert isinstance(lazy.ome.nodes, LazyNodeList)
+    assert lazy.ome.nodes + [] == RootCollection.from_json(data).ome.nodes
+    assert lazy.model_dump() == RootCollection.from_json(data).model_dump()
@@ -0,0 +1,55 @@
+import pytest
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+
+
+def reference(id: str, type: str = "collection") -> dict:
+    return {"id": id, "type": type, "path": {"type": "json", "path": f"{id}.json"}}
+
+
+@pytest.fixture
+def root(tmp_path, write_json_collection):
+    # root -> a -> a1, root -> b, b is a multiscale
+    write_json_collection(tmp_path / "a1.json", name="a1")
+    write_json_collection(tmp_path / "a.json", name="a", nodes=[reference("a1")])
+    (tmp_path / "b.json").write_text(
+        '{"ome": {"id": "b", "type": "multiscale", "name": "b"}}'
+    )
+    return write_json_collection(
+        tmp_path / "root.json", nodes=[reference("a"), reference("b", "multiscale")]
+    )
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_deep_load_inlines_every_reference(root, max_workers):
+    collection = RootCollection.load(root, max_workers=max_workers)
+    a, b = collection.ome.nodes
+    assert (a.name, a.path) == ("a", None)
+    assert (a.nodes[0].name, a.nodes[0].path) == ("a1", None)
+    assert (b.type, b.name) == ("multiscale", "b")
+    assert collection.get_model("a1") is a.nodes[0]
+
+
+def test_shallow_load_keeps_references(root):
+    collection = RootCollection.load(root, deep=False)
+    assert collection.ome.nodes[0].path.path == "a.json"
+    assert collection.ome.nodes[0].nodes == []
+
+
+def test_inline_types_keep_references_to_other_types(root):
+    collection = RootCollection.load(root, inline_types=["collection"])
+    a, b = collection.ome.nodes
+    assert a.nodes[0].name == "a1"
+    assert b.path.path == "b.json"
+    assert b.name is None
+
+
+def test_lazy_deep_load_matches_eager_load(root):
+    assert RootCollection.load(root, lazy=True) == RootCollection.load(root)
+
+
+def test_reference_to_an_ancestor_raises(tmp_path, write_json_collection):
+    write_json_collection(tmp_path / "a.json", nodes=[reference("root")])
+    root = write_json_collection(tmp_path / "root.json", nodes=[reference("a")])
+    with pytest.raises(ValueError, match="Cycle detected"):
+        RootCollection.load(root)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import zarr
+
+from ngff_rfc8_collection_examples.multiscale import RootMultiscale
+
+
+def test_from_zarr_merges_the_attributes_of_every_scale(tmp_path, write_multiscale):
+    group = write_multiscale(tmp_path / "multiscale.zarr", levels=4)
+    sequential = RootMultiscale.from_zarr(group)
+    concurrent = RootMultiscale.from_zarr(group, max_workers=4)
+
+    assert concurrent == sequential
+    for i, scale in enumerate(concurrent.ome.nodes):
+        assert scale.attributes.coordinate_transformations[0].scale == [2.0**i]
+        assert scale._document.path == str(i)
+
+
+def test_attributes_set_on_the_scale_node_take_precedence(tmp_path, write_multiscale):
+    group = write_multiscale(tmp_path / "multiscale.zarr")
+    ome = group.attrs["ome"]
+    ome["nodes"][1]["name"] = "stub"
+    ome["nodes"][1]["attributes"] = {"label": "stub"}
+    group.attrs["ome"] = ome
+    array = zarr.open_array(tmp_path / "multiscale.zarr" / "1")
+    array.attrs["ome"] = {
+        **array.attrs["ome"],
+        "attributes": {**array.attrs["ome"]["attributes"], "label": "array"},
+    }
+
+    scale = RootMultiscale.from_zarr(group, max_workers=2).ome.nodes[1]
+    assert scale.name == "stub"
+    assert scale.attributes.extension("label") == "stub"
+    assert scale.attributes.coordinate_systems[0].name == "world"
+
+
+def test_select_level_picks_the_coarsest_level_fine_enough(tmp_path, write_multiscale):
+    group = write_multiscale(tmp_path / "multiscale.zarr", shape=(8, 8), levels=3)
+    multiscale = RootMultiscale.from_zarr(group).ome
+    assert multiscale.select_level(1.0) == 0
+    assert multiscale.select_level(2.0) == 1
+    assert multiscale.select_level(3.0) == 1
+    assert multiscale.select_level([4.0, 4.0]) == 2
+    # Nothing is finer than requested: the finest level
+    assert multiscale.select_level(0.5) == 0
+    assert multiscale.select_level([4.0, 1.0]) == 0
+
+
+def test_read_region_reads_the_box_from_the_selected_level(tmp_path, write_multiscale):
+    group = write_multiscale(tmp_path / "multiscale.zarr", shape=(8, 8), levels=3)
+    multiscale = RootMultiscale.from_zarr(group).ome
+
+    region = multiscale.read_region(([2.0, 2.0], [6.0, 8.0]), target_resolution=2.0)
+    np.testing.assert_array_equal(region, group["1"][1:3, 1:4])
+
+    # Widened to whole voxels and clipped to the array
+    region = multiscale.read_region(([-3.0, 1.0], [3.0, 100.0]), 4.0)
+    np.testing.assert_array_equal(region, group["2"][0:1, 0:2])
+
+
+def test_read_region_needs_a_path(tmp_path, write_multiscale):
+    group = write_multiscale(tmp_path / "multiscale.zarr")
+    multiscale = RootMultiscale.from_zarr(group).ome
+    multiscale.nodes[0].path = None
+    with pytest.raises(ValueError, match="has no path"):
+        multiscale.read_region(([0.0], [1.0]), 1.0)
@@ -0,0 +1,83 @@
+from typing import Literal
+
+import pydantic
+import pytest
+
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.common import (
+    BaseAttrs,
+    NodeModel,
+    OpaqueNode,
+    register_node_type,
+)
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+
+
+class SpotsTable(NodeModel[Literal["test:spots_table"], BaseAttrs, None]):
+    type: Literal["test:spots_table"] = "test:spots_table"
+    attributes: BaseAttrs = pydantic.Field(default_factory=BaseAttrs)
+    columns: list[str]
+
+
+register_node_type("test:spots_table", SpotsTable)
+
+
+def validate(*nodes: dict) -> Collection:
+    return Collection.model_validate(
+        {"id": "root", "type": "collection", "nodes": list(nodes)}
+    )
+
+
+def test_built_in_types_get_their_models():
+    collection = validate(
+        {"id": "c", "type": "collection"},
+        {"id": "m", "type": "multiscale"},
+        {"id": "s", "type": "singlescale"},
+    )
+    assert [type(node) for node in collection.nodes] == [
+        Collection,
+        Multiscale,
+        SingleScale,
+    ]
+
+
+def test_errors_name_the_type_of_the_node():
+    with pytest.raises(pydantic.ValidationError) as info:
+        validate({"id": "m", "type": "multiscale", "name": 1})
+    (error,) = info.value.errors()
+    assert error["loc"] == ("nodes", 0, "multiscale", "name")
+
+
+def test_unknown_types_are_kept_as_opaque_nodes():
+    data = {
+        "id": "spots",
+        "type": "mobie:spots_table",
+        "path": {"type": "parquet", "path": "spots.parquet"},
+        "table": {"columns": ["x", "y"]},
+        "nodes": [{"id": "c", "type": "collection"}],
+    }
+    collection = validate(data)
+
+    (node,) = collection.nodes
+    assert isinstance(node, OpaqueNode)
+    assert node.model_extra == {"table": {"columns": ["x", "y"]}}
+    assert type(node.nodes[0]) is Collection
+    dumped = collection.model_dump(exclude_none=True)["nodes"][0]
+    assert dumped == data
+
+
+def test_registered_types_get_their_models():
+    collection = validate({"id": "t", "type": "test:spots_table", "columns": ["x"]})
+    (node,) = collection.nodes
+    assert isinstance(node, SpotsTable)
+    assert node.columns == ["x"]
+
+    with pytest.raises(pydantic.ValidationError):
+        validate({"id": "t", "type": "test:spots_table"})
+
+
+def test_types_cannot_be_registered_twice():
+    with pytest.raises(ValueError, match="already registered to Collection"):
+        register_node_type("collection", SpotsTable)
+    register_node_type("test:spots_table", SpotsTable)
@@ -0,0 +1,12 @@
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.common import resolve_ref_from_path
+
+
+def test_resolved_refs_do_not_share_models(tmp_path, write_json_collection):
+    path = write_json_collection(tmp_path / "child.json")
+    first = resolve_ref_from_path("child", path, Collection)
+    first.name = "edited"
+
+    second = resolve_ref_from_path("child", path, Collection)
+    assert second is not first
+    assert second.name is None
@@ -0,0 +1,74 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.pydantic_tools import (
+    collect_ids,
+    iter_models,
+    model_fields_with_models,
+)
+
+
+class Leaf(BaseModel):
+    id: str
+    value: int = 0
+
+
+class Branch(BaseModel):
+    id: str
+    name: str = ""
+    leaves: list[Leaf] = []
+    by_name: dict[str, Leaf] = {}
+    anything: Any = None
+
+
+def test_only_fields_that_may_hold_models_are_walked():
+    assert model_fields_with_models(Leaf) == ()
+    assert model_fields_with_models(Branch) == ("leaves", "by_name", "anything")
+
+
+def test_models_are_yielded_depth_first_before_their_fields():
+    tree = Branch(
+        id="root",
+        leaves=[Leaf(id="a"), Leaf(id="b")],
+        by_name={"c": Leaf(id="c")},
+        anything=(Branch(id="nested", leaves=[Leaf(id="d")]),),
+    )
+    ids = [model.id for model in iter_models(tree)]
+    assert ids == ["root", "a", "b", "c", "nested", "d"]
+
+
+def test_depth_limits_the_walk():
+    tree = Branch(id="root", anything=Branch(id="nested", leaves=[Leaf(id="a")]))
+    assert [model.id for model in iter_models(tree, depth=1)] == ["root"]
+    assert [model.id for model in iter_models(tree, depth=2)] == ["root", "nested"]
+
+
+def test_shared_models_are_yielded_once():
+    leaf = Leaf(id="a")
+    tree = Branch(id="root", leaves=[leaf, leaf], anything=leaf)
+    assert [model.id for model in iter_models(tree)] == ["root", "a"]
+
+
+def test_collect_ids_finds_nodes_and_coordinate_systems(version):
+    collection = RootCollection.model_validate(
+        {
+            "ome": {
+                "id": "root",
+                "type": "collection",
+                "attributes": {
+                    "coordinateSystems": [
+                        {
+                            "id": "world",
+                            "name": "world",
+                            "axes": [{"name": "x", "type": "space"}],
+                        }
+                    ]
+                },
+                "nodes": [{"id": "a", "type": "collection"}],
+                "version": version,
+            }
+        }
+    )
+    assert set(collect_ids(collection)) == {"root", "world", "a"}
@@ -0,0 +1,46 @@
+import numpy as np
+import zarr
+
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.common import Axes, BaseAttrs, CoordinateSystem
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.pyramid import build_pyramid
+from ngff_rfc8_collection_examples.references import validate_references
+
+
+def write_level0(path):
+    group = zarr.open_group(path, mode="w")
+    array = group.create_array("0", shape=(8, 8), chunks=(4, 4), dtype="float64")
+    array[...] = np.arange(64, dtype="float64").reshape(8, 8)
+    return group
+
+
+def test_levels_are_downsampled_from_the_previous_one(tmp_path):
+    group = write_level0(tmp_path / "pyramid.zarr")
+    nodes = build_pyramid(group, 3, "world", scale=[0.5, 0.5], processes=False)
+
+    assert [node.path.path for node in nodes] == ["./0", "./1", "./2"]
+    assert group["2"].shape == (2, 2)
+    np.testing.assert_allclose(group["1"][0, 0], np.mean([0, 1, 8, 9]))
+    scales = [node.attributes.coordinate_transformations[0].scale for node in nodes]
+    assert scales == [[0.5, 0.5], [1.0, 1.0], [2.0, 2.0]]
+
+
+def test_pyramids_in_one_collection_have_distinct_ids(tmp_path):
+    multiscales = []
+    for name in ("a", "b"):
+        group = write_level0(tmp_path / f"{name}.zarr")
+        nodes = build_pyramid(group, 2, "world", processes=False)
+        multiscales.append(Multiscale(nodes=nodes))
+    world = CoordinateSystem(
+        id="world",
+        name="world",
+        axes=[Axes(name="y", type="space"), Axes(name="x", type="space")],
+    )
+    collection = Collection(
+        id="root", attributes=BaseAttrs(coordinate_systems=[world]), nodes=multiscales
+    )
+
+    ids = [scale.id for multiscale in multiscales for scale in multiscale.nodes]
+    assert len(set(ids)) == 4
+    validate_references(collection)
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+import zarr
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.common import (
+    PathRefOther,
+    aresolve_zarr_path,
+    register_resolver,
+    resolve_zarr_path,
+)
+
+
+def resolve_sibling(path, context):
+    # Documents named by their stem, next to the referencing document
+    return context.parent / f"{path}.json"
+
+
+register_resolver("test-sibling", "", resolve_sibling)
+
+
+def test_paths_of_other_types_resolve_through_registered_resolvers(
+    tmp_path, write_json_collection
+):
+    write_json_collection(tmp_path / "child.json", name="child")
+    path = {"type": "test-sibling", "path": "child"}
+    parent = write_json_collection(
+        tmp_path / "parent.json",
+        nodes=[{"id": "child", "type": "collection", "path": path}],
+    )
+
+    shallow = RootCollection.load(parent, deep=False)
+    assert isinstance(shallow.ome.nodes[0].path, PathRefOther)
+
+    collection = RootCollection.load(parent)
+    assert collection.ome.nodes[0].name == "child"
+
+
+def test_paths_of_unknown_types_are_kept(tmp_path, write_json_collection):
+    path = {"type": "unknown", "path": "somewhere"}
+    parent = write_json_collection(
+        tmp_path / "parent.json",
+        nodes=[{"id": "child", "type": "collection", "path": path}],
+    )
+
+    collection = RootCollection.load(parent, deep=False)
+    dumped = collection.model_dump(exclude_none=True)
+    assert dumped["ome"]["nodes"][0]["path"] == path
+    with pytest.raises(ValueError, match="No resolver for unknown paths"):
+        collection.ome.nodes[0].path.resolve_path()
+
+
+@pytest.mark.parametrize("consolidated", [False, True])
+def test_async_resolution_matches_sync(tmp_path, write_collection, consolidated):
+    root = write_collection(tmp_path / "root.zarr")
+    if consolidated:
+        zarr.consolidate_metadata(root.store)
+    group = zarr.open_group(tmp_path / "root.zarr", mode="r")
+    assert (group.metadata.consolidated_metadata is not None) == consolidated
+
+    child = asyncio.run(aresolve_zarr_path("./child", group))
+    assert isinstance(child, zarr.Group)
+    assert child.attrs["ome"] == resolve_zarr_path("./child", group).attrs["ome"]
+    with pytest.raises(ValueError, match="not found"):
+        asyncio.run(aresolve_zarr_path("./missing", group))
@@ -0,0 +1,160 @@
+import pytest
+import zarr
+
+from ngff_rfc8_collection_examples.collection import Collection, RootCollection
+from ngff_rfc8_collection_examples.multiscale import RootMultiscale
+
+CHILD = {
+    "attributes": {
+        "coordinateSystems": [
+            {
+                "id": "world",
+                "name": "world",
+                "axes": [{"name": "x", "type": "space"}],
+            }
+        ],
+        "coordinateTransformations": [
+            {
+                "type": "scale",
+                "scale": [1.0],
+                "input": {"ref": "world"},
+                "output": {"ref": "world"},
+            }
+        ],
+    }
+}
+
+
+@pytest.fixture
+def root(tmp_path, write_collection):
+    return write_collection(tmp_path / "root.zarr", child=CHILD)
+
+
+def reload(path) -> RootCollection:
+    return RootCollection.load(zarr.open_group(path, mode="r"))
+
+
+def test_unchanged_tree_writes_nothing(root):
+    report = RootCollection.load(root).save()
+    assert report.written == []
+
+
+def test_nested_model_edit_is_saved(tmp_path, root):
+    collection = RootCollection.load(root)
+    child = collection.ome.nodes[0]
+    child.attributes.coordinate_systems[0].name = "renamed"
+
+    report = collection.save()
+
+    assert report.written == [str(root["child"].store_path)]
+    child = reload(tmp_path / "root.zarr").ome.nodes[0]
+    assert child.attributes.coordinate_systems[0].name == "renamed"
+
+
+def test_in_place_list_edit_is_saved(tmp_path, root):
+    collection = RootCollection.load(root)
+    collection.ome.nodes[0].attributes.coordinate_transformations[0].scale[0] = 2.0
+    collection.save()
+
+    child = reload(tmp_path / "root.zarr").ome.nodes[0]
+    assert child.attributes.coordinate_transformations[0].scale == [2.0]
+
+
+def test_documents_are_saved_without_their_path(tmp_path, root):
+    collection = RootCollection.load(root)
+    collection.ome.nodes[0].name = "child"
+    collection.save()
+
+    document = zarr.open_group(tmp_path / "root.zarr" / "child").attrs["ome"]
+    assert document["name"] == "child"
+    assert "path" not in document
+
+
+@pytest.fixture
+def multiscale_path(tmp_path, write_multiscale):
+    path = tmp_path / "multiscale.zarr"
+    group = write_multiscale(path)
+    ome = group.attrs["ome"]
+    # Set on the stub, shadowing the array's value
+    ome["nodes"][0]["attributes"] = {"label": "stub"}
+    group.attrs["ome"] = ome
+    array_ome = group["0"].attrs["ome"]
+    array_ome["attributes"]["label"] = "array"
+    group["0"].attrs["ome"] = array_ome
+    return path
+
+
+def test_distributed_multiscale_saves_attributes_where_they_came_from(
+    multiscale_path,
+):
+    path = multiscale_path
+    multiscale = RootMultiscale.from_zarr(zarr.open_group(path))
+    assert multiscale.save().written == []
+
+    scale = multiscale.ome.nodes[0]
+    assert scale.attributes.extension("label") == "stub"
+    scale.name = "renamed"
+    scale.attributes.coordinate_systems[0].name = "renamed world"
+    scale.attributes.set_extension("label", "edited")
+    multiscale.save()
+
+    stub = zarr.open_group(path).attrs["ome"]["nodes"][0]
+    assert stub["name"] == "renamed"
+    assert stub["attributes"] == {"label": "edited"}
+    array_attributes = zarr.open_array(path / "0").attrs["ome"]["attributes"]
+    assert array_attributes["coordinateSystems"][0]["name"] == "renamed world"
+    assert array_attributes["label"] == "array"
+    assert "attributes" not in zarr.open_group(path).attrs["ome"]["nodes"][1]
+
+
+def test_unchanged_documents_are_skipped_after_a_save(tmp_path, root):
+    collection = RootCollection.load(root)
+    collection.save()
+    # Not seen by the model: an unchanged child is not serialized again
+    root["child"].attrs["ome"] = {**root["child"].attrs["ome"], "name": "outside"}
+
+    collection.ome.name = "root"
+    report = collection.save()
+
+    assert report.written == [str(root.store_path)]
+    assert root["child"].attrs["ome"]["name"] == "outside"
+    assert collection.save().written == []
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        lambda child: child.attributes.coordinate_transformations[0].scale.append(3),
+        lambda child: setattr(child.attributes.coordinate_systems[0], "name", "new"),
+        lambda child: child.attributes.coordinate_systems[0].axes.pop(),
+        lambda child: child.attributes.set_extension("label", {"text": "new"}),
+        lambda child: child.nodes.append(Collection(id="new", type="collection")),
+    ],
+)
+def test_edits_after_a_save_are_saved(tmp_path, root, edit):
+    collection = RootCollection.load(root)
+    collection.save()
+    edit(collection.ome.nodes[0])
+
+    assert collection.save().written == [str(root["child"].store_path)]
+    assert reload(tmp_path / "root.zarr") == collection
+
+
+def test_in_place_extension_edit_after_a_save_is_saved(tmp_path, root):
+    collection = RootCollection.load(root)
+    collection.ome.nodes[0].attributes.set_extension("label", {"tags": ["a"]})
+    collection.save()
+    collection.ome.nodes[0].attributes.extension("label")["tags"].append("b")
+    collection.save()
+
+    child = reload(tmp_path / "root.zarr").ome.nodes[0]
+    assert child.attributes.extension("label") == {"tags": ["a", "b"]}
+
+
+def test_copies_of_saved_models_are_plain(root):
+    collection = RootCollection.load(root)
+    collection.save()
+    copied = collection.model_copy(deep=True)
+    assert not copied.is_saved
+    assert type(copied.ome.nodes) is list
+    assert copied == collection
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+
+
+@pytest.fixture
+def collection(version) -> RootCollection:
+    return RootCollection.model_validate(
+        {
+            "ome": {
+                "id": "root",
+                "type": "collection",
+                "version": version,
+                "nodes": [
+                    {
+                        "id": "a",
+                        "type": "collection",
+                        "attributes": {
+                            "coordinate_systems": [
+                                {
+                                    "id": "world",
+                                    "name": "world",
+                                    "axes": [{"name": "x", "type": "space"}],
+                                }
+                            ],
+                            "label": "kept",
+                        },
+                        "nodes": [{"id": "a1", "type": "collection"}],
+                    },
+                    {"id": "b", "type": "collection", "attributes": {}},
+                ],
+            }
+        }
+    )
+
+
+def test_attributes_are_dumped_by_alias(collection):
+    attributes = collection.model_dump(exclude_none=True)["ome"]["nodes"][0][
+        "attributes"
+    ]
+    assert set(attributes) == {"coordinateSystems", "label"}
+    assert attributes["coordinateSystems"][0]["id"] == "world"
+
+
+def test_empty_attributes_and_nodes_are_left_out(collection):
+    ome = collection.model_dump(exclude_none=True)["ome"]
+    assert set(ome["nodes"][0]["nodes"][0]) == {"id", "type"}
+    assert "attributes" not in ome["nodes"][1]
+    assert "attributes" not in ome
+
+
+def test_json_bytes_match_the_python_dump(collection):
+    data = collection.to_json_bytes()
+    assert data == collection.model_dump_json(exclude_none=True).encode()
+    assert json.loads(data) == collection.model_dump(exclude_none=True)
+    assert collection.to_json_bytes(indent=2).startswith(b"{\n  ")
+
+
+def test_lazy_tree_dumps_like_the_eager_one(collection):
+    data = collection.model_dump(exclude_none=True)
+    lazy = RootCollection.from_json(data, lazy=True)
+    assert lazy.to_json_bytes() == collection.to_json_bytes()
+    assert RootCollection.from_json(data).model_dump(exclude_none=True) == data
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from ngff_rfc8_collection_examples.collection import Collection
+from ngff_rfc8_collection_examples.spatial import build_spatial_index, node_extents
+
+EXAMPLE = Path(__file__).parent.parent / "webknossos" / "inline_multiscale.json"
+
+COLOR = "65d8484b-3792-4eb8-9d4e-e9fbee3a5458"
+COLOR_SCALE_2 = "1a612389-20f5-4af1-b125-8bed8a5d7e85"
+SEGMENTATION = "3967cf03-0ca0-49f0-a0c6-27f105724ab7"
+
+
+def load_example() -> Collection:
+    # The example spells references with the older "$ref" key
+    text = EXAMPLE.read_text().replace('"$ref"', '"ref"')
+    return Collection.model_validate(json.loads(text)["attributes"]["ome"])
+
+
+def shape_of(scale):
+    # The example's arrays are not shipped; channels come from the shape
+    return (1, 1, 1, 1)
+
+
+def test_extents_start_at_the_bounding_box_topleft():
+    extents = dict(node_extents(load_example(), shape_of=shape_of))
+    voxel = np.array([1.0, 11.239999771118164, 11.239999771118164, 28.0])
+
+    lower, upper = extents[COLOR]
+    np.testing.assert_allclose(lower, [0, 128, 128, 128] * voxel)
+    np.testing.assert_allclose(upper, [1, 128 + 5445, 128 + 8380, 128 + 3285] * voxel)
+    # Every level of a multiscale covers the same box
+    np.testing.assert_allclose(extents[COLOR_SCALE_2][0], lower)
+    np.testing.assert_allclose(extents[COLOR_SCALE_2][1], upper)
+
+    lower, _ = extents[SEGMENTATION]
+    np.testing.assert_allclose(lower, 0)
+
+
+def test_query_outside_the_offset_box_misses_it():
+    index = build_spatial_index(load_example(), shape_of=shape_of)
+    # Below the color layer's topleft, but inside the segmentation layer
+    hits = index.intersection([0, 0, 0, 0], [1, 1000, 1000, 1000])
+    assert SEGMENTATION in hits
+    assert COLOR not in hits
+
+
+def test_bounding_box_parses_without_importing_spatial(run_python):
+    code = (
+        "import sys, json\n"
+        "from ngff_rfc8_collection_examples.collection import Collection\n"
+        f"text = open({str(EXAMPLE)!r}).read().replace('\"$ref\"', '\"ref\"')\n"
+        "node = Collection.model_validate(json.loads(text)['attributes']['ome'])\n"
+        "box = node.nodes[0].attributes.extension('webknossos:bounding_box')\n"
+        "assert type(box).__name__ == 'BoundingBox', type(box)\n"
+        "assert 'ngff_rfc8_collection_examples.spatial' not in sys.modules\n"
+    )
+    run_python(code)
@@ -0,0 +1,131 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import zarr
+
+from ngff_rfc8_collection_examples.collection import RootCollection
+from ngff_rfc8_collection_examples.common import resolve_zarr_path
+from ngff_rfc8_collection_examples.stores import (
+    HTTPStore,
+    StorePool,
+    locate,
+    store_pool,
+    store_root,
+)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def test_reading_a_store_does_not_make_it_read_only(tmp_path, version):
+    path = str(tmp_path / "root.zarr")
+    root = zarr.open_group(path, mode="w")
+    root.attrs["ome"] = {"id": "root", "type": "collection", "version": version}
+
+    # Pools a read-only store for the root
+    asyncio.run(RootCollection.afrom_zarr(path))
+
+    group = resolve_zarr_path(path)
+    assert not group.store.read_only
+    collection = RootCollection.load(group)
+    collection.ome.name = "renamed"
+    collection.save()
+    assert zarr.open_group(path, mode="r").attrs["ome"]["name"] == "renamed"
+
+
+class CountingHandler(QuietHandler):
+    heads = 0
+
+    def do_HEAD(self):
+        type(self).heads += 1
+        super().do_HEAD()
+
+
+def test_remote_nodes_are_read_again_once_changed(tmp_path, version):
+    directory = tmp_path / "served"
+    group = zarr.open_group(directory / "root.zarr", mode="w")
+    group.attrs["ome"] = {"id": "root", "type": "collection", "version": version}
+
+    handler = functools.partial(CountingHandler, directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/root.zarr"
+        assert resolve_zarr_path(url).attrs["ome"]["id"] == "root"
+        heads = CountingHandler.heads
+
+        group.attrs["ome"] = {**group.attrs["ome"], "name": "changed"}
+        # Served with a new Last-Modified header
+        later = time.time() + 60
+        os.utime(directory / "root.zarr" / "zarr.json", (later, later))
+        # Within the store's version_ttl, the cached version is trusted
+        assert "name" not in resolve_zarr_path(url).attrs["ome"]
+        assert CountingHandler.heads == heads
+
+        store_pool.get(url).version_ttl = 0
+        assert resolve_zarr_path(url).attrs["ome"]["name"] == "changed"
+    finally:
+        server.shutdown()
+
+
+def test_http_stores_hash_like_they_compare():
+    stores = {HTTPStore("http://host/a.zarr"), HTTPStore("http://host/a.zarr/")}
+    assert stores == {HTTPStore("http://host/a.zarr")}
+    assert HTTPStore("http://host/b.zarr") not in stores
+
+
+@pytest.fixture
+def nested(tmp_path):
+    root = zarr.open_group(tmp_path / "root.zarr", mode="w")
+    for path in ("a/b/c", "a/d", "e"):
+        root.require_group(path).attrs["name"] = path
+    zarr.open_group(tmp_path / "other.zarr", mode="w").attrs["name"] = "other"
+    return root["a/b"]
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("c", "a/b/c"),
+        ("./c", "a/b/c"),
+        (".", "a/b"),
+        ("../d", "a/d"),
+        ("./../../e", "e"),
+        ("/e", "e"),
+        ("/a/./b/../d", "a/d"),
+        ("/", ""),
+    ],
+)
+def test_paths_within_the_store(nested, path, expected):
+    pool = StorePool()
+    store, node_path = locate(path, nested, pool)
+    assert store is pool.add(nested.store)
+    assert node_path == expected
+
+
+def test_paths_leading_out_of_the_store(tmp_path, nested):
+    pool = StorePool()
+    store, node_path = locate("../../../other.zarr", nested, pool)
+    assert store_root(store) == str(tmp_path)
+    assert node_path == "other.zarr"
+    assert store is locate("../../../other.zarr/", nested, pool)[0]
+
+
+@pytest.mark.parametrize(
+    ("path", "name"),
+    [
+        ("./c", "a/b/c"),
+        ("../d", "a/d"),
+        ("/e", "e"),
+        ("../../../other.zarr", "other"),
+    ],
+)
+def test_resolving_relative_and_absolute_paths(nested, path, name):
+    assert resolve_zarr_path(path, nested).attrs["name"] == name
@@ -0,0 +1,70 @@
+import io
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from ngff_rfc8_collection_examples.collection import Collection, RootCollection
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+from ngff_rfc8_collection_examples.streaming import JsonStream, read_node
+
+
+@pytest.fixture
+def document(version):
+    scales = [{"id": f"s{i}", "type": "singlescale"} for i in range(3)]
+    nested = {
+        "id": "a",
+        "type": "collection",
+        "nodes": [
+            {"id": "m", "type": "multiscale", "nodes": scales},
+            {"id": "a1", "type": "collection", "nodes": []},
+        ],
+    }
+    return {
+        "ome": {
+            "id": "root",
+            "type": "collection",
+            "nodes": [nested, {"id": "b", "type": "collection"}],
+            "version": version,
+        }
+    }
+
+
+def stream(document):
+    return io.BytesIO(json.dumps(document, indent=1).encode())
+
+
+def test_streamed_collection_equals_validated_collection(document):
+    streamed = RootCollection.from_json_stream(stream(document))
+    assert streamed == RootCollection.model_validate(document)
+    multiscale = streamed.ome.nodes[0].nodes[0]
+    assert isinstance(multiscale, Multiscale)
+    assert all(isinstance(scale, SingleScale) for scale in multiscale.nodes)
+
+
+def test_nested_nodes_are_built_as_they_are_read(document):
+    built = []
+
+    def build_node(data):
+        built.append(data["id"])
+        return data
+
+    nested = document["ome"]["nodes"][0]
+    read_node(JsonStream(io.StringIO(json.dumps(nested)), chunk_size=8), build_node)
+    # Children are built before their parents
+    assert built == ["s0", "s1", "s2", "m", "a1", "a"]
+
+
+def test_iter_json_nodes_yields_validated_subtrees(document):
+    nodes = list(RootCollection.iter_json_nodes(stream(document)))
+    assert [node.id for node in nodes] == ["a", "b"]
+    assert isinstance(nodes[0].nodes[1], Collection)
+    assert nodes[0].nodes[0].nodes[2].id == "s2"
+
+
+def test_invalid_nested_nodes_raise(document):
+    multiscale = document["ome"]["nodes"][0]["nodes"][0]
+    multiscale["nodes"].append({"id": "c", "type": "collection"})
+    with pytest.raises(ValidationError):
+        RootCollection.from_json_stream(stream(document))
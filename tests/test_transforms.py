@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from ngff_rfc8_collection_examples.collection import (
+    CollectionWithVersion,
+    RootCollection,
+)
+from ngff_rfc8_collection_examples.common import BaseAttrs, Ref, Scale
+from ngff_rfc8_collection_examples.multiscale import Multiscale
+from ngff_rfc8_collection_examples.single_scales import SingleScale
+from ngff_rfc8_collection_examples.transforms import TransformEngine
+
+
+def scale(factors, source, target) -> Scale:
+    return Scale(scale=factors, input=Ref(ref=source), output=Ref(ref=target))
+
+
+@pytest.fixture
+def engine() -> TransformEngine:
+    # s0 -> world <- s1, and world -> physical
+    engine = TransformEngine()
+    engine.add_transform(scale([2.0, 4.0], "s0", "world"))
+    engine.add_transform(scale([8.0, 8.0], "s1", "world"))
+    engine.add_transform(scale([0.5, 0.5], "world", "physical"))
+    return engine
+
+
+def test_chains_are_folded_into_one_scale(engine):
+    compiled = engine.compile("s0", "physical")
+    np.testing.assert_allclose(compiled.scale, [1.0, 2.0])
+    points = np.array([[1.0, 1.0], [2.0, 3.0]])
+    np.testing.assert_allclose(engine.apply(points, "s0", "physical"), [[1, 2], [2, 6]])
+
+
+def test_transforms_are_walked_backwards_through_their_inverse(engine):
+    np.testing.assert_allclose(engine.compile("s1", "s0").scale, [4.0, 2.0])
+    np.testing.assert_allclose(engine.compile("physical", "s1").scale, [0.25, 0.25])
+    inverse = engine.compile("s0", "s1").inverse()
+    np.testing.assert_allclose(inverse.scale, engine.compile("s1", "s0").scale)
+
+
+def test_identity_broadcasts_to_any_number_of_axes(engine):
+    points = np.ones((2, 3))
+    np.testing.assert_allclose(engine.apply(points, "s0", "s0"), points)
+
+
+def test_compiled_transforms_are_memoized_until_the_graph_changes(engine):
+    compiled = engine.compile("s0", "world")
+    assert engine.compile("s0", "world") is compiled
+
+    shortcut = scale([3.0, 3.0], "s0", "physical")
+    engine.add_transform(shortcut)
+    assert engine.chain("s0", "physical") == [(shortcut, True)]
+    engine.remove_transform(shortcut)
+    np.testing.assert_allclose(engine.compile("s0", "physical").scale, [1.0, 2.0])
+
+
+def test_unconnected_ids_and_mismatched_axes_raise(engine):
+    with pytest.raises(ValueError, match="No Scale transformations lead"):
+        engine.compile("s0", "elsewhere")
+    engine.add_transform(scale([1.0, 1.0, 1.0], "physical", "volume"))
+    with pytest.raises(ValueError, match="Cannot compose"):
+        engine.compile("s0", "volume")
+
+
+def multiscale(id: str, factor: float) -> Multiscale:
+    return Multiscale(
+        id=id,
+        nodes=[
+            SingleScale(
+                id=f"{id}/0",
+                attributes=BaseAttrs(
+                    coordinate_transformations=[scale([factor], f"{id}/0", "world")]
+                ),
+            )
+        ],
+    )
+
+
+def test_root_graph_follows_added_replaced_and_removed_nodes():
+    root = RootCollection(ome=CollectionWithVersion(id="root"))
+    root.add_node(multiscale("a", 2.0))
+    graph = root.transform_graph
+    np.testing.assert_allclose(graph.compile("a/0", "world").scale, [2.0])
+
+    root.add_node(multiscale("b", 4.0))
+    assert root.transform_graph is graph
+    np.testing.assert_allclose(graph.compile("a/0", "b/0").scale, [0.5])
+
+    root.replace_node("b", multiscale("c", 8.0))
+    assert "b/0" not in graph.ids()
+    np.testing.assert_allclose(graph.compile("a/0", "c/0").scale, [0.25])
+
+    root.remove_node("a")
+    assert graph.ids() == {"c/0", "world"}
+    root.invalidate_index()
+    assert root.transform_graph is not graph